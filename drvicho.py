@@ -1,438 +1,3478 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+# DrVicho Optimizer: motor (registro, PowerShell, plan de tweaks, monitor,
+# mantenimiento) y modo sin interfaz. La GUI vive en drvicho_gui.py y solo se
+# importa al abrir la ventana; winreg y ctypes se cargan en los backends de Windows.
 import subprocess
-import ctypes
 import os
 import sys
 import threading
-import winreg
 import time
 import datetime
+import base64
+import queue
+import uuid
+import atexit
+import contextlib
+import json
+import re
+import fnmatch
+import glob
+import stat
+import signal
+import socket
+import struct
+import random
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-# --- CONFIGURACIÓN VISUAL (THEME CYBERPUNK/SLATE) ---
-COLORS = {
-    "bg_main": "#0f172a",       # Fondo Principal
-    "bg_sec": "#1e293b",        # Paneles
-    "bg_ter": "#334155",        # Inputs/Logs
-    "accent": "#3b82f6",        # Azul Primario
-    "accent_hover": "#2563eb",  # Azul Hover
-    "success": "#10b981",       # Verde
-    "warning": "#f59e0b",       # Amarillo
-    "danger": "#ef4444",        # Rojo
-    "text_main": "#f1f5f9",     # Blanco Hueso
-    "text_sec": "#94a3b8"       # Gris Texto
-}
+winreg = None
+ctypes = None
+
+# --- POOL DE SESIONES POWERSHELL ---
+# Cada host es un proceso de shell persistente que recibe comandos por stdin.
+# La salida de cada comando se cierra con una línea "<token> <codigo_salida>".
+class PowerShellTransport:
+    argv = ["powershell", "-NoProfile", "-NoLogo", "-NonInteractive", "-Command", "-"]
+    prelude = "[Console]::OutputEncoding = [Text.Encoding]::UTF8; $ProgressPreference = 'SilentlyContinue'"
+
+    def __init__(self, argv=None):
+        if argv: self.argv = list(argv)
+
+    def popen_kwargs(self):
+        if os.name != "nt": return {}
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        return {"startupinfo": startupinfo, "creationflags": subprocess.CREATE_NO_WINDOW}
+
+    def kill(self, proc):
+        proc.kill()
+
+    def oneshot_argv(self, cmd):
+        # Forma clásica: un proceso nuevo por comando (solo para comparar latencias)
+        return [self.argv[0], "-NoProfile", "-Command", cmd]
+
+    def wrap(self, cmd, token):
+        # El comando viaja en base64 para que comillas y saltos de línea no rompan el REPL
+        b64 = base64.b64encode(cmd.encode("utf-8")).decode("ascii")
+        return (
+            "$global:LASTEXITCODE = 0; $__ok = $true; "
+            f"$__c = [Text.Encoding]::UTF8.GetString([Convert]::FromBase64String('{b64}')); "
+            "try { Invoke-Expression $__c 2>$null | Out-String -Stream | ForEach-Object { [Console]::Out.WriteLine($_) }; $__ok = $? } "
+            "catch { $__ok = $false; [Console]::Out.WriteLine($_.ToString()) }; "
+            "if ($global:LASTEXITCODE) { $__rc = $global:LASTEXITCODE } elseif ($__ok) { $__rc = 0 } else { $__rc = 1 }; "
+            f"[Console]::Out.WriteLine('{token} ' + $__rc); [Console]::Out.Flush()"
+        )
+
+class PosixShellTransport(PowerShellTransport):
+    # Sustituto para Linux (sh/bash o un REPL falso que hable el mismo protocolo)
+    argv = ["sh"]
+    prelude = None
+
+    def popen_kwargs(self):
+        return {"start_new_session": True}
+
+    def kill(self, proc):
+        # Un hijo colgado (sleep, etc.) heredaría stdout y close() esperaría a que acabe:
+        # se mata el grupo entero, igual que en los Jobs
+        try: os.killpg(proc.pid, signal.SIGKILL)
+        except OSError: proc.kill()
+
+    def oneshot_argv(self, cmd):
+        return [self.argv[0], "-c", cmd]
+
+    def wrap(self, cmd, token):
+        b64 = base64.b64encode(cmd.encode("utf-8")).decode("ascii")
+        return f"eval \"$(echo {b64} | base64 -d)\" 2>/dev/null </dev/null; printf '%s %d\\n' {token} $?"
+
+class ShellHost:
+    def __init__(self, transport):
+        self.transport = transport
+        self.proc = None
+        self.lines = None
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self):
+        self.proc = subprocess.Popen(
+            self.transport.argv,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8", errors="replace", bufsize=1,
+            **self.transport.popen_kwargs()
+        )
+        count_proc()
+        self.lines = queue.Queue()
+        threading.Thread(target=self._pump, args=(self.proc.stdout, self.lines), daemon=True).start()
+        if self.transport.prelude:
+            self.proc.stdin.write(self.transport.prelude + "\n")
+            self.proc.stdin.flush()
+
+    @staticmethod
+    def _pump(stream, lines):
+        try:
+            for line in stream: lines.put(line)
+        except (OSError, ValueError): pass
+        lines.put(None) # EOF: el host murió
+
+    def stop(self):
+        if self.proc is None: return
+        try:
+            if self.proc.poll() is None: self.transport.kill(self.proc)
+            self.proc.wait(timeout=5)
+        except Exception: pass
+        for stream in (self.proc.stdin, self.proc.stdout):
+            try: stream.close()
+            except Exception: pass
+        self.proc = None
+
+    def execute(self, cmd, timeout=None):
+        # Devuelve (codigo_salida, salida). codigo_salida es None si el host cayó o expiró.
+        with trace("ps_host", "ps", cold=not self.alive()) as span:
+            rc, out = self._execute(cmd, timeout)
+            span.set(rc == 0, rc=rc)
+        return rc, out
+
+    def _execute(self, cmd, timeout=None):
+        if not self.alive():
+            self.stop()
+            self.start()
+        token = "__DRV_" + uuid.uuid4().hex
+        try:
+            self.proc.stdin.write(self.transport.wrap(cmd, token) + "\n")
+            self.proc.stdin.flush()
+        except (OSError, ValueError):
+            self.stop()
+            return None, "Host PowerShell caído"
+
+        out = []
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                line = self.lines.get(timeout=remaining)
+            except queue.Empty:
+                self.stop() # Se reinicia en el próximo uso
+                return None, f"Timeout ({timeout}s)"
+            if line is None:
+                self.stop()
+                return None, "".join(out) or "Host PowerShell caído"
+            idx = line.find(token)
+            if idx < 0:
+                out.append(line)
+                continue
+            if idx: out.append(line[:idx])
+            try: rc = int(line[idx + len(token):].strip())
+            except ValueError: rc = 1
+            return rc, "".join(out)
+
+class ShellPool:
+    def __init__(self, transport=None, size=2):
+        self.transport = transport or PowerShellTransport()
+        self.hosts = [ShellHost(self.transport) for _ in range(size)]
+        self._idle = queue.LifoQueue() # LIFO: reutiliza el host más caliente
+        for host in self.hosts: self._idle.put(host)
+
+    def run(self, cmd, timeout=None):
+        host = self._idle.get()
+        try:
+            rc, out = host.execute(cmd, timeout)
+        except Exception as e:
+            host.stop()
+            return False, str(e)
+        finally:
+            self._idle.put(host)
+        if rc is None: return False, out.strip()
+        return rc == 0, out.strip()
+
+    def warm(self):
+        # Solo arranca hosts libres; los ocupados ya están vivos
+        hosts = []
+        while True:
+            try: hosts.append(self._idle.get_nowait())
+            except queue.Empty: break
+        try:
+            for host in hosts:
+                if not host.alive():
+                    host.stop()
+                    host.start()
+        except OSError: pass # sin PowerShell: run() devolverá el error
+        finally:
+            for host in reversed(hosts): self._idle.put(host)
+
+    def close(self):
+        for host in self.hosts: host.stop()
+
+class ScriptedShell:
+    # Sustituto del pool para pruebas y benchmarks: responde según reglas
+    # (regex -> salida) y, por defecto, emula el protocolo de marcadores de los
+    # scripts de tweaks, sondeos y lotes. Inyecta latencia por comando y un
+    # arranque en frío por host, como un PowerShell real.
+    OK = re.compile(r"'(__DRV_[A-Z]+__) (\S+) OK'")
+    PROBE = re.compile(r"\('(__DRV_STATE__) (\S+) ' \+ \$__r\)")
+    PREV = re.compile(r"\('(__DRV_PREV__) (\S+) ' \+ \$__p\)")
+
+    def __init__(self, rules=None, latency=0.0, startup=0.0, size=2, fail=None, applied=None):
+        self.rules = [(re.compile(pattern), out) for pattern, out in (rules or [])]
+        self.latency = latency
+        self.startup = startup
+        self.fail = dict(fail or {}) # id -> mensaje de error
+        self.applied = set(applied or ())
+        self.calls = []
+        self.lock = threading.Lock()
+        self._idle = queue.LifoQueue()
+        for host in range(size): self._idle.put(host)
+        self._ready = {} # host -> instante en que termina de arrancar
+
+    def _respond(self, cmd):
+        for pattern, out in self.rules:
+            if pattern.search(cmd):
+                out = out(cmd) if callable(out) else out
+                return out if isinstance(out, tuple) else (True, out)
+        lines = []
+        for mark, key in self.OK.findall(cmd):
+            if key in self.fail:
+                lines.append(f"{mark} {key} ERR {self.fail[key]}")
+                continue
+            lines.append(f"{mark} {key} OK")
+            with self.lock:
+                # Deshacer vuelve al estado previo; el resto de marcadores no cambian nada
+                if mark == "__DRV_TWEAK__": self.applied.add(key)
+                elif mark == "__DRV_UNDO__": self.applied.discard(key)
+        for mark, key in self.PROBE.findall(cmd):
+            lines.append(f"{mark} {key} {key in self.applied}")
+        for mark, key in self.PREV.findall(cmd):
+            lines.append(f"{mark} {key} {json.dumps({'applied': key in self.applied})}")
+        return True, "\n".join(lines)
+
+    def run(self, cmd, timeout=None):
+        host = self._idle.get()
+        try:
+            now = time.monotonic()
+            ready = self._ready.setdefault(host, now + self.startup)
+            delay = max(0.0, ready - now) + self.latency
+            if timeout is not None and delay > timeout:
+                time.sleep(timeout)
+                self._ready.pop(host, None) # como el pool: el host se reinicia
+                return False, f"Timeout ({timeout}s)"
+            if delay: time.sleep(delay)
+            with self.lock: self.calls.append(cmd)
+            return self._respond(cmd)
+        finally:
+            self._idle.put(host)
+
+    def warm(self):
+        # Como ShellPool.warm: el arranque corre en segundo plano desde ya
+        now = time.monotonic()
+        for host in range(self._idle.qsize()): self._ready.setdefault(host, now + self.startup)
+
+    def close(self):
+        self._ready.clear()
+
+def bench_run_ps(n=20, transport=None, size=1):
+    # Compara latencia por comando: pool persistente vs un proceso nuevo por llamada
+    transport = transport or PowerShellTransport()
+    cmd = "echo ok"
+    pool = ShellPool(transport, size=size)
+    pool.warm()
+    pool.run(cmd)
+    t0 = time.perf_counter()
+    for _ in range(n): pool.run(cmd)
+    pooled = (time.perf_counter() - t0) / n
+    pool.close()
+
+    t0 = time.perf_counter()
+    for _ in range(n):
+        subprocess.run(transport.oneshot_argv(cmd), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, **transport.popen_kwargs())
+    per_call = (time.perf_counter() - t0) / n
+    return {"n": n, "pooled_ms": pooled * 1000, "per_call_ms": per_call * 1000, "speedup": per_call / pooled if pooled else 0.0}
+
+# --- REGISTRO (BACKENDS) ---
+# Todos los accesos al registro pasan por un backend con hives y tipos por
+# nombre ("HKCU", "REG_DWORD"). WinRegistry usa winreg; MemoryRegistry es un
+# hive en memoria para probar journal y rollback fuera de Windows.
+REG_TYPE_NAMES = ["REG_NONE", "REG_SZ", "REG_EXPAND_SZ", "REG_BINARY", "REG_DWORD", "REG_MULTI_SZ", "REG_QWORD"]
+
+class WinRegistry:
+    HIVES = {"HKCU": "HKEY_CURRENT_USER", "HKLM": "HKEY_LOCAL_MACHINE", "HKU": "HKEY_USERS"}
+
+    def __init__(self):
+        global winreg
+        import winreg
+
+    def _root(self, hive):
+        return getattr(winreg, self.HIVES.get(hive, hive)) if isinstance(hive, str) else hive
+
+    @staticmethod
+    def _type(reg_type):
+        return getattr(winreg, reg_type) if isinstance(reg_type, str) else reg_type
+
+    @staticmethod
+    def _type_name(reg_type):
+        for name in REG_TYPE_NAMES:
+            if getattr(winreg, name) == reg_type: return name
+        return reg_type
+
+    def _query(self, key, name):
+        try:
+            value, reg_type = winreg.QueryValueEx(key, name)
+            return value, self._type_name(reg_type)
+        except FileNotFoundError:
+            return None
+
+    def get_values(self, hive, path, names=None):
+        # {nombre: (valor, tipo)} o None si la clave no existe
+        try:
+            key = winreg.OpenKey(self._root(hive), path, 0, winreg.KEY_READ)
+        except FileNotFoundError:
+            return None
+        with key:
+            if names is not None:
+                found = {name: self._query(key, name) for name in names}
+                return {name: v for name, v in found.items() if v is not None}
+            values, i = {}, 0
+            while True:
+                try: name, value, reg_type = winreg.EnumValue(key, i)
+                except OSError: return values
+                values[name] = (value, self._type_name(reg_type))
+                i += 1
+
+    def set_values(self, hive, path, values, before=None):
+        # before(previos) se llama con la clave ya abierta y antes de escribir nada
+        with winreg.CreateKeyEx(self._root(hive), path, 0, winreg.KEY_READ | winreg.KEY_SET_VALUE) as key:
+            if before: before({name: self._query(key, name) for name, _, _ in values})
+            for name, value, reg_type in values:
+                winreg.SetValueEx(key, name, 0, self._type(reg_type), value)
+
+    def delete_values(self, hive, path, names):
+        try:
+            key = winreg.OpenKey(self._root(hive), path, 0, winreg.KEY_SET_VALUE)
+        except FileNotFoundError:
+            return
+        with key:
+            for name in names:
+                try: winreg.DeleteValue(key, name)
+                except FileNotFoundError: pass
+
+    def delete_key(self, hive, path, before=None):
+        if before: before(self.get_values(hive, path))
+        winreg.DeleteKey(self._root(hive), path)
+
+    def watch(self, hive, path, callback):
+        # Notificación de cambios (RegNotifyChangeKeyValue) sobre la clave y sus subclaves
+        if getattr(self, "_watcher", None) is None: self._watcher = _RegWatcher(self)
+        self._watcher.add(hive, path, callback)
+
+class _RegWatcher:
+    # Un solo hilo espera (WaitForMultipleObjects) en un evento por clave vigilada
+    REG_NOTIFY_CHANGE_NAME = 0x1
+    REG_NOTIFY_CHANGE_LAST_SET = 0x4
+    KEY_NOTIFY = 0x0010
+    MAX_WAIT = 63
+
+    def __init__(self, registry):
+        global ctypes
+        import ctypes
+        from ctypes import wintypes
+        self.registry = registry
+        self.k32 = ctypes.windll.kernel32
+        self.adv = ctypes.windll.advapi32
+        self.k32.CreateEventW.restype = wintypes.HANDLE
+        self.k32.CreateEventW.argtypes = [ctypes.c_void_p, wintypes.BOOL, wintypes.BOOL, ctypes.c_wchar_p]
+        self.k32.SetEvent.argtypes = [wintypes.HANDLE]
+        self.k32.WaitForMultipleObjects.argtypes = [wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE), wintypes.BOOL, wintypes.DWORD]
+        self.k32.WaitForMultipleObjects.restype = wintypes.DWORD
+        self.adv.RegNotifyChangeKeyValue.argtypes = [wintypes.HANDLE, wintypes.BOOL, wintypes.DWORD, wintypes.HANDLE, wintypes.BOOL]
+        self.HANDLE = wintypes.HANDLE
+        self.wake = self.k32.CreateEventW(None, False, False, None)
+        self.lock = threading.Lock()
+        self.pending = []
+        self.items = []  # [(clave_abierta, evento, callback)]
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def add(self, hive, path, callback):
+        with self.lock: self.pending.append((hive, path, callback))
+        self.k32.SetEvent(self.wake)
+
+    def _open(self, hive, path):
+        # Si la clave aún no existe se vigila el ancestro más cercano (con subárbol)
+        root = self.registry._root(hive)
+        while True:
+            try: return winreg.OpenKey(root, path, 0, self.KEY_NOTIFY)
+            except FileNotFoundError:
+                if not path: raise
+                path = path.rpartition("\\")[0]
+
+    def _arm(self, key, event):
+        self.adv.RegNotifyChangeKeyValue(key.handle, True, self.REG_NOTIFY_CHANGE_NAME | self.REG_NOTIFY_CHANGE_LAST_SET, event, True)
+
+    def _loop(self):
+        while True:
+            with self.lock: pending, self.pending = self.pending, []
+            for hive, path, callback in pending:
+                if len(self.items) >= self.MAX_WAIT: break
+                try:
+                    key = self._open(hive, path)
+                    event = self.k32.CreateEventW(None, False, False, None)
+                    self._arm(key, event)
+                    self.items.append((key, event, callback))
+                except OSError: pass
+            handles = (self.HANDLE * (len(self.items) + 1))(self.wake, *[e for _, e, _ in self.items])
+            idx = self.k32.WaitForMultipleObjects(len(handles), handles, False, 0xFFFFFFFF)
+            if 1 <= idx <= len(self.items):
+                key, event, callback = self.items[idx - 1]
+                self._arm(key, event) # Las notificaciones son de un solo disparo
+                try: callback()
+                except Exception: pass
+
+class MemoryRegistry:
+    def __init__(self):
+        self.keys = {}  # (hive, ruta en minúsculas) -> {nombre en minúsculas: (nombre, valor, tipo)}
+        self.lock = threading.Lock()
+        self.opens = 0
+        self.watchers = []
+
+    def watch(self, hive, path, callback):
+        self.watchers.append((hive, path.lower(), callback))
+
+    def _notify(self, hive, path):
+        path = path.lower()
+        for w_hive, w_path, callback in list(self.watchers):
+            if w_hive == hive and (path == w_path or path.startswith(w_path + "\\") or w_path.startswith(path + "\\")):
+                callback()
+
+    @staticmethod
+    def _k(hive, path):
+        return hive, path.lower()
+
+    def get_values(self, hive, path, names=None):
+        with self.lock:
+            self.opens += 1
+            key = self.keys.get(self._k(hive, path))
+            if key is None: return None
+            if names is None: return {n: (v, t) for n, v, t in key.values()}
+            return {key[n.lower()][0]: key[n.lower()][1:] for n in names if n.lower() in key}
+
+    def set_values(self, hive, path, values, before=None):
+        with self.lock:
+            self.opens += 1
+            key = self.keys.setdefault(self._k(hive, path), {})
+            if before:
+                before({n: (key[n.lower()][1:] if n.lower() in key else None) for n, _, _ in values})
+            for name, value, reg_type in values:
+                key[name.lower()] = (name, value, reg_type)
+        self._notify(hive, path)
+
+    def delete_values(self, hive, path, names):
+        with self.lock:
+            self.opens += 1
+            key = self.keys.get(self._k(hive, path), {})
+            for name in names: key.pop(name.lower(), None)
+        self._notify(hive, path)
+
+    def delete_key(self, hive, path, before=None):
+        with self.lock:
+            self.opens += 1
+            key = self.keys.get(self._k(hive, path))
+            if key is None: raise FileNotFoundError(path)
+            if before: before({n: (v, t) for n, v, t in key.values()})
+            del self.keys[self._k(hive, path)]
+        self._notify(hive, path)
+
+# --- JOURNAL DE REGISTRO ---
+# Antes de cada cambio se anexa (y fsync) una línea JSON con el valor y tipo
+# previos de ese par clave/valor, o null si no existía. Deshacer una ejecución
+# o un tweak reescribe esos valores en bloque, agrupados por clave.
+def app_data_dir():
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    path = os.path.join(base, "DrVicho")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _enc(value):
+    return {"b64": base64.b64encode(value).decode("ascii")} if isinstance(value, (bytes, bytearray)) else value
+
+def _dec(value):
+    return base64.b64decode(value["b64"]) if isinstance(value, dict) and "b64" in value else value
+
+class RegJournal:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(app_data_dir(), "journal.jsonl")
+        self.lock = threading.Lock()
+        self.run = None
+        # Si un crash dejó una línea a medias, la cerramos para no corromper la siguiente
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            with open(self.path, "rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n": f.write(b"\n")
+
+    def _append(self, records):
+        data = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def begin(self, label=""):
+        self.run = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        self._append([{"op": "begin", "run": self.run, "label": label, "ts": time.time()}])
+        return self.run
+
+    def record_set(self, hive, path, prev, fids=None):
+        # prev: {nombre: (valor, tipo) | None}; fids: {nombre: fid}
+        fids = fids or {}
+        self._append([
+            {"op": "set", "run": self.run, "fid": fids.get(name), "hive": hive, "path": path, "name": name,
+             "prev": None if old is None else [_enc(old[0]), old[1]]}
+            for name, old in prev.items()
+        ])
+
+    def record_delete(self, hive, path, values, fid=None):
+        self._append([{"op": "delkey", "run": self.run, "fid": fid, "hive": hive, "path": path,
+                       "values": {n: [_enc(v), t] for n, (v, t) in (values or {}).items()}}])
+
+    def record_actions(self, kind, records):
+        # Cambios fuera del registro: cada registro guarda lo necesario para deshacerlo
+        self._append([{"op": "action", "run": self.run, "fid": r.get("fid"), "kind": kind, "data": r} for r in records])
+
+    def entries(self):
+        if not os.path.exists(self.path): return []
+        out = []
+        with open(self.path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                try: out.append(json.loads(line))
+                except ValueError: pass # Línea truncada por un crash
+        return out
+
+    def undo(self, registry, run=None, fid=None, actions=None):
+        # Deshace la última ejecución (o la última del tweak fid). Devuelve
+        # (run, n_valores, fids_sin_deshacer). actions(kind, registros) deshace los
+        # cambios fuera del registro y devuelve cuántos; las acciones marcadas con
+        # "undoable": False (sin estado previo) solo se informan.
+        entries = self.entries()
+        undone = {(e["run"], e.get("fid")) for e in entries if e["op"] == "undo"}
+        changes = [e for e in entries if e["op"] in ("set", "delkey", "action")
+                   and (e["run"], None) not in undone and (e["run"], e.get("fid")) not in undone
+                   and (fid is None or e.get("fid") == fid)]
+        if run is None and fid is None:
+            # La ejecución más reciente aunque no dejara nada en el registro (solo
+            # PowerShell, todo omitido...): nunca se salta a una anterior
+            started = {e["run"] for e in entries if e["op"] in ("set", "delkey", "action")}
+            pending = {e["run"] for e in changes}
+            runs = [e["run"] for e in entries if e["op"] in ("begin", "set", "delkey", "action")
+                    and (e["run"], None) not in undone and (e["run"] in pending or e["run"] not in started)]
+            if not runs: return None, 0, []
+            run = runs[-1]
+        elif run is None:
+            if not changes: return None, 0, []
+            run = changes[-1]["run"]
+        changes = [e for e in changes if e["run"] == run]
+
+        # El primer registro de cada valor guarda su estado original
+        original, deleted_keys, other = {}, {}, {}
+        missing = []
+        for e in changes:
+            if e["op"] == "action":
+                if e["data"].get("undoable", True): other.setdefault(e["kind"], []).append(e["data"])
+                elif e.get("fid") not in missing: missing.append(e.get("fid"))
+            elif e["op"] == "delkey":
+                deleted_keys.setdefault((e["hive"], e["path"]), e["values"])
+            else:
+                original.setdefault((e["hive"], e["path"], e["name"]), e["prev"])
+        by_key = {}
+        for (hive, path), values in deleted_keys.items():
+            for name, prev in values.items(): by_key.setdefault((hive, path), {}).setdefault(name, prev)
+        for (hive, path, name), prev in original.items():
+            by_key.setdefault((hive, path), {})[name] = prev
+        for (hive, path), values in by_key.items():
+            restore = [(n, _dec(p[0]), p[1]) for n, p in values.items() if p is not None]
+            remove = [n for n, p in values.items() if p is None]
+            if restore or (hive, path) in deleted_keys: registry.set_values(hive, path, restore)
+            if remove: registry.delete_values(hive, path, remove)
+        n = sum(len(v) for v in by_key.values())
+        if actions:
+            for kind, records in other.items(): n += actions(kind, records)
+        self._append([{"op": "undo", "run": run, "fid": fid, "ts": time.time()}])
+        return run, n, missing
+
+# --- MONITOR DE SISTEMA (MUESTREO NATIVO) ---
+# Los backends devuelven contadores crudos; MetricsSampler calcula porcentajes
+# y tasas y guarda el historial en buffers circulares de tamaño fijo.
+class RingBuffer:
+    def __init__(self, capacity):
+        self.data = array("d", bytes(8 * capacity))
+        self.capacity = capacity
+        self.idx = 0
+        self.count = 0
+
+    def append(self, value):
+        self.data[self.idx] = value
+        self.idx = (self.idx + 1) % self.capacity
+        if self.count < self.capacity: self.count += 1
+
+    def last(self, default=0.0):
+        return self.data[self.idx - 1] if self.count else default
+
+    def values(self, n=None):
+        # Orden cronológico (más antiguo primero)
+        n = self.count if n is None else min(n, self.count)
+        start = (self.idx - n) % self.capacity
+        if start + n <= self.capacity: return self.data[start:start + n].tolist()
+        return self.data[start:].tolist() + self.data[:self.idx].tolist()
+
+class ProcMetrics:
+    # Linux: /proc/stat, /proc/meminfo, /proc/diskstats y /proc/net/dev
+    def __init__(self, root="/proc"):
+        self.root = root
+        block = "/sys/block"
+        self.disks = {d for d in os.listdir(block) if not d.startswith(("loop", "ram", "zram"))} if os.path.isdir(block) else None
+
+    def _read(self, name):
+        with open(os.path.join(self.root, name), "rb") as f:
+            return f.read().decode("ascii", "replace")
+
+    def sample(self):
+        cpus = []
+        for line in self._read("stat").splitlines():
+            if not line.startswith("cpu"): break
+            fields = [int(x) for x in line.split()[1:]]
+            idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+            cpus.append((idle, sum(fields[:8])))
+        mem = {}
+        for line in self._read("meminfo").splitlines()[:8]:
+            key, _, rest = line.partition(":")
+            mem[key] = int(rest.split()[0]) * 1024
+        total = mem.get("MemTotal", 1)
+        used = total - mem.get("MemAvailable", mem.get("MemFree", 0))
+        rd = wr = 0
+        for line in self._read("diskstats").splitlines():
+            f = line.split()
+            if len(f) > 9 and (f[2] in self.disks if self.disks is not None else not f[2][-1].isdigit()):
+                rd += int(f[5]) * 512
+                wr += int(f[9]) * 512
+        rx = tx = 0
+        for line in self._read("net/dev").splitlines()[2:]:
+            name, _, rest = line.partition(":")
+            if name.strip() == "lo": continue
+            f = rest.split()
+            rx += int(f[0])
+            tx += int(f[8])
+        return {"cpu": cpus[0], "cores": cpus[1:], "mem_total": total, "mem_used": used,
+                "disk": (rd, wr), "net": (rx, tx)}
+
+class WinMetrics:
+    # Windows: GetSystemTimes, NtQuerySystemInformation, GlobalMemoryStatusEx,
+    # IOCTL_DISK_PERFORMANCE y GetIfTable, todo por ctypes (sin procesos)
+    IOCTL_DISK_PERFORMANCE = 0x70020
+    SystemProcessorPerformanceInformation = 8
+
+    def __init__(self):
+        global ctypes
+        import ctypes
+        from ctypes import wintypes
+        k32 = ctypes.windll.kernel32
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [("dwLength", wintypes.DWORD), ("dwMemoryLoad", wintypes.DWORD),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+        class SPPI(ctypes.Structure):
+            _fields_ = [("IdleTime", ctypes.c_longlong), ("KernelTime", ctypes.c_longlong), ("UserTime", ctypes.c_longlong),
+                        ("DpcTime", ctypes.c_longlong), ("InterruptTime", ctypes.c_longlong), ("InterruptCount", ctypes.c_ulong)]
+
+        class DISK_PERFORMANCE(ctypes.Structure):
+            _fields_ = [("BytesRead", ctypes.c_longlong), ("BytesWritten", ctypes.c_longlong), ("ReadTime", ctypes.c_longlong),
+                        ("WriteTime", ctypes.c_longlong), ("IdleTime", ctypes.c_longlong), ("ReadCount", wintypes.DWORD),
+                        ("WriteCount", wintypes.DWORD), ("QueueDepth", wintypes.DWORD), ("SplitCount", wintypes.DWORD),
+                        ("QueryTime", ctypes.c_longlong), ("StorageDeviceNumber", wintypes.DWORD),
+                        ("StorageManagerName", wintypes.WCHAR * 8)]
+
+        class MIB_IFROW(ctypes.Structure):
+            _fields_ = [("wszName", wintypes.WCHAR * 256), ("dwIndex", wintypes.DWORD), ("dwType", wintypes.DWORD),
+                        ("dwMtu", wintypes.DWORD), ("dwSpeed", wintypes.DWORD), ("dwPhysAddrLen", wintypes.DWORD),
+                        ("bPhysAddr", ctypes.c_ubyte * 8), ("dwAdminStatus", wintypes.DWORD), ("dwOperStatus", wintypes.DWORD),
+                        ("dwLastChange", wintypes.DWORD), ("dwInOctets", wintypes.DWORD), ("dwInUcastPkts", wintypes.DWORD),
+                        ("dwInNUcastPkts", wintypes.DWORD), ("dwInDiscards", wintypes.DWORD), ("dwInErrors", wintypes.DWORD),
+                        ("dwInUnknownProtos", wintypes.DWORD), ("dwOutOctets", wintypes.DWORD), ("dwOutUcastPkts", wintypes.DWORD),
+                        ("dwOutNUcastPkts", wintypes.DWORD), ("dwOutDiscards", wintypes.DWORD), ("dwOutErrors", wintypes.DWORD),
+                        ("dwOutQLen", wintypes.DWORD), ("dwDescrLen", wintypes.DWORD), ("bDescr", ctypes.c_ubyte * 256)]
+
+        self.k32 = k32
+        self.ntdll = ctypes.windll.ntdll
+        self.iphlpapi = ctypes.windll.iphlpapi
+        self.mem = MEMORYSTATUSEX(dwLength=ctypes.sizeof(MEMORYSTATUSEX))
+        self.ncores = os.cpu_count() or 1
+        self.sppi = (SPPI * self.ncores)()
+        self.MIB_IFROW = MIB_IFROW
+        self.perf = DISK_PERFORMANCE()
+        self.ft = [wintypes.FILETIME() for _ in range(3)]
+        k32.CreateFileW.restype = wintypes.HANDLE
+        k32.CreateFileW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, ctypes.c_void_p, wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE]
+        k32.DeviceIoControl.argtypes = [wintypes.HANDLE, wintypes.DWORD, ctypes.c_void_p, wintypes.DWORD, ctypes.c_void_p, wintypes.DWORD, ctypes.POINTER(wintypes.DWORD), ctypes.c_void_p]
+        self.disks = []
+        for i in range(16):
+            # Sin permisos de lectura (dwDesiredAccess=0) basta para consultar contadores
+            h = k32.CreateFileW(f"\\\\.\\PhysicalDrive{i}", 0, 3, None, 3, 0, None)
+            if h and h != wintypes.HANDLE(-1).value: self.disks.append(h)
+        self.if_buf = ctypes.create_string_buffer(64 * 1024)
+        self.net_last = {}
+        self.net_total = [0, 0]
+
+    @staticmethod
+    def _ft(ft):
+        return (ft.dwHighDateTime << 32) | ft.dwLowDateTime
+
+    def _net(self):
+        from ctypes import wintypes
+        size = wintypes.DWORD(len(self.if_buf))
+        if self.iphlpapi.GetIfTable(self.if_buf, ctypes.byref(size), False) == 122: # ERROR_INSUFFICIENT_BUFFER
+            self.if_buf = ctypes.create_string_buffer(size.value)
+            if self.iphlpapi.GetIfTable(self.if_buf, ctypes.byref(size), False): return tuple(self.net_total)
+        n = ctypes.c_ulong.from_buffer(self.if_buf).value
+        rows = ctypes.cast(ctypes.addressof(self.if_buf) + 4, ctypes.POINTER(self.MIB_IFROW))
+        for i in range(n):
+            row = rows[i]
+            if row.dwType == 24: continue # loopback
+            # Contadores de 32 bits: se acumulan los deltas para tolerar el desborde
+            prev = self.net_last.get(row.dwIndex)
+            cur = (row.dwInOctets, row.dwOutOctets)
+            if prev:
+                self.net_total[0] += (cur[0] - prev[0]) & 0xFFFFFFFF
+                self.net_total[1] += (cur[1] - prev[1]) & 0xFFFFFFFF
+            self.net_last[row.dwIndex] = cur
+        return tuple(self.net_total)
+
+    def sample(self):
+        from ctypes import wintypes
+        idle, kernel, user = self.ft
+        self.k32.GetSystemTimes(ctypes.byref(idle), ctypes.byref(kernel), ctypes.byref(user))
+        i = self._ft(idle)
+        cpu = (i, self._ft(kernel) + self._ft(user)) # kernel incluye idle
+        cores = []
+        if self.ntdll.NtQuerySystemInformation(self.SystemProcessorPerformanceInformation, self.sppi, ctypes.sizeof(self.sppi), None) == 0:
+            cores = [(c.IdleTime, c.KernelTime + c.UserTime) for c in self.sppi]
+        self.k32.GlobalMemoryStatusEx(ctypes.byref(self.mem))
+        rd = wr = 0
+        returned = wintypes.DWORD()
+        for h in self.disks:
+            if self.k32.DeviceIoControl(h, self.IOCTL_DISK_PERFORMANCE, None, 0, ctypes.byref(self.perf), ctypes.sizeof(self.perf), ctypes.byref(returned), None):
+                rd += self.perf.BytesRead
+                wr += self.perf.BytesWritten
+        return {"cpu": cpu, "cores": cores, "mem_total": self.mem.ullTotalPhys,
+                "mem_used": self.mem.ullTotalPhys - self.mem.ullAvailPhys, "disk": (rd, wr), "net": self._net()}
+
+def default_metrics_backend():
+    return WinMetrics() if os.name == "nt" else ProcMetrics()
+
+class MetricsSampler:
+    SERIES = ("t", "cpu", "mem", "disk_read", "disk_write", "net_rx", "net_tx")
+
+    def __init__(self, backend=None, interval=1.0, capacity=600):
+        self.backend = backend or default_metrics_backend()
+        self.interval = interval
+        self.capacity = capacity
+        self.history = {name: RingBuffer(capacity) for name in self.SERIES}
+        self.cores = []
+        self.last = None
+        self.sample_cost = RingBuffer(64)
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _pct(prev, cur):
+        total = cur[1] - prev[1]
+        return 0.0 if total <= 0 else max(0.0, min(100.0, 100.0 * (1 - (cur[0] - prev[0]) / total)))
+
+    def tick(self):
+        t0 = time.perf_counter()
+        cur = self.backend.sample()
+        now = time.time()
+        prev, self.last = self.last, (now, cur)
+        if prev is not None:
+            dt = max(now - prev[0], 1e-6)
+            p = prev[1]
+            h = self.history
+            h["t"].append(now)
+            h["cpu"].append(self._pct(p["cpu"], cur["cpu"]))
+            h["mem"].append(100.0 * cur["mem_used"] / max(cur["mem_total"], 1))
+            h["disk_read"].append(max(0, cur["disk"][0] - p["disk"][0]) / dt)
+            h["disk_write"].append(max(0, cur["disk"][1] - p["disk"][1]) / dt)
+            h["net_rx"].append(max(0, cur["net"][0] - p["net"][0]) / dt)
+            h["net_tx"].append(max(0, cur["net"][1] - p["net"][1]) / dt)
+            if len(self.cores) != len(cur["cores"]):
+                self.cores = [RingBuffer(self.capacity) for _ in cur["cores"]]
+            for ring, a, b in zip(self.cores, p["cores"], cur["cores"]):
+                ring.append(self._pct(a, b))
+        self.sample_cost.append(time.perf_counter() - t0)
 
-FONTS = {
-    "h1": ("Segoe UI Variable Display", 20, "bold"),
-    "h2": ("Segoe UI Variable Text", 14, "bold"),
-    "body": ("Segoe UI Variable Text", 10),
-    "code": ("Consolas", 9)
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try: self.tick()
+            except Exception: pass
+            self._stop.wait(self.interval)
+
+    def current(self):
+        h = self.history
+        return {name: h[name].last() for name in self.SERIES} | {"cores": [c.last() for c in self.cores]}
+
+    def summary(self, since=0.0, until=None):
+        # Promedios de cada serie en la ventana [since, until]: sirve para medir antes/después
+        until = until or time.time()
+        ts = self.history["t"].values()
+        keep = [i for i, t in enumerate(ts) if since <= t <= until]
+        out = {"samples": len(keep)}
+        for name in self.SERIES[1:]:
+            vals = self.history[name].values()
+            out[name] = sum(vals[i] for i in keep) / len(keep) if keep else 0.0
+        return out
+
+def bench_sampler(n=1000, backend=None):
+    sampler = MetricsSampler(backend, capacity=n)
+    t0 = time.perf_counter()
+    for _ in range(n): sampler.tick()
+    return {"n": n, "per_sample_ms": (time.perf_counter() - t0) / n * 1000}
+
+# --- GESTOR DE PROCESOS (PRIORIDAD Y AFINIDAD) ---
+# Sube la prioridad (y opcionalmente fija núcleos) de los juegos configurados y
+# baja la de procesos pesados en segundo plano mientras haya un juego abierto.
+# Lo mueven los eventos de inicio/fin de proceso; si el backend no los ofrece,
+# un diff incremental de la tabla de PIDs (solo se lee el nombre de los nuevos).
+PROCESS_RULES = {
+    "games": ["cs2.exe", "valorant-win64-shipping.exe", "fortniteclient-win64-shipping.exe", "r5apex.exe",
+              "league of legends.exe", "overwatch.exe", "rocketleague.exe", "gta5.exe", "eldenring.exe", "cod.exe"],
+    "hogs": ["onedrive.exe", "searchindexer.exe", "searchprotocolhost.exe", "compattelrunner.exe", "steamwebhelper.exe",
+             "epicgameslauncher.exe", "dropbox.exe", "googledrivefs.exe", "ms-teams.exe", "backgroundtaskhost.exe"],
+    "game_priority": "high",
+    "game_cores": None, # p. ej. [2, 3, 4, 5]; None no toca la afinidad
+    "hog_priority": "below_normal",
 }
+PRIORITIES = ("idle", "below_normal", "normal", "above_normal", "high")
+
+def _proc_key(name):
+    name = name.lower()
+    return name[:-4] if name.endswith(".exe") else name
+
+def load_process_rules(path=None):
+    # Reglas por defecto + procesos.json en la carpeta de datos (si existe)
+    path = path or os.path.join(app_data_dir(), "procesos.json")
+    rules = dict(PROCESS_RULES)
+    try:
+        with open(path, encoding="utf-8") as f: rules.update(json.load(f))
+    except FileNotFoundError: pass
+    for key in ("game_priority", "hog_priority"):
+        if rules[key] not in PRIORITIES: raise ValueError(f"Prioridad no válida: {rules[key]}")
+    return rules
+
+class _QueueEvents:
+    # Fuente de eventos [(tipo, pid)] alimentada por otro hilo
+    def __init__(self, events, on_close=None):
+        self.events = events
+        self.on_close = on_close
+
+    def read(self, timeout):
+        try: batch = [self.events.get(timeout=timeout)]
+        except queue.Empty: return []
+        try:
+            while True: batch.append(self.events.get_nowait())
+        except queue.Empty: pass
+        if None in batch: raise OSError("Fuente de eventos cerrada")
+        return batch
+
+    def close(self):
+        if self.on_close: self.on_close()
+
+class NetlinkProcEvents:
+    # Linux: conector de procesos del kernel (requiere CAP_NET_ADMIN)
+    PROC_EVENT_EXEC, PROC_EVENT_EXIT = 0x2, 0x80000000
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, 11) # NETLINK_CONNECTOR
+        try:
+            self.sock.bind((0, 1)) # CN_IDX_PROC
+            # cn_msg (idx, val, seq, ack, len, flags) + PROC_CN_MCAST_LISTEN
+            msg = struct.pack("=IIIIHHI", 1, 1, 0, 0, 4, 0, 1)
+            self.sock.send(struct.pack("=IHHII", 16 + len(msg), 3, 0, 0, os.getpid()) + msg) # NLMSG_DONE
+        except OSError:
+            self.sock.close()
+            raise
+
+    def read(self, timeout):
+        import select
+        if not select.select([self.sock], [], [], timeout)[0]: return []
+        data = self.sock.recv(65536)
+        events, offset = [], 0
+        while offset + 16 <= len(data):
+            length = struct.unpack_from("=I", data, offset)[0]
+            if length < 16: break
+            body = offset + 16 + 20 # nlmsghdr + cn_msg
+            if body + 24 <= offset + length:
+                what = struct.unpack_from("=I", data, body)[0]
+                pid, tgid = struct.unpack_from("=II", data, body + 16)
+                if what == self.PROC_EVENT_EXEC: events.append(("start", tgid))
+                elif what == self.PROC_EVENT_EXIT and pid == tgid: events.append(("exit", tgid))
+            offset += (length + 3) & ~3
+        return events
+
+    def close(self):
+        self.sock.close()
+
+class ProcBackend:
+    # Linux: /proc, setpriority y sched_setaffinity (por hilo: se aplican a todas las tareas)
+    NICE = {"idle": 19, "below_normal": 10, "normal": 0, "above_normal": -5, "high": -10}
+
+    def __init__(self, root="/proc"):
+        self.root = root
+
+    def pids(self):
+        return {int(d) for d in os.listdir(self.root) if d.isdigit()}
+
+    def name(self, pid):
+        try:
+            with open(f"{self.root}/{pid}/comm", "rb") as f: comm = f.read().decode("utf-8", "replace").strip()
+        except OSError: return None
+        if len(comm) >= 15: # comm va truncado; argv[0] tiene el nombre completo
+            try:
+                with open(f"{self.root}/{pid}/cmdline", "rb") as f: argv0 = f.read().split(b"\0")[0]
+                if argv0: return os.path.basename(argv0.decode("utf-8", "replace"))
+            except OSError: pass
+        return comm
+
+    def _tasks(self, pid):
+        try: return [int(t) for t in os.listdir(f"{self.root}/{pid}/task")]
+        except OSError: return [pid]
+
+    def get_priority(self, pid):
+        return os.getpriority(os.PRIO_PROCESS, pid)
+
+    def set_priority(self, pid, level):
+        nice = self.NICE.get(level, level)
+        for tid in self._tasks(pid): os.setpriority(os.PRIO_PROCESS, tid, nice)
+
+    def get_affinity(self, pid):
+        return sorted(os.sched_getaffinity(pid))
+
+    def set_affinity(self, pid, cpus):
+        for tid in self._tasks(pid): os.sched_setaffinity(tid, cpus)
+
+    def events(self):
+        try: return NetlinkProcEvents()
+        except (OSError, AttributeError): return None
+
+class WinProcBackend:
+    # Windows: EnumProcesses/SetPriorityClass/SetProcessAffinityMask por ctypes;
+    # eventos de inicio/fin vía Win32_ProcessStartTrace en un PowerShell dedicado
+    CLASSES = {"idle": 0x40, "below_normal": 0x4000, "normal": 0x20, "above_normal": 0x8000, "high": 0x80}
+    QUERY, SET_INFO = 0x1000, 0x0200 # PROCESS_QUERY_LIMITED_INFORMATION, PROCESS_SET_INFORMATION
+    EVENTS_PS = ("Register-CimIndicationEvent -ClassName Win32_ProcessStartTrace -SourceIdentifier start | Out-Null; "
+                 "Register-CimIndicationEvent -ClassName Win32_ProcessStopTrace -SourceIdentifier exit | Out-Null; "
+                 "while ($true) { $e = Wait-Event; [Console]::Out.WriteLine(\"$($e.SourceIdentifier) $($e.SourceEventArgs.NewEvent.ProcessID)\"); "
+                 "[Console]::Out.Flush(); Remove-Event -EventIdentifier $e.EventIdentifier }")
+
+    def __init__(self):
+        global ctypes
+        import ctypes
+        from ctypes import wintypes
+        self.k32 = ctypes.windll.kernel32
+        self.k32.OpenProcess.restype = wintypes.HANDLE
+        self.k32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+        self.k32.CloseHandle.argtypes = [wintypes.HANDLE]
+        self.k32.QueryFullProcessImageNameW.argtypes = [wintypes.HANDLE, wintypes.DWORD, wintypes.LPWSTR, ctypes.POINTER(wintypes.DWORD)]
+        self.k32.GetPriorityClass.argtypes = [wintypes.HANDLE]
+        self.k32.SetPriorityClass.argtypes = [wintypes.HANDLE, wintypes.DWORD]
+        self.k32.GetProcessAffinityMask.argtypes = [wintypes.HANDLE, ctypes.POINTER(ctypes.c_size_t), ctypes.POINTER(ctypes.c_size_t)]
+        self.k32.SetProcessAffinityMask.argtypes = [wintypes.HANDLE, ctypes.c_size_t]
+        self.pid_buf = (wintypes.DWORD * 4096)()
+        self.name_buf = ctypes.create_unicode_buffer(1024)
+
+    def pids(self):
+        from ctypes import wintypes
+        needed = wintypes.DWORD()
+        while True:
+            size = ctypes.sizeof(self.pid_buf)
+            if not self.k32.K32EnumProcesses(self.pid_buf, size, ctypes.byref(needed)): raise OSError("EnumProcesses falló")
+            if needed.value < size: break
+            self.pid_buf = (wintypes.DWORD * (len(self.pid_buf) * 2))()
+        return set(self.pid_buf[:needed.value // 4]) - {0}
+
+    def _open(self, pid, access):
+        h = self.k32.OpenProcess(access, False, pid)
+        if not h: raise OSError(f"No se pudo abrir el proceso {pid}")
+        return h
+
+    def name(self, pid):
+        from ctypes import wintypes
+        try: h = self._open(pid, self.QUERY)
+        except OSError: return None
+        try:
+            size = wintypes.DWORD(len(self.name_buf))
+            if not self.k32.QueryFullProcessImageNameW(h, 0, self.name_buf, ctypes.byref(size)): return None
+            return os.path.basename(self.name_buf.value)
+        finally: self.k32.CloseHandle(h)
+
+    def get_priority(self, pid):
+        h = self._open(pid, self.QUERY)
+        try: return self.k32.GetPriorityClass(h)
+        finally: self.k32.CloseHandle(h)
+
+    def set_priority(self, pid, level):
+        h = self._open(pid, self.SET_INFO)
+        try:
+            if not self.k32.SetPriorityClass(h, self.CLASSES.get(level, level)): raise OSError(f"SetPriorityClass falló ({pid})")
+        finally: self.k32.CloseHandle(h)
+
+    def get_affinity(self, pid):
+        mask, system = ctypes.c_size_t(), ctypes.c_size_t()
+        h = self._open(pid, self.QUERY)
+        try: self.k32.GetProcessAffinityMask(h, ctypes.byref(mask), ctypes.byref(system))
+        finally: self.k32.CloseHandle(h)
+        return [i for i in range(64) if mask.value >> i & 1]
+
+    def set_affinity(self, pid, cpus):
+        h = self._open(pid, self.SET_INFO | self.QUERY)
+        try:
+            if not self.k32.SetProcessAffinityMask(h, sum(1 << c for c in cpus)): raise OSError(f"SetProcessAffinityMask falló ({pid})")
+        finally: self.k32.CloseHandle(h)
+
+    def events(self):
+        try:
+            proc = subprocess.Popen(["powershell", "-NoProfile", "-NonInteractive", "-Command", self.EVENTS_PS],
+                                    stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                    text=True, creationflags=subprocess.CREATE_NO_WINDOW)
+        except OSError: return None
+        count_proc()
+        events = queue.Queue()
+
+        def pump():
+            try:
+                for line in proc.stdout:
+                    kind, _, pid = line.strip().partition(" ")
+                    if kind in ("start", "exit") and pid.isdigit(): events.put((kind, int(pid)))
+            except (OSError, ValueError): pass
+            events.put(None) # sin permisos o PowerShell caído: el gestor pasa a sondeo
+
+        threading.Thread(target=pump, daemon=True).start()
+        return _QueueEvents(events, proc.kill)
+
+class MemoryProcesses:
+    # Tabla de procesos en memoria para pruebas; emite eventos como un backend real
+    def __init__(self, events=True):
+        self.procs = {}
+        self.next_pid = 1000
+        self.name_reads = 0
+        self.queue = queue.Queue() if events else None
+
+    def spawn(self, name, priority="normal"):
+        self.next_pid += 1
+        self.procs[self.next_pid] = {"name": name, "priority": priority, "affinity": list(range(os.cpu_count() or 1))}
+        if self.queue: self.queue.put(("start", self.next_pid))
+        return self.next_pid
+
+    def kill(self, pid):
+        self.procs.pop(pid, None)
+        if self.queue: self.queue.put(("exit", pid))
+
+    def pids(self): return set(self.procs)
+
+    def name(self, pid):
+        self.name_reads += 1
+        proc = self.procs.get(pid)
+        return proc["name"] if proc else None
+
+    def get_priority(self, pid): return self.procs[pid]["priority"]
+    def set_priority(self, pid, level): self.procs[pid]["priority"] = level
+    def get_affinity(self, pid): return list(self.procs[pid]["affinity"])
+    def set_affinity(self, pid, cpus): self.procs[pid]["affinity"] = list(cpus)
+
+    def events(self):
+        return _QueueEvents(self.queue) if self.queue else None
+
+def default_process_backend():
+    return WinProcBackend() if os.name == "nt" else ProcBackend()
+
+class ProcessManager:
+    def __init__(self, backend=None, rules=None, log=None, interval=2.0, resync_every=30.0, use_events=True):
+        self.backend = backend or default_process_backend()
+        self.rules = {**PROCESS_RULES, **(rules or {})}
+        self.games = {_proc_key(n) for n in self.rules["games"]}
+        self.hogs = {_proc_key(n) for n in self.rules["hogs"]}
+        self.log = log or _no_log
+        self.interval = interval
+        self.resync_every = resync_every # red de seguridad en modo eventos
+        self.use_events = use_events
+        self.known = {}   # pid -> nombre normalizado
+        self.active = {}  # pid de juego -> (prioridad, afinidad) originales
+        self.lowered = {} # pid en segundo plano -> prioridad original
+        self.stats = {"mode": None, "events": 0, "resyncs": 0, "name_reads": 0, "errors": 0, "cpu_s": 0.0}
+        self._stop = threading.Event()
+        self._thread = None
+        self._exit_hook = False
+
+    def resync(self):
+        # Diff incremental: solo los PIDs nuevos cuestan una lectura de nombre
+        self.stats["resyncs"] += 1
+        current = self.backend.pids()
+        for pid in [p for p in self.known if p not in current]: self.on_exit(pid)
+        for pid in current:
+            if pid not in self.known: self.on_start(pid)
+
+    def on_start(self, pid):
+        if pid in self.known: self.on_exit(pid) # exec: el PID cambia de programa
+        name = self.backend.name(pid)
+        self.stats["name_reads"] += 1
+        if name is None: return
+        key = self.known[pid] = _proc_key(name)
+        if key in self.games: self._boost(pid, name)
+        elif key in self.hogs and self.active: self._lower(pid)
+
+    def on_exit(self, pid):
+        self.known.pop(pid, None)
+        self.lowered.pop(pid, None)
+        if self.active.pop(pid, None) is not None and not self.active:
+            self.log("Sin juegos abiertos: se restaura la prioridad de los procesos en segundo plano", fid="procs")
+            self._restore_hogs()
+
+    def _try(self, fn, *args):
+        try:
+            fn(*args)
+            return True
+        except Exception:
+            self.stats["errors"] += 1
+            return False
+
+    def _boost(self, pid, name):
+        try: original = (self.backend.get_priority(pid), self.backend.get_affinity(pid))
+        except Exception:
+            self.stats["errors"] += 1
+            return
+        first = not self.active
+        self.active[pid] = original
+        ok = self._try(self.backend.set_priority, pid, self.rules["game_priority"])
+        if self.rules["game_cores"]: ok = self._try(self.backend.set_affinity, pid, self.rules["game_cores"]) and ok
+        self.log(f"Juego detectado: {name} ({pid}) -> prioridad {self.rules['game_priority']}" + ("" if ok else " (parcial)"),
+                 "SUCCESS" if ok else "WARNING", "procs")
+        if first:
+            for other, key in list(self.known.items()):
+                if key in self.hogs: self._lower(other)
+            if self.lowered: self.log(f"{len(self.lowered)} procesos en segundo plano con prioridad {self.rules['hog_priority']}", fid="procs")
+
+    def _lower(self, pid):
+        if pid in self.lowered: return
+        try: self.lowered[pid] = self.backend.get_priority(pid)
+        except Exception:
+            self.stats["errors"] += 1
+            return
+        if not self._try(self.backend.set_priority, pid, self.rules["hog_priority"]): self.lowered.pop(pid, None)
+
+    def _restore_hogs(self):
+        for pid, original in self.lowered.items():
+            if self.known.get(pid) in self.hogs: self._try(self.backend.set_priority, pid, original)
+        self.lowered.clear()
+
+    def restore_all(self):
+        for pid, (priority, affinity) in self.active.items():
+            self._try(self.backend.set_priority, pid, priority)
+            if self.rules["game_cores"]: self._try(self.backend.set_affinity, pid, affinity)
+        self.active.clear()
+        self._restore_hogs()
+
+    def _loop(self):
+        t_cpu = time.thread_time()
+        source = None
+        if self.use_events:
+            try: source = self.backend.events()
+            except Exception: source = None
+        self.stats["mode"] = "eventos" if source else "sondeo"
+        self.resync()
+        last = time.monotonic()
+        while not self._stop.is_set():
+            if source is not None:
+                try: events = source.read(1.0)
+                except OSError:
+                    source.close()
+                    source = None
+                    self.stats["mode"] = "sondeo"
+                    continue
+                for kind, pid in events:
+                    self.stats["events"] += 1
+                    if kind == "start": self.on_start(pid)
+                    else: self.on_exit(pid)
+                if time.monotonic() - last >= self.resync_every:
+                    self.resync()
+                    last = time.monotonic()
+            else:
+                if self._stop.wait(self.interval): break
+                self.resync()
+            self.stats["cpu_s"] = time.thread_time() - t_cpu
+        if source is not None: source.close()
+        self.restore_all()
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        if not self._exit_hook:
+            # El hilo es daemon: sin esto, al salir se quedarían juegos y procesos con la prioridad cambiada
+            atexit.register(self.stop)
+            self._exit_hook = True
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread: self._thread.join(timeout)
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+def bench_procs(n=2000, churn=200, backend=None):
+    # Coste del diff incremental frente a releer todos los nombres, y del resync en el sistema real
+    fake = MemoryProcesses(events=False)
+    for i in range(n): fake.spawn(f"proc{i}.exe")
+    manager = ProcessManager(fake, use_events=False)
+    manager.resync()
+    for pid in list(fake.procs)[:churn]: fake.kill(pid)
+    for i in range(churn): fake.spawn("cs2.exe" if i == 0 else f"nuevo{i}.exe")
+    fake.name_reads = 0
+    t0 = time.perf_counter()
+    manager.resync()
+    diff_ms = (time.perf_counter() - t0) * 1000
+    out = {"n": n, "churn": churn, "diff_ms": diff_ms, "diff_name_reads": fake.name_reads, "boosted": len(manager.active)}
+    real = backend or default_process_backend()
+    manager = ProcessManager(real, rules={"games": [], "hogs": []}, use_events=False)
+    t0 = time.perf_counter()
+    manager.resync()
+    out["real_first_ms"] = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    manager.resync()
+    out["real_resync_ms"] = (time.perf_counter() - t0) * 1000
+    out["real_processes"] = len(manager.known)
+    return out
+
+# --- TRAZAS DE EJECUCIÓN ---
+# Spans con inicio, duración, resultado y procesos lanzados por el hilo. Sin
+# traza activa, trace() devuelve un span compartido que no hace nada; con traza,
+# se exporta en formato Chrome trace-event (chrome://tracing, Perfetto) y como
+# tabla resumen.
+class _NullSpan:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def set(self, ok=None, **args): pass
+
+_NULL_SPAN = _NullSpan()
+
+class Span:
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.ok = True
+
+    def __enter__(self):
+        self.procs = self.tracer.procs()
+        self.t0 = time.perf_counter()
+        return self
+
+    def set(self, ok=None, **args):
+        if ok is not None: self.ok = bool(ok)
+        self.args.update(args)
+
+    def __exit__(self, exc_type, exc, tb):
+        took = time.perf_counter() - self.t0
+        if exc_type is not None:
+            self.ok = False
+            self.args["error"] = str(exc)
+        self.tracer.add(self.name, self.cat, self.t0, took, self.ok, self.tracer.procs() - self.procs, self.args)
+        return False
+
+class Tracer:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.started = time.time()
+        self.events = []
+        self._local = threading.local()
+
+    def procs(self):
+        return getattr(self._local, "procs", 0)
+
+    def count_proc(self):
+        self._local.procs = self.procs() + 1
+
+    def add(self, name, cat, t0, took, ok, procs, args):
+        # list.append es atómico: no hace falta lock entre hilos
+        self.events.append({"name": name, "cat": cat, "start": t0 - self.t0, "dur": took, "ok": ok,
+                            "procs": procs, "tid": threading.get_ident(), "args": args})
+
+    def chrome(self):
+        pid = os.getpid()
+        events = [{"name": e["name"], "cat": e["cat"], "ph": "X", "pid": pid, "tid": e["tid"],
+                   "ts": round(e["start"] * 1e6, 1), "dur": round(e["dur"] * 1e6, 1),
+                   "args": {**e["args"], "ok": e["ok"], "procs": e["procs"]}} for e in self.events]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"started": self.started}}
+
+    def export(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f: json.dump(self.chrome(), f, ensure_ascii=False, default=str)
+        return path
+
+    def summary(self):
+        # Agregado por nombre, ordenado por tiempo total
+        rows = {}
+        for e in self.events:
+            r = rows.setdefault(e["name"], {"name": e["name"], "cat": e["cat"], "count": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0, "procs": 0})
+            r["count"] += 1
+            r["total_ms"] += e["dur"] * 1000
+            r["max_ms"] = max(r["max_ms"], e["dur"] * 1000)
+            r["errors"] += not e["ok"]
+            r["procs"] += e["procs"]
+        return sorted(rows.values(), key=lambda r: -r["total_ms"])
+
+    def table(self):
+        lines = [f"{'span':<40} {'n':>4} {'total ms':>10} {'media ms':>9} {'max ms':>9} {'err':>4} {'procs':>5}"]
+        for r in self.summary():
+            lines.append(f"{r['name'][:40]:<40} {r['count']:>4} {r['total_ms']:>10.1f} {r['total_ms'] / r['count']:>9.1f} "
+                         f"{r['max_ms']:>9.1f} {r['errors']:>4} {r['procs']:>5}")
+        return "\n".join(lines)
+
+TRACER = None
+
+def trace(name, cat="run", **args):
+    tracer = TRACER
+    if tracer is None: return _NULL_SPAN
+    return Span(tracer, name, cat, args)
+
+def count_proc():
+    if TRACER is not None: TRACER.count_proc()
+
+def start_trace():
+    global TRACER
+    TRACER = Tracer()
+    return TRACER
+
+def stop_trace():
+    global TRACER
+    tracer, TRACER = TRACER, None
+    return tracer
+
+def bench_trace(n=100000):
+    # Coste por span con la traza desactivada y activada
+    def loop():
+        t0 = time.perf_counter()
+        for _ in range(n):
+            with trace("bench", "bench", i=1) as sp: sp.set(True)
+        return (time.perf_counter() - t0) / n * 1e9
+    off = loop()
+    start_trace()
+    try: on = loop()
+    finally: stop_trace()
+    return {"n": n, "disabled_ns": off, "enabled_ns": on}
 
 # --- CLASE DE UTILIDADES DEL SISTEMA ---
 class SystemUtils:
     @staticmethod
     def is_admin():
         try:
+            import ctypes
             return ctypes.windll.shell32.IsUserAnAdmin()
         except:
             return False
 
+    _pool = None
+    _pool_lock = threading.Lock()
+
     @staticmethod
-    def run_ps(cmd):
-        try:
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            process = subprocess.Popen(
-                ["powershell", "-NoProfile", "-Command", cmd],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                startupinfo=startupinfo, text=True, creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            stdout, stderr = process.communicate()
-            return True, stdout.strip()
-        except Exception as e:
-            return False, str(e)
+    def configure_pool(transport=None, size=2):
+        with SystemUtils._pool_lock:
+            if SystemUtils._pool: SystemUtils._pool.close()
+            SystemUtils._pool = ShellPool(transport, size)
+        return SystemUtils._pool
+
+    @staticmethod
+    def pool():
+        if SystemUtils._pool is None:
+            with SystemUtils._pool_lock:
+                if SystemUtils._pool is None:
+                    SystemUtils._pool = ShellPool()
+                    atexit.register(lambda: SystemUtils._pool and SystemUtils._pool.close())
+        return SystemUtils._pool
+
+    @staticmethod
+    @contextlib.contextmanager
+    def backends(registry=None, shell=None, startup=None, journal=None):
+        # Sustituye temporalmente registro, shell (pool), backend de inicio y journal.
+        # None = el backend real por defecto (journal: ninguno).
+        saved = SystemUtils.registry, SystemUtils._pool, SystemUtils.startup, SystemUtils.journal
+        SystemUtils.registry, SystemUtils._pool, SystemUtils.startup, SystemUtils.journal = registry, shell, startup, journal
+        try: yield
+        finally: SystemUtils.registry, SystemUtils._pool, SystemUtils.startup, SystemUtils.journal = saved
+
+    @staticmethod
+    def run_ps(cmd, timeout=None):
+        with trace("run_ps", "ps") as span:
+            try:
+                ok, out = SystemUtils.pool().run(cmd, timeout)
+            except Exception as e:
+                ok, out = False, str(e)
+            span.set(ok)
+        return ok, out
+
+    registry = None
+    journal = None
+
+    @staticmethod
+    def reg():
+        if SystemUtils.registry is None: SystemUtils.registry = WinRegistry()
+        return SystemUtils.registry
+
+    @staticmethod
+    def set_reg(key_root, path, name, value, reg_type, fid=None):
+        return SystemUtils.set_reg_many(key_root, path, [(name, value, reg_type)], {name: fid} if fid else None)
 
     @staticmethod
-    def set_reg(key_root, path, name, value, reg_type):
+    def set_reg_many(key_root, path, values, fids=None):
+        with trace("set_reg", "reg", key=f"{key_root}\\{path}", values=len(values)) as span:
+            ok, msg = SystemUtils._set_reg_many(key_root, path, values, fids)
+            span.set(ok)
+        return ok, msg
+
+    @staticmethod
+    def _set_reg_many(key_root, path, values, fids=None):
+        # Abre (o crea) la clave una sola vez y escribe todos sus valores.
+        # Con journal activo, los valores previos quedan en disco antes de escribir.
         try:
-            try: winreg.CreateKey(key_root, path)
-            except: pass
-            with winreg.OpenKey(key_root, path, 0, winreg.KEY_SET_VALUE) as key:
-                winreg.SetValueEx(key, name, 0, reg_type, value)
-            return True, f"Registro OK: {name} -> {value}"
+            journal = SystemUtils.journal
+            before = (lambda prev: journal.record_set(key_root, path, prev, fids)) if journal else None
+            SystemUtils.reg().set_values(key_root, path, values, before)
+            if len(values) == 1:
+                return True, f"Registro OK: {values[0][0]} -> {values[0][1]}"
+            return True, f"Registro OK: {path} ({len(values)} valores)"
         except Exception as e:
             return False, f"Error Reg: {e}"
 
     @staticmethod
-    def delete_reg_key(key_root, path):
+    def delete_reg_values(key_root, path, names, fid=None):
+        # Guarda los valores en el journal (como si se escribieran) antes de borrarlos
+        with trace("delete_reg_values", "reg", key=f"{key_root}\\{path}") as span:
+            try:
+                registry = SystemUtils.reg()
+                prev = registry.get_values(key_root, path, names) or {}
+                if SystemUtils.journal and prev: SystemUtils.journal.record_set(key_root, path, prev, {n: fid for n in prev})
+                registry.delete_values(key_root, path, names)
+                ok, msg = True, f"Valores eliminados: {path}"
+            except Exception as e:
+                ok, msg = False, f"Error Reg: {e}"
+            span.set(ok)
+        return ok, msg
+
+    @staticmethod
+    def delete_reg_key(key_root, path, fid=None):
+        with trace("delete_reg_key", "reg", key=f"{key_root}\\{path}") as span:
+            try:
+                journal = SystemUtils.journal
+                before = (lambda values: journal.record_delete(key_root, path, values, fid)) if journal else None
+                SystemUtils.reg().delete_key(key_root, path, before)
+                ok, msg = True, f"Clave eliminada: {path}"
+            except:
+                ok, msg = False, "Clave no encontrada o error"
+            span.set(ok)
+        return ok, msg
+
+    startup = None
+
+    @staticmethod
+    def startup_backend():
+        if SystemUtils.startup is None: SystemUtils.startup = WinStartup()
+        return SystemUtils.startup
+
+    @staticmethod
+    def undo_actions(kind, records):
+        if kind == "startup": return SystemUtils.startup_backend().restore(records)
+        if kind == "ps": return restore_ps_state(records)
+        return 0
+
+    @staticmethod
+    def undo(run=None, fid=None):
+        if SystemUtils.journal is None: return False, "Journal no disponible"
         try:
-            winreg.DeleteKey(key_root, path)
-            return True, f"Clave eliminada: {path}"
-        except:
-            return False, "Clave no encontrada o error"
-
-# --- COMPONENTES UI PERSONALIZADOS ---
-class ToggleSwitch(tk.Canvas):
-    def __init__(self, parent, variable, command=None):
-        super().__init__(parent, width=50, height=26, bg=COLORS["bg_sec"], highlightthickness=0)
-        self.variable = variable
-        self.command = command
-        self.variable.trace_add("write", lambda *args: self.animate())
-        self.draw()
-        self.bind("<Button-1>", lambda e: self.toggle())
-
-    def draw(self):
-        self.delete("all")
-        state = self.variable.get()
-        fill = COLORS["success"] if state else COLORS["bg_ter"]
-        self.create_oval(2, 2, 24, 24, fill=fill, outline="")
-        self.create_rectangle(13, 2, 37, 24, fill=fill, outline="")
-        self.create_oval(26, 2, 48, 24, fill=fill, outline="")
-        kx = 28 if state else 4
-        self.create_oval(kx, 4, kx+18, 22, fill="white", outline="")
-
-    def animate(self):
-        self.draw()
-
-    def toggle(self):
-        self.variable.set(not self.variable.get())
-        if self.command: self.command()
-
-class ModernButton(tk.Canvas):
-    def __init__(self, parent, text, command=None, width=150, height=40, bg_color=COLORS["accent"]):
-        super().__init__(parent, width=width, height=height, bg=parent["bg"] if "bg" in parent.keys() else COLORS["bg_main"], highlightthickness=0)
-        self.command = command
-        self.bg_color = bg_color
-        self.text = text
-        self.draw()
-        self.bind("<Enter>", self.on_enter)
-        self.bind("<Leave>", self.on_leave)
-        self.bind("<Button-1>", self.on_click)
-
-    def draw(self, hover=False):
-        self.delete("all")
-        fill = COLORS["accent_hover"] if hover else self.bg_color
-        # Rounded Rect manual
-        r = 10
-        w, h = int(self['width']), int(self['height'])
-        self.create_polygon(
-            r,0, w-r,0, w,0, w,r, w,h-r, w,h, w-r,h, r,h, 0,h, 0,h-r, 0,r, 0,0,
-            smooth=True, fill=fill
-        )
-        self.create_text(w/2, h/2, text=self.text, fill="white", font=FONTS["h2"])
+            run, n, missing = SystemUtils.journal.undo(SystemUtils.reg(), run, fid, SystemUtils.undo_actions)
+        except Exception as e:
+            return False, f"Error al deshacer: {e}"
+        if run is None: return False, "No hay cambios para deshacer"
+        if missing: return False, f"Deshecho {run}: {n} valores restaurados; sin estado previo, no se pueden deshacer: {', '.join(missing)}"
+        return True, f"Deshecho {run}: {n} valores restaurados"
 
-    def on_enter(self, e): self.draw(hover=True); self.config(cursor="hand2")
-    def on_leave(self, e): self.draw(hover=False); self.config(cursor="")
-    def on_click(self, e): 
-        if self.command: self.command()
+# --- CATÁLOGO DE TWEAKS ---
+FEATURES = [
+    # --- GAMING ---
+    {"id": "ult_perf", "cat": "gaming", "name": "Plan Máximo Rendimiento", "desc": "Desbloquea el plan oculto de energía."},
+    {"id": "game_mode", "cat": "gaming", "name": "Forzar Modo Juego", "desc": "Prioriza juegos en la CPU."},
+    {"id": "gpu_sched", "cat": "gaming", "name": "GPU Scheduling (HAGS)", "desc": "Reduce latencia de GPU (Requiere Reinicio)."},
+    {"id": "fso_disable", "cat": "gaming", "name": "Desactivar Opt. Pantalla Completa", "desc": "Arregla stuttering en juegos viejos."},
+    {"id": "mouse_fix", "cat": "gaming", "name": "Fix Aceleración Mouse", "desc": "Desactiva 'Mejorar precisión del puntero' para aim real."},
+    {"id": "kb_delay", "cat": "gaming", "name": "Reducir Input Lag Teclado", "desc": "Baja el delay de repetición en el registro."},
+    {"id": "power_throt", "cat": "gaming", "name": "Desactivar Power Throttling", "desc": "Evita que Windows baje frecuencias para ahorrar luz."},
 
-# --- APLICACIÓN PRINCIPAL ---
-class DrVichoApp:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("DrVicho Optimizer v5.0 GOD MODE")
-        self.root.geometry("1200x850")
-        self.root.configure(bg=COLORS["bg_main"])
-        
-        # Dark Title Bar Hack
-        try:
-            root.update()
-            ctypes.windll.dwmapi.DwmSetWindowAttribute(
-                ctypes.windll.user32.GetParent(root.winfo_id()), 20, ctypes.byref(ctypes.c_int(2)), 4)
-        except: pass
-
-        self.features = self.load_features()
-        self.vars = {f["id"]: tk.BooleanVar(value=False) for f in self.features}
-        
-        self.setup_layout()
-        self.start_monitoring()
-
-    def setup_layout(self):
-        # --- HEADER ---
-        header = tk.Frame(self.root, bg=COLORS["bg_main"], height=60)
-        header.pack(fill="x", padx=20, pady=15)
-        
-        tk.Label(header, text="⚡ DrVicho", font=("Segoe UI", 26, "bold"), fg=COLORS["accent"], bg=COLORS["bg_main"]).pack(side="left")
-        tk.Label(header, text="OPTIMIZER v5.0", font=("Segoe UI", 12, "bold"), fg=COLORS["text_sec"], bg=COLORS["bg_main"]).pack(side="left", padx=10, pady=(10,0))
-        
-        # Stats Widget (Top Right)
-        self.stats_label = tk.Label(header, text="CPU: ... | RAM: ...", font=FONTS["code"], fg=COLORS["success"], bg=COLORS["bg_sec"], padx=10, pady=5)
-        self.stats_label.pack(side="right")
-
-        # --- TABS CONTAINER ---
-        style = ttk.Style()
-        style.theme_use('default')
-        style.configure('TNotebook', background=COLORS["bg_main"], borderwidth=0)
-        style.configure('TNotebook.Tab', background=COLORS["bg_sec"], foreground=COLORS["text_sec"], padding=[20, 10], font=FONTS["body"])
-        style.map('TNotebook.Tab', background=[('selected', COLORS["accent"])], foreground=[('selected', 'white')])
-
-        self.notebook = ttk.Notebook(self.root, style='TNotebook')
-        self.notebook.pack(fill="both", expand=True, padx=20, pady=10)
-
-        # Crear Pestañas
-        self.tab_gaming = self.create_tab("🎮 Gaming & FPS")
-        self.tab_win11 = self.create_tab("🎨 Windows UI")
-        self.tab_network = self.create_tab("🌐 Red & Ping")
-        self.tab_privacy = self.create_tab("🛡️ Privacidad")
-        self.tab_maintenance = self.create_tab("🧹 Mantenimiento")
-
-        # Rellenar Pestañas con Features
-        self.populate_tab(self.tab_gaming, "gaming")
-        self.populate_tab(self.tab_win11, "win11")
-        self.populate_tab(self.tab_network, "network")
-        self.populate_tab(self.tab_privacy, "privacy")
-        
-        # Pestaña Mantenimiento (Botones especiales)
-        self.populate_maintenance_tab()
-
-        # --- LOG CONSOLE & ACTION BAR ---
-        bottom_panel = tk.Frame(self.root, bg=COLORS["bg_main"])
-        bottom_panel.pack(fill="x", padx=20, pady=20)
-
-        # Consola
-        self.console = scrolledtext.ScrolledText(bottom_panel, height=8, bg=COLORS["bg_ter"], fg=COLORS["text_main"], font=FONTS["code"], state='disabled', bd=0)
-        self.console.pack(side="left", fill="both", expand=True, padx=(0, 20))
-
-        # Botón Acción
-        action_frame = tk.Frame(bottom_panel, bg=COLORS["bg_main"])
-        action_frame.pack(side="right", fill="y")
-        
-        self.btn_run = ModernButton(action_frame, "APLICAR CAMBIOS", command=self.run_process, width=220, height=60)
-        self.btn_run.pack()
-
-    def create_tab(self, title):
-        frame = tk.Frame(self.notebook, bg=COLORS["bg_main"])
-        self.notebook.add(frame, text=title)
-        
-        # Scroll setup inside tab
-        canvas = tk.Canvas(frame, bg=COLORS["bg_main"], highlightthickness=0)
-        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=canvas.yview)
-        scroll_frame = tk.Frame(canvas, bg=COLORS["bg_main"])
-        
-        scroll_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        canvas.create_window((0, 0), window=scroll_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side="left", fill="both", expand=True, padx=20, pady=20)
-        scrollbar.pack(side="right", fill="y")
-        
-        return scroll_frame
-
-    def populate_tab(self, parent, category):
-        items = [f for f in self.features if f["cat"] == category]
-        row = 0
-        col = 0
-        
+    # --- WINDOWS 11 UI ---
+    {"id": "classic_ctx", "cat": "win11", "name": "Menú Contextual Clásico", "desc": "Devuelve el clic derecho de Windows 10 (Requiere Reinicio)."},
+    {"id": "snap_assist", "cat": "win11", "name": "Desactivar Snap Assist", "desc": "Quita la sugerencia de ventanas molesta."},
+    {"id": "widgets_kill", "cat": "win11", "name": "Eliminar Widgets y Chat", "desc": "Libera RAM de la barra de tareas."},
+    {"id": "transparency", "cat": "win11", "name": "Desactivar Transparencias", "desc": "Interfaz opaca para mayor rendimiento."},
+    
+    # --- RED ---
+    {"id": "dns_cloud", "cat": "network", "name": "DNS Rápido", "desc": "Cloudflare (1.1.1.1) o los 2 más rápidos según el benchmark."},
+    {"id": "tcp_nagle", "cat": "network", "name": "Desactivar Nagle (TCP)", "desc": "Reduce ping enviando paquetes más rápido."},
+    {"id": "net_throt", "cat": "network", "name": "Quitar Límite de Red", "desc": "Elimina el throttling de Windows para multimedia."},
+
+    # --- PRIVACIDAD ---
+    {"id": "telemetry", "cat": "privacy", "name": "Bloquear Telemetría", "desc": "Detiene el servicio DiagTrack."},
+    {"id": "activity", "cat": "privacy", "name": "Sin Historial de Actividad", "desc": "Windows no recordará qué apps abriste."},
+    {"id": "location", "cat": "privacy", "name": "Desactivar Geolocalización", "desc": "Impide que apps sepan tu ubicación."},
+]
+
+def dns_tweak(servers):
+    quoted = ", ".join(f"'{s}'" for s in servers)
+    return {
+        "servers": list(servers),
+        "ps": f"$__adapters | Where-Object Status -eq 'Up' | Set-DnsClientServerAddress -ServerAddresses {quoted}",
+        "probe": "$__up = @($__adapters | Where-Object Status -eq 'Up'); $__up.Count -gt 0 -and @($__up | ForEach-Object { "
+                 f"(@((Get-DnsClientServerAddress -InterfaceIndex $_.ifIndex -AddressFamily IPv4).ServerAddresses)[0..{len(servers) - 1}] -join ',') -eq '{','.join(servers)}' }}) -notcontains $false",
+        # Servidores previos por adaptador; sin servidores fijos se vuelve a DHCP
+        "save": "@($__adapters | Where-Object Status -eq 'Up' | ForEach-Object { @{i = $_.ifIndex; s = @((Get-DnsClientServerAddress -InterfaceIndex $_.ifIndex -AddressFamily IPv4).ServerAddresses)} })",
+        "undo": "@($prev) | ForEach-Object { if (@($_.s).Count) { Set-DnsClientServerAddress -InterfaceIndex $_.i -ServerAddresses @($_.s) } "
+                "else { Set-DnsClientServerAddress -InterfaceIndex $_.i -ResetServerAddresses } }",
+    }
+
+def set_dns_servers(servers):
+    # Valida las IPs antes de meterlas en el script PowerShell
+    import ipaddress
+    servers = [str(ipaddress.ip_address(s)) for s in servers]
+    if not servers: raise ValueError("Sin servidores DNS")
+    TWEAKS["dns_cloud"].update(dns_tweak(servers))
+    return servers
+
+# "reg": valores de registro (hive, ruta, nombre, valor, tipo)
+# "ps": bloque PowerShell; "needs": trabajo compartido que el bloque reutiliza
+# "res": recursos que toca el bloque PS (servicios, adaptadores, etc.)
+# "probe": expresión PS que indica si el tweak ya está aplicado; "watch":
+# claves de registro cuyo cambio invalida ese estado
+# "save": expresión PS con el estado previo (se guarda en el journal como JSON);
+# "undo": bloque PS que lo restaura a partir de $prev
+TWEAKS = {
+    "ult_perf": {
+        "res": ["power:scheme"],
+        "ps": "powercfg -duplicatescheme e9a42b02-d5df-448d-aa00-03f14749eb61 | Out-Null; powercfg -setactive e9a42b02-d5df-448d-aa00-03f14749eb61",
+        "save": "[regex]::Match((powercfg /getactivescheme), '[0-9a-fA-F]{8}(-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}').Value",
+        "undo": "if ($prev) { powercfg -setactive $prev }",
+        "probe": "(powercfg /getactivescheme) -match 'e9a42b02|Ultimate Performance|ximo rendimiento'",
+        "watch": [("HKLM", r"SYSTEM\CurrentControlSet\Control\Power\User\PowerSchemes")],
+    },
+    "game_mode": {"reg": [("HKCU", r"Software\Microsoft\GameBar", "AllowAutoGameMode", 1, "REG_DWORD")]},
+    "gpu_sched": {"reg": [("HKLM", r"SYSTEM\CurrentControlSet\Control\GraphicsDrivers", "HwSchMode", 2, "REG_DWORD")]},
+    "fso_disable": {"reg": [("HKCU", r"System\GameConfigStore", "GameDVR_FSEBehaviorMode", 2, "REG_DWORD")]},
+    "mouse_fix": {"reg": [
+        ("HKCU", r"Control Panel\Mouse", "MouseSpeed", "0", "REG_SZ"),
+        ("HKCU", r"Control Panel\Mouse", "MouseThreshold1", "0", "REG_SZ"),
+        ("HKCU", r"Control Panel\Mouse", "MouseThreshold2", "0", "REG_SZ"),
+    ]},
+    # Ajustes pro-gamer para teclado
+    "kb_delay": {"reg": [
+        ("HKCU", r"Control Panel\Keyboard", "KeyboardDelay", "0", "REG_SZ"),
+        ("HKCU", r"Control Panel\Keyboard", "KeyboardSpeed", "31", "REG_SZ"),
+    ]},
+    "power_throt": {"reg": [("HKLM", r"SYSTEM\CurrentControlSet\Control\Power\PowerThrottling", "PowerThrottlingOff", 1, "REG_DWORD")]},
+    # El comando mágico para Win11 (equivale a reg add ... /f /ve)
+    "classic_ctx": {"reg": [("HKCU", r"Software\Classes\CLSID\{86ca1aa0-34aa-4e8b-a509-50c905bae2a2}\InprocServer32", "", "", "REG_SZ")]},
+    "snap_assist": {"reg": [("HKCU", r"Control Panel\Desktop", "WindowArrangementActive", "0", "REG_SZ")]},
+    "widgets_kill": {"reg": [
+        ("HKCU", r"Software\Microsoft\Windows\CurrentVersion\Explorer\Advanced", "TaskbarDa", 0, "REG_DWORD"),
+        ("HKLM", r"SOFTWARE\Policies\Microsoft\Windows\Windows Chat", "ChatIcon", 3, "REG_DWORD"),
+    ]},
+    "transparency": {"reg": [("HKCU", r"Software\Microsoft\Windows\CurrentVersion\Themes\Personalize", "EnableTransparency", 0, "REG_DWORD")]},
+    # Servidores configurables con set_dns_servers() (p. ej. tras el benchmark de DNS)
+    "dns_cloud": {
+        "needs": ["adapters"], "res": ["net:adapters"],
+        **dns_tweak(["1.1.1.1", "1.0.0.1"]),
+        "watch": [("HKLM", r"SYSTEM\CurrentControlSet\Services\Tcpip\Parameters\Interfaces")],
+    },
+    # Requiere iterar interfaces
+    "tcp_nagle": {
+        "needs": ["adapters"], "res": ["net:adapters", r"reg:HKLM\SYSTEM\CurrentControlSet\Services\Tcpip\Parameters\Interfaces"],
+        "ps": r'$__adapters | ForEach-Object { New-ItemProperty -Path "HKLM:\SYSTEM\CurrentControlSet\Services\Tcpip\Parameters\Interfaces\$($_.InterfaceGuid)" -Name "TcpAckFrequency" -Value 1 -PropertyType DWORD -Force | Out-Null; New-ItemProperty -Path "HKLM:\SYSTEM\CurrentControlSet\Services\Tcpip\Parameters\Interfaces\$($_.InterfaceGuid)" -Name "TCPNoDelay" -Value 1 -PropertyType DWORD -Force | Out-Null }',
+        "probe": r'$__adapters.Count -gt 0 -and @($__adapters | ForEach-Object { $p = Get-ItemProperty "HKLM:\SYSTEM\CurrentControlSet\Services\Tcpip\Parameters\Interfaces\$($_.InterfaceGuid)"; $p.TcpAckFrequency -eq 1 -and $p.TCPNoDelay -eq 1 }) -notcontains $false',
+        "save": r'@($__adapters | ForEach-Object { $k = "HKLM:\SYSTEM\CurrentControlSet\Services\Tcpip\Parameters\Interfaces\$($_.InterfaceGuid)"; $p = Get-ItemProperty $k -ErrorAction SilentlyContinue; @{k = $k; ack = $p.TcpAckFrequency; nodelay = $p.TCPNoDelay} })',
+        "undo": r"@($prev) | ForEach-Object { foreach ($v in @(@('TcpAckFrequency', $_.ack), @('TCPNoDelay', $_.nodelay))) { if ($null -eq $v[1]) { Remove-ItemProperty -Path $_.k -Name $v[0] -ErrorAction SilentlyContinue } else { New-ItemProperty -Path $_.k -Name $v[0] -Value $v[1] -PropertyType DWORD -Force | Out-Null } } }",
+        "watch": [("HKLM", r"SYSTEM\CurrentControlSet\Services\Tcpip\Parameters\Interfaces")],
+    },
+    "net_throt": {"reg": [("HKLM", r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\Multimedia\SystemProfile", "NetworkThrottlingIndex", 0xffffffff, "REG_DWORD")]},
+    "telemetry": {
+        "res": ["svc:DiagTrack"],
+        "ps": "Stop-Service DiagTrack -Force; Set-Service DiagTrack -StartupType Disabled",
+        "probe": "(Get-Service DiagTrack).StartType -eq 'Disabled'",
+        "save": "$__s = Get-Service DiagTrack; @{start = [string]$__s.StartType; running = $__s.Status -eq 'Running'}",
+        "undo": "Set-Service DiagTrack -StartupType $prev.start; if ($prev.running) { Start-Service DiagTrack }",
+        "watch": [("HKLM", r"SYSTEM\CurrentControlSet\Services\DiagTrack")],
+    },
+    "activity": {"reg": [("HKLM", r"SOFTWARE\Policies\Microsoft\Windows\System", "PublishUserActivities", 0, "REG_DWORD")]},
+    "location": {"reg": [("HKLM", r"SOFTWARE\Microsoft\Windows\CurrentVersion\CapabilityAccessManager\ConsentStore\location", "Value", "Deny", "REG_SZ")]},
+}
+
+# Trabajo que varios tweaks comparten: se ejecuta una sola vez por plan
+PS_SHARED = {
+    "adapters": "try { $__adapters = @(Get-NetAdapter) } catch { $__adapters = @() }",
+}
+
+def tweak_resources(fid):
+    tweak = TWEAKS.get(fid, {})
+    res = {f"reg:{hive}\\{path}" for hive, path, *_ in tweak.get("reg", [])}
+    res.update(tweak.get("res", []))
+    return res
+
+# --- COMPILADOR DE PLAN DE EJECUCIÓN ---
+# Agrupa las escrituras de registro por (hive, clave) y une los bloques
+# PowerShell en scripts, de modo que un perfil completo cuesta una apertura
+# por clave y un comando en el pool por grupo de bloques relacionados.
+class ExecutionPlan:
+    MARK = "__DRV_TWEAK__"
+
+    def __init__(self):
+        self.fids = []
+        self.reg_groups = {}   # (hive, ruta) -> [(nombre, valor, tipo, fid)]
+        self.ps_blocks = []    # [(fid, script)]
+        self.shared = []
+
+    @staticmethod
+    def compile(fids):
+        plan = ExecutionPlan()
+        for fid in fids:
+            tweak = TWEAKS.get(fid)
+            if tweak is None: continue
+            plan.fids.append(fid)
+            for hive, path, name, value, reg_type in tweak.get("reg", []):
+                plan.reg_groups.setdefault((hive, path), []).append((name, value, reg_type, fid))
+            if "ps" in tweak:
+                plan.ps_blocks.append((fid, tweak["ps"]))
+                for need in tweak.get("needs", []):
+                    if need not in plan.shared: plan.shared.append(need)
+        return plan
+
+    def script(self, blocks=None):
+        blocks = self.ps_blocks if blocks is None else blocks
+        if not blocks: return ""
+        needs = []
+        for fid, _ in blocks:
+            for need in TWEAKS[fid].get("needs", []):
+                if need not in needs: needs.append(need)
+        # Bloque propio (&{}) para no filtrar $ErrorActionPreference al host del pool
+        parts = ["& {", "$ErrorActionPreference = 'Stop'"]
+        parts += [PS_SHARED[need] for need in needs]
+        for fid, block in blocks:
+            parts.append(f"try {{ {block}; Write-Output '{self.MARK} {fid} OK' }} "
+                         f"catch {{ Write-Output ('{self.MARK} {fid} ERR ' + $_) }}")
+        parts.append("}")
+        return "\n".join(parts)
+
+    def ps_groups(self):
+        # Bloques que comparten trabajo ("needs") o recursos van al mismo script;
+        # los grupos independientes pueden correr en hosts distintos del pool.
+        groups = []
+        for fid, block in self.ps_blocks:
+            keys = tweak_resources(fid) | {f"need:{n}" for n in TWEAKS[fid].get("needs", [])}
+            merged = [g for g in groups if g[0] & keys]
+            for g in merged: groups.remove(g)
+            group = (keys.union(*[g[0] for g in merged]), [b for g in merged for b in g[1]] + [(fid, block)])
+            groups.append(group)
+        order = {fid: i for i, fid in enumerate(self.fids)}
+        return [(keys, sorted(blocks, key=lambda b: order[b[0]])) for keys, blocks in groups]
+
+    def tasks(self, timeout=None):
+        tasks = []
+        for (hive, path), values in self.reg_groups.items():
+            tasks.append(Task(f"reg:{hive}\\{path}", [fid for *_, fid in values], {f"reg:{hive}\\{path}"},
+                              lambda hive=hive, path=path, values=values: self._run_reg(hive, path, values)))
+        for keys, blocks in self.ps_groups():
+            tasks.append(Task("ps:" + ",".join(fid for fid, _ in blocks), [fid for fid, _ in blocks],
+                              {k for k in keys if not k.startswith("need:")},
+                              lambda blocks=blocks: self._run_ps(blocks, timeout)))
+        return tasks
+
+    @staticmethod
+    def _run_reg(hive, path, values):
+        ok, msg = SystemUtils.set_reg_many(hive, path, [(n, v, t) for n, v, t, _ in values], {n: fid for n, _, _, fid in values})
+        return {fid: (ok, "OK" if ok else msg) for *_, fid in values}
+
+    def _run_ps(self, blocks, timeout=None):
+        ok, out = SystemUtils.run_ps(self.script(blocks), timeout)
+        results = {}
+        for line in out.splitlines():
+            if not line.startswith(self.MARK): continue
+            _, fid, status, *rest = line.split(" ", 3) + [""]
+            results[fid] = (True, "OK") if status == "OK" else (False, f"Error PS: {rest[0].strip()}")
+        for fid, _ in blocks:
+            if fid not in results: results[fid] = (False, f"Error PS: {out if not ok and out else 'sin resultado'}")
+        return results
+
+    def execute(self, timeout=None, max_workers=4, on_result=None):
+        # Devuelve {fid: (ok, mensaje)}
+        return TweakExecutor(max_workers).run(self.tasks(timeout), on_result)
+
+# --- EJECUTOR CONCURRENTE ---
+# Cada tarea declara los recursos que toca (claves de registro, servicios,
+# adaptadores). Las tareas sin recursos en común corren en paralelo; las que
+# chocan se ejecutan en el orden del plan.
+class Task:
+    def __init__(self, name, fids, resources, fn):
+        self.name = name
+        self.fids = fids
+        self.resources = set(resources)
+        self.fn = fn # -> {fid: (ok, mensaje)}
+
+class TweakExecutor:
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+
+    @staticmethod
+    def conflict_graph(tasks):
+        # deps[i]: tareas anteriores con las que i comparte algún recurso
+        deps, last = [], {}
+        for i, task in enumerate(tasks):
+            deps.append({last[r] for r in task.resources if r in last})
+            for r in task.resources: last[r] = i
+        return deps
+
+    def run(self, tasks, on_result=None):
+        deps = self.conflict_graph(tasks)
+        pending_units = {}
+        for task in tasks:
+            for fid in task.fids: pending_units[fid] = pending_units.get(fid, 0) + 1
+        results, finished, running = {}, set(), {}
+
+        elapsed = {}
+
+        def timed(task):
+            t0 = time.perf_counter()
+            with trace(task.name, "tweak", fids=task.fids) as span:
+                try: out = task.fn()
+                except Exception as e: out = {"__error__": str(e)}
+                span.set("__error__" not in out and all(ok for ok, _ in out.values()))
+            return time.perf_counter() - t0, out
+
+        def collect(task, partial, took):
+            for fid in task.fids:
+                ok, msg = partial.get(fid, (False, "Sin resultado"))
+                prev = results.get(fid)
+                if prev is None or (prev[0] and not ok): results[fid] = (ok, msg)
+                elapsed[fid] = elapsed.get(fid, 0.0) + took
+                pending_units[fid] -= 1
+                if pending_units[fid] == 0 and on_result: on_result(fid, *results[fid], elapsed[fid])
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while len(finished) < len(tasks):
+                for i, task in enumerate(tasks):
+                    if i in finished or i in running.values() or not deps[i] <= finished: continue
+                    running[pool.submit(timed, task)] = i
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    finished.add(i)
+                    took, partial = future.result()
+                    if "__error__" in partial: partial = {fid: (False, partial["__error__"]) for fid in tasks[i].fids}
+                    collect(tasks[i], partial, took)
+        return results
+
+# --- ESTADO DE TWEAKS ---
+# Detecta qué tweaks ya están aplicados en una sola pasada: lecturas de
+# registro agrupadas por clave y todos los probes PowerShell en un comando.
+# El resultado queda en caché hasta que el registro avisa de un cambio.
+def _reg_equal(current, expected):
+    if isinstance(current, int) and isinstance(expected, int):
+        return current & 0xFFFFFFFF == expected & 0xFFFFFFFF
+    return str(current) == str(expected)
+
+class StateCache:
+    MARK = "__DRV_STATE__"
+
+    def __init__(self, registry=None):
+        self.registry = registry
+        self.states = {}
+        self.lock = threading.Lock()
+        self.watched = set()
+        self.on_change = None # callback(fids) cuando se invalida algo
+
+    def _reg(self):
+        return self.registry or SystemUtils.reg()
+
+    def get(self, fid):
+        return self.states.get(fid)
+
+    def invalidate(self, fids):
+        with self.lock:
+            stale = [fid for fid in fids if self.states.pop(fid, None) is not None]
+        if stale and self.on_change: self.on_change(stale)
+
+    def _watch(self, fids):
+        keys = {}
+        for fid in fids:
+            tweak = TWEAKS.get(fid, {})
+            for hive, path, *_ in tweak.get("reg", []): keys.setdefault((hive, path), set()).add(fid)
+            for hive, path in tweak.get("watch", []): keys.setdefault((hive, path), set()).add(fid)
+        for (hive, path), owners in keys.items():
+            if (hive, path) in self.watched: continue
+            self.watched.add((hive, path))
+            try: self._reg().watch(hive, path, lambda owners=owners: self.invalidate(owners))
+            except Exception: pass
+
+    def scan(self, fids=None):
+        # Devuelve {fid: bool}; solo se consultan los que no están en caché
+        fids = [f for f in (fids if fids is not None else TWEAKS) if f in TWEAKS]
+        with self.lock: missing = [f for f in fids if f not in self.states]
+        if missing:
+            self._watch(missing) # Antes de leer, para no perder cambios intermedios
+            found = self._probe_registry(missing)
+            found.update(self._probe_ps(missing))
+            with self.lock: self.states.update(found)
+        with self.lock: return {f: self.states.get(f, False) for f in fids}
+
+    def _probe_registry(self, fids):
+        by_key = {}
+        for fid in fids:
+            for hive, path, name, value, _ in TWEAKS[fid].get("reg", []):
+                by_key.setdefault((hive, path), []).append((fid, name, value))
+        states = {fid: True for fid in fids if "reg" in TWEAKS[fid]}
+        for (hive, path), expected in by_key.items():
+            try: current = self._reg().get_values(hive, path, [name for _, name, _ in expected]) or {}
+            except Exception: current = {}
+            lower = {n.lower(): v for n, v in current.items()}
+            for fid, name, value in expected:
+                got = lower.get(name.lower())
+                if got is None or not _reg_equal(got[0], value): states[fid] = False
+        return states
+
+    def _probe_ps(self, fids):
+        probes = [fid for fid in fids if "probe" in TWEAKS[fid]]
+        if not probes: return {}
+        needs = []
+        for fid in probes:
+            for need in TWEAKS[fid].get("needs", []):
+                if need not in needs: needs.append(need)
+        parts = ["& {", "$ErrorActionPreference = 'SilentlyContinue'"] + [PS_SHARED[n] for n in needs]
+        for fid in probes:
+            parts.append(f"try {{ $__r = [bool]({TWEAKS[fid]['probe']}) }} catch {{ $__r = $false }}; "
+                         f"Write-Output ('{self.MARK} {fid} ' + $__r)")
+        parts.append("}")
+        ok, out = SystemUtils.run_ps("\n".join(parts))
+        states = {fid: False for fid in probes}
+        for line in out.splitlines():
+            if line.startswith(self.MARK):
+                _, fid, value = (line.split(" ") + ["", ""])[:3]
+                if fid in states: states[fid] = value.strip().lower() == "true"
+        return states
+
+# --- APLICAR TWEAKS (COMÚN A GUI Y MODO SIN INTERFAZ) ---
+RESTORE_POINT_CMD = "Checkpoint-Computer -Description 'DrVicho_v5' -RestorePointType 'MODIFY_SETTINGS'"
+
+def _no_log(msg, level="INFO", fid=None, duration=None):
+    pass
+
+PREV_MARK = "__DRV_PREV__"
+UNDO_MARK = "__DRV_UNDO__"
+
+def snapshot_ps_state(fids):
+    # Estado previo de los tweaks PowerShell en una sola invocación. Devuelve {fid: json}
+    saves = [fid for fid in fids if "save" in TWEAKS.get(fid, {})]
+    if not saves: return {}
+    needs = []
+    for fid in saves:
+        for need in TWEAKS[fid].get("needs", []):
+            if need not in needs: needs.append(need)
+    parts = ["& {", "$ErrorActionPreference = 'Stop'"] + [PS_SHARED[n] for n in needs]
+    for fid in saves:
+        parts.append(f"try {{ $__p = ConvertTo-Json -Compress -Depth 4 -InputObject $({TWEAKS[fid]['save']}); "
+                     f"Write-Output ('{PREV_MARK} {fid} ' + $__p) }} catch {{ }}")
+    parts.append("}")
+    ok, out = SystemUtils.run_ps("\n".join(parts))
+    prev = {}
+    for line in out.splitlines():
+        if line.startswith(PREV_MARK + " "):
+            _, fid, data = (line.split(" ", 2) + [""])[:3]
+            if fid in saves and data.strip(): prev[fid] = data.strip()
+    return prev
+
+def restore_ps_state(records):
+    # Deshace acciones "ps" del journal (la más reciente primero); devuelve cuántas
+    parts = ["& {", "$ErrorActionPreference = 'Stop'"]
+    for r in reversed(records):
+        undo = TWEAKS.get(r["fid"], {}).get("undo")
+        if not undo: continue
+        parts.append(f"try {{ $prev = ConvertFrom-Json {_ps_quote(r['prev'])}; {undo}; Write-Output '{UNDO_MARK} {r['fid']} OK' }} "
+                     f"catch {{ Write-Output ('{UNDO_MARK} {r['fid']} ERR ' + $_) }}")
+    if len(parts) == 2: return 0
+    parts.append("}")
+    ok, out = SystemUtils.run_ps("\n".join(parts))
+    return sum(1 for line in out.splitlines() if line.startswith(UNDO_MARK + " ") and line.split(" ")[2:3] == ["OK"])
+
+def apply_features(fids, log=None, state=None, restore_point=False, label=None):
+    # Journal, punto de restauración opcional (en paralelo con el pre-flight),
+    # omisión de lo ya aplicado y ejecución concurrente del plan.
+    log = log or _no_log
+    state = state or StateCache()
+    names = {f["id"]: f["name"] for f in FEATURES}
+    fids = [fid for fid in fids if fid in TWEAKS]
+    if SystemUtils.journal: SystemUtils.journal.begin(label or ",".join(fids))
+
+    def preflight():
+        with trace("preflight", fids=len(fids)):
+            return _preflight()
+
+    def _preflight():
+        states = state.scan(fids)
+        skipped = [fid for fid in fids if states.get(fid)]
+        if skipped: log(f"Ya aplicados (se omiten): {', '.join(skipped)}")
+        plan = ExecutionPlan.compile([fid for fid in fids if not states.get(fid)])
+        if plan.ps_blocks: SystemUtils.pool().warm()
+        if plan.ps_blocks and SystemUtils.journal:
+            # El registro lo cubre set_reg; los tweaks PowerShell guardan su estado aquí, antes de tocar nada
+            ps_fids = [fid for fid, _ in plan.ps_blocks]
+            prev = snapshot_ps_state(ps_fids)
+            SystemUtils.journal.record_actions("ps", [{"fid": fid, "prev": prev[fid]} if fid in prev else {"fid": fid, "undoable": False} for fid in ps_fids])
+            lost = [fid for fid in ps_fids if fid not in prev]
+            if lost: log(f"Sin estado previo, no se podrán deshacer: {', '.join(lost)}", "WARNING")
+        log(f"Plan: {len(plan.reg_groups)} claves de registro, {len(plan.ps_groups())} scripts PowerShell")
+        return plan, skipped
+
+    def restore_point_step():
+        with trace("restore_point") as span:
+            ok, msg = SystemUtils.run_ps(RESTORE_POINT_CMD)
+            span.set(ok)
+        return ok, msg
+
+    if restore_point:
+        log("Creando Punto de Restauración...", "INFO")
+        with ThreadPoolExecutor(max_workers=1) as bg:
+            restore = bg.submit(restore_point_step)
+            plan, skipped = preflight()
+            ok, msg = restore.result()
+        log("Punto de Restauración creado." if ok else f"Punto de Restauración falló: {msg}", "INFO" if ok else "ERROR")
+    else:
+        plan, skipped = preflight()
+
+    report = {}
+    def on_result(fid, ok, msg, duration):
+        report[fid] = {"ok": ok, "msg": msg, "duration": round(duration, 6)}
+        log(f"{names.get(fid, fid)}: {'OK' if ok else msg} ({duration * 1000:.0f} ms)", "SUCCESS" if ok else "ERROR", fid, duration)
+    with trace("execute", tasks=len(plan.reg_groups) + len(plan.ps_groups())):
+        plan.execute(on_result=on_result)
+    state.invalidate(list(report))
+    return {"results": report, "skipped": skipped}
+
+# --- BENCHMARK DE DNS ---
+# Envía muchas consultas a la vez (asyncio + UDP) a cada resolvedor candidato.
+# "Caché": el mismo dominio popular repetido tras una consulta de calentamiento;
+# "frío": subdominios aleatorios que obligan al resolvedor a ir al autoritativo.
+DNS_CANDIDATES = {
+    "1.1.1.1": "Cloudflare", "1.0.0.1": "Cloudflare",
+    "8.8.8.8": "Google", "8.8.4.4": "Google",
+    "9.9.9.9": "Quad9", "149.112.112.112": "Quad9",
+    "208.67.222.222": "OpenDNS", "208.67.220.220": "OpenDNS",
+    "94.140.14.14": "AdGuard", "94.140.15.15": "AdGuard",
+}
+DNS_TEST_DOMAINS = ["google.com", "youtube.com", "microsoft.com", "steampowered.com", "discord.com", "riotgames.com"]
+
+def _split_server(server):
+    # "ip" o "ip:puerto" (IPv4); los servidores de prueba usan puertos altos
+    host, sep, port = server.rpartition(":")
+    if sep and host.count(":") == 0: return host, int(port)
+    return server, 53
+
+def _dns_query(qid, name, qtype=1):
+    qname = b"".join(bytes([len(label)]) + label for label in name.encode("ascii").split(b".") if label) + b"\0"
+    return struct.pack("!HHHHHH", qid, 0x0100, 1, 0, 0, 0) + qname + struct.pack("!HH", qtype, 1)
+
+def _percentile(values, pct):
+    if not values: return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(pct / 100.0 * len(values) + 0.5)) - 1))]
+
+class _DnsClient:
+    # Protocolo datagrama de asyncio: reparte las respuestas por id de transacción
+    def __init__(self):
+        self.transport = None
+        self.pending = {}
+        self.next_id = random.randrange(65536)
+
+    def connection_made(self, transport): self.transport = transport
+    def connection_lost(self, exc): self._fail(exc or OSError("Conexión cerrada"))
+    def pause_writing(self): pass
+    def resume_writing(self): pass
+    def error_received(self, exc): self._fail(exc) # p. ej. ICMP puerto inalcanzable
+
+    def _fail(self, exc):
+        for fut in self.pending.values():
+            if not fut.done(): fut.set_exception(exc)
+        self.pending.clear()
+
+    def datagram_received(self, data, addr):
+        if len(data) < 4: return
+        qid, flags = struct.unpack_from("!HH", data)
+        fut = self.pending.pop(qid, None)
+        if fut is not None and not fut.done() and flags & 0x8000: fut.set_result(flags & 0xF)
+
+    async def query(self, name, timeout):
+        # Devuelve la latencia en ms, o None si no hubo respuesta válida
+        import asyncio
+        while self.next_id in self.pending: self.next_id = (self.next_id + 1) & 0xFFFF
+        qid, self.next_id = self.next_id, (self.next_id + 1) & 0xFFFF
+        fut = asyncio.get_running_loop().create_future()
+        self.pending[qid] = fut
+        t0 = time.perf_counter()
+        try:
+            self.transport.sendto(_dns_query(qid, name))
+            rcode = await asyncio.wait_for(fut, timeout)
+        except (asyncio.TimeoutError, OSError):
+            self.pending.pop(qid, None)
+            return None
+        # NXDOMAIN es una respuesta válida (los subdominios aleatorios no existen)
+        return (time.perf_counter() - t0) * 1000 if rcode in (0, 3) else None
+
+class DnsBenchmark:
+    def __init__(self, servers=None, domains=None, rounds=5, timeout=2.0, concurrency=16):
+        self.servers = list(servers or DNS_CANDIDATES)
+        self.domains = list(domains or DNS_TEST_DOMAINS)
+        self.rounds = rounds
+        self.timeout = timeout
+        self.concurrency = concurrency
+
+    def run(self):
+        # Devuelve los resultados ordenados de mejor a peor
+        import asyncio
+        return asyncio.run(self.run_async())
+
+    async def run_async(self):
+        import asyncio
+        results = await asyncio.gather(*(self._bench(server) for server in dict.fromkeys(self.servers)))
+        return sorted(results, key=lambda r: (r["score"] is None, r["score"] or 0.0))
+
+    async def _bench(self, server):
+        import asyncio
+        host, port = _split_server(server)
+        try:
+            transport, client = await asyncio.get_running_loop().create_datagram_endpoint(_DnsClient, remote_addr=(host, port))
+        except OSError:
+            return self._stats(server, [None] * (len(self.domains) * self.rounds), [None] * (len(self.domains) * self.rounds))
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def one(name):
+            async with sem: return await client.query(name, self.timeout)
+
+        try:
+            await asyncio.gather(*(one(d) for d in self.domains)) # calentamiento de caché
+            cached = await asyncio.gather(*(one(d) for d in self.domains for _ in range(self.rounds)))
+            cold = await asyncio.gather(*(one(f"drv{uuid.uuid4().hex[:12]}.{d}") for d in self.domains for _ in range(self.rounds)))
+        finally:
+            transport.close()
+        return self._stats(server, list(cold), list(cached))
+
+    def _stats(self, server, cold, cached):
+        host, port = _split_server(server)
+        ok_cold = [x for x in cold if x is not None]
+        ok_cached = [x for x in cached if x is not None]
+        total = len(cold) + len(cached)
+        failures = total - len(ok_cold) - len(ok_cached)
+        out = {"server": server, "host": host, "port": port, "name": DNS_CANDIDATES.get(host, host),
+               "queries": total, "failures": failures, "fail_rate": failures / total if total else 1.0}
+        for label, values in (("cold", ok_cold), ("cached", ok_cached)):
+            for pct in (50, 90, 99): out[f"{label}_p{pct}"] = _percentile(values, pct)
+        # Puntuación (menor es mejor): sobre todo la latencia con caché, que es la
+        # que se nota al navegar/jugar; cada fallo cuesta lo que un timeout.
+        if out["cached_p50"] is None or out["cold_p50"] is None: out["score"] = None
+        else: out["score"] = 0.7 * out["cached_p50"] + 0.3 * out["cold_p50"] + out["fail_rate"] * self.timeout * 1000
+        return out
+
+def dns_table(results):
+    fmt = lambda v: "   -" if v is None else f"{v:6.1f}"
+    lines = [f"{'servidor':<22} {'caché p50':>9} {'p90':>6} {'frío p50':>9} {'p90':>6} {'fallos':>7}"]
+    for r in results:
+        label = r["server"] if r["name"] == r["host"] else f"{r['name']} {r['host']}"
+        lines.append(f"{label[:22]:<22} {fmt(r['cached_p50']):>9} {fmt(r['cached_p90']):>6} "
+                     f"{fmt(r['cold_p50']):>9} {fmt(r['cold_p90']):>6} {r['fail_rate'] * 100:6.0f}%")
+    return "\n".join(lines)
+
+def current_dns_servers():
+    if os.name == "nt":
+        ok, out = SystemUtils.run_ps("Get-NetAdapter | Where-Object Status -eq 'Up' | ForEach-Object { "
+                                     "(Get-DnsClientServerAddress -InterfaceIndex $_.ifIndex -AddressFamily IPv4).ServerAddresses }")
+        servers = [line.strip() for line in out.splitlines() if line.strip()] if ok else []
+    else:
+        try:
+            with open("/etc/resolv.conf", encoding="utf-8") as f:
+                servers = [parts[1] for parts in (line.split() for line in f) if len(parts) > 1 and parts[0] == "nameserver"]
+        except OSError: servers = []
+    return list(dict.fromkeys(servers))
+
+def best_dns(results, count=2):
+    # Solo resolvedores que respondieron y que Windows puede usar (puerto 53)
+    return [r["host"] for r in results if r["score"] is not None and r["port"] == 53][:count]
+
+def apply_best_dns(results, log=None, state=None, count=2):
+    servers = best_dns(results, count)
+    if not servers: return None, {"results": {}, "skipped": []}
+    set_dns_servers(servers)
+    state = state or StateCache()
+    state.invalidate(["dns_cloud"])
+    return servers, apply_features(["dns_cloud"], log, state, label="dns:" + ",".join(servers))
+
+class DnsStub:
+    # Servidor DNS local para probar sin red: responde tras `delay` segundos
+    # (más `cold_delay` la primera vez que ve un nombre) y descarta una fracción
+    # `drop` de las consultas.
+    def __init__(self, delay=0.005, cold_delay=0.02, drop=0.0, rcode=0, seed=0):
+        self.delay = delay
+        self.cold_delay = cold_delay
+        self.drop = drop
+        self.rcode = rcode
+        self.rng = random.Random(seed)
+        self.seen = set()
+        self.queries = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.server = "127.0.0.1:%d" % self.sock.getsockname()[1]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _reply(self, data):
+        end = data.index(b"\0", 12) + 5
+        name = data[12:end - 4]
+        delay = self.delay + (0 if name in self.seen else self.cold_delay)
+        self.seen.add(name)
+        qid, flags = struct.unpack_from("!HH", data)
+        header = struct.pack("!HHHHHH", qid, 0x8000 | 0x0080 | (flags & 0x0100) | self.rcode, 1, 0, 0, 0)
+        return delay, header + data[12:end]
+
+    def _loop(self):
+        # Respuestas programadas en un heap: las demoras no se acumulan en serie
+        import heapq, select
+        pending, seq = [], 0
+        while not self._stop.is_set():
+            wait_s = 0.05 if not pending else max(0.0, pending[0][0] - time.monotonic())
+            readable, _, _ = select.select([self.sock], [], [], wait_s)
+            if readable:
+                try: data, addr = self.sock.recvfrom(512)
+                except OSError: break
+                self.queries += 1
+                if len(data) < 17 or self.rng.random() < self.drop: continue
+                try: delay, reply = self._reply(data)
+                except ValueError: continue
+                seq += 1
+                heapq.heappush(pending, (time.monotonic() + delay, seq, reply, addr))
+            while pending and pending[0][0] <= time.monotonic():
+                _, _, reply, addr = heapq.heappop(pending)
+                try: self.sock.sendto(reply, addr)
+                except OSError: pass
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(1)
+        self.sock.close()
+
+def bench_dns(rounds=20):
+    # Sin red: tres stubs con latencias distintas y uno que pierde la mitad de las consultas
+    stubs = [DnsStub(0.002, 0.01), DnsStub(0.02, 0.05), DnsStub(0.001, 0.005, drop=0.5), DnsStub(0.008, 0.02)]
+    try:
+        t0 = time.perf_counter()
+        results = DnsBenchmark([s.server for s in stubs], rounds=rounds, timeout=0.3).run()
+        took = time.perf_counter() - t0
+    finally:
+        for s in stubs: s.close()
+    order = [next(i for i, s in enumerate(stubs) if s.server == r["server"]) for r in results]
+    return {"queries": sum(r["queries"] for r in results), "wall_s": took, "ranking": order, "table": dns_table(results)}
+
+# --- PERFIL DE INICIO Y SERVICIOS ---
+# Una sola consulta en bloque (entradas Run y carpeta Inicio, tareas de inicio
+# de sesión/arranque, servicios automáticos y procesos) que queda en caché.
+# Cada elemento se cruza con los procesos en ejecución para medir CPU, memoria
+# y disco; si no está corriendo se estima por tipo. Desactivar es un lote que
+# queda en el journal y se deshace con "Deshacer".
+STARTUP_PRIORS = { # (cpu_s, memoria, disco) estimados si el elemento no está en ejecución
+    "service": (0.3, 15 << 20, 2 << 20),
+    "run": (1.5, 60 << 20, 15 << 20),
+    "folder": (1.5, 60 << 20, 15 << 20),
+    "task": (0.5, 25 << 20, 5 << 20),
+}
+PROTECTED_SERVICES = {
+    "rpcss", "dcomlaunch", "rpceptmapper", "lsm", "winmgmt", "eventlog", "dhcp", "dnscache", "bfe", "mpssvc",
+    "windefend", "wscsvc", "samss", "plugplay", "power", "profsvc", "schedule", "audiosrv", "audioendpointbuilder",
+    "nsi", "nlasvc", "netprofm", "lanmanworkstation", "cryptsvc", "brokerinfrastructure", "systemeventsbroker",
+    "coremessagingregistrar", "gpsvc", "usermanager", "staterepository", "sense", "wdnissvc", "themes", "wlansvc",
+}
+
+def _ps_quote(s):
+    return "'" + str(s).replace("'", "''") + "'"
+
+def _image_name(command):
+    # Ejecutable de una línea de comandos: "C:\a b\x.exe" -arg o C:\x.exe /arg
+    command = (command or "").strip()
+    if command.startswith('"'): exe = command[1:].split('"', 1)[0]
+    else:
+        low = command.lower()
+        end = low.find(".exe")
+        exe = command[:end + 4] if end >= 0 else command.split(" ", 1)[0]
+    return os.path.basename(exe.replace("/", "\\").split("\\")[-1]).lower()
+
+def startup_impact(cpu_s, disk):
+    # Mismos umbrales que el "impacto de inicio" del Administrador de tareas
+    if cpu_s > 1.0 or disk > 3 << 20: return "alto"
+    if cpu_s > 0.3 or disk > 300 << 10: return "medio"
+    return "bajo"
+
+def rank_startup(snapshot):
+    procs = {p["pid"]: p for p in snapshot["procs"]}
+    by_name, sharing = {}, {}
+    for p in snapshot["procs"]: by_name.setdefault(p["name"].lower(), []).append(p)
+    for item in snapshot["items"]:
+        if item.get("pid"): sharing[item["pid"]] = sharing.get(item["pid"], 0) + 1
+    ranked = []
+    for item in snapshot["items"]:
+        pid = item.get("pid")
+        # Servicios que comparten svchost se reparten su coste
+        if pid and pid in procs: matched, share = [procs[pid]], sharing[pid]
+        else: matched, share = by_name.get(item.get("image") or "", []), 1
+        if matched:
+            cpu, mem, disk = (sum(p[k] for p in matched) / share for k in ("cpu_s", "mem", "disk"))
+        else:
+            cpu, mem, disk = STARTUP_PRIORS.get(item["kind"], STARTUP_PRIORS["task"])
+        ranked.append({**item, "cpu_s": cpu, "mem": mem, "disk": disk, "measured": bool(matched),
+                       "impact": startup_impact(cpu, disk), "score": cpu + mem / (256 << 20) + disk / (10 << 20)})
+    ranked.sort(key=lambda r: -r["score"])
+    return ranked
+
+class WinStartup:
+    QUERY = "\n".join([
+        "& {",
+        "$ErrorActionPreference = 'SilentlyContinue'",
+        "$svc = @(Get-CimInstance Win32_Service -Filter \"StartMode='Auto'\" | Select-Object Name, DisplayName, State, ProcessId, PathName)",
+        "$run = @(Get-CimInstance Win32_StartupCommand | Select-Object Name, Command, Location)",
+        "$tasks = @(Get-ScheduledTask | Where-Object { $_.State -ne 'Disabled' -and ($_.Triggers | Where-Object { $_.CimClass.CimClassName -match 'Logon|Boot' }) } | "
+        "Select-Object TaskName, TaskPath, @{n='Execute'; e={ ($_.Actions | ForEach-Object { $_.Execute }) -join ' ' }})",
+        "$procs = @(Get-CimInstance Win32_Process | Select-Object ProcessId, Name, WorkingSetSize, KernelModeTime, UserModeTime, ReadTransferCount, WriteTransferCount)",
+        "[pscustomobject]@{ services = $svc; run = $run; tasks = $tasks; procs = $procs } | ConvertTo-Json -Depth 3 -Compress",
+        "}",
+    ])
+    MARK = "__DRV_ITEM__"
+    FOLDERS = {"Startup": ("APPDATA", r"Microsoft\Windows\Start Menu\Programs\Startup"),
+               "Common Startup": ("PROGRAMDATA", r"Microsoft\Windows\Start Menu\Programs\StartUp")}
+
+    @staticmethod
+    def _list(value):
+        if value is None: return []
+        return value if isinstance(value, list) else [value]
+
+    def snapshot(self):
+        ok, out = SystemUtils.run_ps(self.QUERY, timeout=120)
+        start = out.find("{")
+        if not ok or start < 0: raise OSError(f"No se pudo enumerar el inicio: {out[:200]}")
+        data = json.loads(out[start:])
+        items = []
+        for s in self._list(data.get("services")):
+            items.append({"id": f"service:{s['Name']}", "kind": "service", "name": s.get("DisplayName") or s["Name"], "key": s["Name"],
+                          "image": _image_name(s.get("PathName")), "pid": s.get("ProcessId") or None, "running": s.get("State") == "Running",
+                          "protected": s["Name"].lower() in PROTECTED_SERVICES, "detail": s.get("PathName") or ""})
+        for r in self._list(data.get("run")):
+            location, command = r.get("Location") or "", r.get("Command") or ""
+            item = {"name": r["Name"], "image": _image_name(command), "detail": command, "protected": False}
+            if location in self.FOLDERS:
+                env, sub = self.FOLDERS[location]
+                filename = command if command.lower().endswith((".lnk", ".exe", ".bat", ".cmd", ".url")) else r["Name"] + ".lnk"
+                item.update(id=f"folder:{location}\\{filename}", kind="folder", file=os.path.join(os.environ.get(env, ""), sub, filename))
+                if item["image"].endswith(".lnk"): item["image"] = ""
+            elif location.startswith("HK"):
+                hive, _, path = location.partition("\\")
+                item.update(id=f"run:{location}\\{r['Name']}", kind="run", hive=hive, path=path, value=r["Name"])
+            else: continue
+            items.append(item)
+        for t in self._list(data.get("tasks")):
+            items.append({"id": f"task:{t['TaskPath']}{t['TaskName']}", "kind": "task", "name": t["TaskName"], "task_path": t["TaskPath"],
+                          "task_name": t["TaskName"], "image": _image_name(t.get("Execute")), "detail": t.get("Execute") or "",
+                          "protected": t["TaskPath"].startswith("\\Microsoft\\Windows\\")})
+        procs = [{"pid": p["ProcessId"], "name": (p.get("Name") or "").lower(),
+                  "cpu_s": ((p.get("KernelModeTime") or 0) + (p.get("UserModeTime") or 0)) / 1e7, "mem": p.get("WorkingSetSize") or 0,
+                  "disk": (p.get("ReadTransferCount") or 0) + (p.get("WriteTransferCount") or 0)} for p in self._list(data.get("procs"))]
+        return {"items": items, "procs": procs, "ts": time.time()}
+
+    def _batch(self, commands):
+        # [(clave, comando)] en un solo script; {clave: (ok, mensaje)}
+        parts = ["& {", "$ErrorActionPreference = 'Stop'"]
+        for i, (_, cmd) in enumerate(commands):
+            parts.append(f"try {{ {cmd}; Write-Output '{self.MARK} {i} OK' }} catch {{ Write-Output ('{self.MARK} {i} ERR ' + $_) }}")
+        parts.append("}")
+        ok, out = SystemUtils.run_ps("\n".join(parts), timeout=300)
+        results = {key: (False, f"Error PS: {out if not ok and out else 'sin resultado'}") for key, _ in commands}
+        for line in out.splitlines():
+            if not line.startswith(self.MARK): continue
+            _, idx, status, *rest = line.split(" ", 3) + [""]
+            if idx.isdigit() and int(idx) < len(commands):
+                results[commands[int(idx)][0]] = (True, "Desactivado") if status == "OK" else (False, f"Error PS: {rest[0].strip()}")
+        return results
+
+    def disable(self, items, before=None):
+        # Primero se anota cómo deshacer lo que no es registro (tareas, accesos directos, servicios parados)
+        parked = os.path.join(app_data_dir(), "inicio_desactivado")
+        actions = []
         for item in items:
-            frame = tk.Frame(parent, bg=COLORS["bg_sec"], padx=15, pady=10)
-            frame.grid(row=row, column=col, sticky="ew", padx=10, pady=5)
-            parent.grid_columnconfigure(col, weight=1)
-            
-            # Switch
-            ToggleSwitch(frame, self.vars[item["id"]]).pack(side="right", padx=10)
-            
-            # Text
-            tk.Label(frame, text=item["name"], font=FONTS["h2"], bg=COLORS["bg_sec"], fg="white", anchor="w").pack(fill="x")
-            tk.Label(frame, text=item["desc"], font=FONTS["body"], bg=COLORS["bg_sec"], fg=COLORS["text_sec"], anchor="w").pack(fill="x")
-            
-            col += 1
-            if col > 1: # 2 columnas
-                col = 0
-                row += 1
-
-    def populate_maintenance_tab(self):
-        # Esta pestaña es diferente, son botones de acción inmediata
-        parent = self.tab_maintenance
-        
-        tools = [
-            ("Reparar Archivos Corruptos (SFC)", "Ejecuta sfc /scannow (Tarda 5-10 min)", self.run_sfc),
-            ("Reparar Imagen de Windows (DISM)", "Repara el almacén de componentes.", self.run_dism),
-            ("Flush DNS & Reset IP", "Soluciona problemas de conexión.", self.run_net_reset),
-            ("Borrar Archivos Temporales", "Libera espacio en disco.", self.run_clean_temp),
-        ]
-        
-        for name, desc, func in tools:
-            frame = tk.Frame(parent, bg=COLORS["bg_sec"], padx=20, pady=20)
-            frame.pack(fill="x", pady=5)
-            
-            btn = tk.Button(frame, text="EJECUTAR", bg=COLORS["accent"], fg="white", font=("Segoe UI", 10, "bold"), bd=0, padx=15, pady=5, cursor="hand2", command=func)
-            btn.pack(side="right")
-            
-            tk.Label(frame, text=name, font=FONTS["h2"], bg=COLORS["bg_sec"], fg="white").pack(anchor="w")
-            tk.Label(frame, text=desc, font=FONTS["body"], bg=COLORS["bg_sec"], fg=COLORS["text_sec"]).pack(anchor="w")
-
-    def log(self, msg, type="INFO"):
-        self.console.config(state='normal')
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        color = COLORS["text_main"]
-        if type == "SUCCESS": color = COLORS["success"]
-        if type == "ERROR": color = COLORS["danger"]
-        
-        self.console.insert(tk.END, f"[{timestamp}] ", "gray")
-        self.console.insert(tk.END, f"{msg}\n", type)
-        self.console.tag_config(type, foreground=color)
-        self.console.tag_config("gray", foreground="#666")
-        self.console.see(tk.END)
-        self.console.config(state='disabled')
-
-    def load_features(self):
-        return [
-            # --- GAMING ---
-            {"id": "ult_perf", "cat": "gaming", "name": "Plan Máximo Rendimiento", "desc": "Desbloquea el plan oculto de energía."},
-            {"id": "game_mode", "cat": "gaming", "name": "Forzar Modo Juego", "desc": "Prioriza juegos en la CPU."},
-            {"id": "gpu_sched", "cat": "gaming", "name": "GPU Scheduling (HAGS)", "desc": "Reduce latencia de GPU (Requiere Reinicio)."},
-            {"id": "fso_disable", "cat": "gaming", "name": "Desactivar Opt. Pantalla Completa", "desc": "Arregla stuttering en juegos viejos."},
-            {"id": "mouse_fix", "cat": "gaming", "name": "Fix Aceleración Mouse", "desc": "Desactiva 'Mejorar precisión del puntero' para aim real."},
-            {"id": "kb_delay", "cat": "gaming", "name": "Reducir Input Lag Teclado", "desc": "Baja el delay de repetición en el registro."},
-            {"id": "power_throt", "cat": "gaming", "name": "Desactivar Power Throttling", "desc": "Evita que Windows baje frecuencias para ahorrar luz."},
-
-            # --- WINDOWS 11 UI ---
-            {"id": "classic_ctx", "cat": "win11", "name": "Menú Contextual Clásico", "desc": "Devuelve el clic derecho de Windows 10 (Requiere Reinicio)."},
-            {"id": "snap_assist", "cat": "win11", "name": "Desactivar Snap Assist", "desc": "Quita la sugerencia de ventanas molesta."},
-            {"id": "widgets_kill", "cat": "win11", "name": "Eliminar Widgets y Chat", "desc": "Libera RAM de la barra de tareas."},
-            {"id": "transparency", "cat": "win11", "name": "Desactivar Transparencias", "desc": "Interfaz opaca para mayor rendimiento."},
-            
-            # --- RED ---
-            {"id": "dns_cloud", "cat": "network", "name": "DNS Cloudflare (1.1.1.1)", "desc": "DNS más rápido del mundo."},
-            {"id": "tcp_nagle", "cat": "network", "name": "Desactivar Nagle (TCP)", "desc": "Reduce ping enviando paquetes más rápido."},
-            {"id": "net_throt", "cat": "network", "name": "Quitar Límite de Red", "desc": "Elimina el throttling de Windows para multimedia."},
-
-            # --- PRIVACIDAD ---
-            {"id": "telemetry", "cat": "privacy", "name": "Bloquear Telemetría", "desc": "Detiene el servicio DiagTrack."},
-            {"id": "activity", "cat": "privacy", "name": "Sin Historial de Actividad", "desc": "Windows no recordará qué apps abriste."},
-            {"id": "location", "cat": "privacy", "name": "Desactivar Geolocalización", "desc": "Impide que apps sepan tu ubicación."},
-        ]
-
-    # --- MONITOR DE SISTEMA ---
-    def start_monitoring(self):
-        def update():
-            while True:
+            fid = f"startup:{item['id']}"
+            if item["kind"] == "task": actions.append({"fid": fid, "type": "task", "path": item["task_path"], "name": item["task_name"]})
+            elif item["kind"] == "folder":
+                actions.append({"fid": fid, "type": "folder", "src": item["file"], "dst": os.path.join(parked, uuid.uuid4().hex[:8] + "_" + os.path.basename(item["file"]))})
+            elif item["kind"] == "service" and item.get("running"): actions.append({"fid": fid, "type": "service", "name": item["key"]})
+        if before and actions: before(actions)
+        moves = {a["fid"]: a for a in actions if a["type"] == "folder"}
+        results, commands = {}, []
+        for item in items:
+            fid = f"startup:{item['id']}"
+            if item["kind"] == "service":
+                ok, msg = SystemUtils.set_reg("HKLM", f"SYSTEM\\CurrentControlSet\\Services\\{item['key']}", "Start", 4, "REG_DWORD", fid)
+                results[item["id"]] = (ok, "Desactivado" if ok else msg)
+                if ok and item.get("running"): commands.append((f"stop:{item['id']}", f"Stop-Service -Name {_ps_quote(item['key'])} -Force"))
+            elif item["kind"] == "run":
+                ok, msg = SystemUtils.delete_reg_values(item["hive"], item["path"], [item["value"]], fid)
+                results[item["id"]] = (ok, "Desactivado" if ok else msg)
+            elif item["kind"] == "folder":
                 try:
-                    cmd = "powershell -NoProfile -Command \"$p = Get-CimInstance Win32_Processor | Measure-Object -Property LoadPercentage -Average | Select -Expand Average; $o = Get-CimInstance Win32_OperatingSystem; $m = (($o.TotalVisibleMemorySize - $o.FreePhysicalMemory)/$o.TotalVisibleMemorySize)*100; Write-Output $p; Write-Output $m\""
-                    out = subprocess.check_output(cmd, startupinfo=subprocess.STARTUPINFO(dwFlags=subprocess.STARTF_USESHOWWINDOW), creationflags=subprocess.CREATE_NO_WINDOW).decode().split('\n')
-                    if len(out) >= 2:
-                        cpu = int(float(out[0].strip()))
-                        ram = int(float(out[1].strip()))
-                        if self.root.winfo_exists():
-                            self.stats_label.config(text=f"CPU: {cpu}% | RAM: {ram}%", fg=COLORS["danger"] if cpu > 80 else COLORS["success"])
-                except: pass
-                time.sleep(2)
-        threading.Thread(target=update, daemon=True).start()
-
-    # --- LÓGICA DE EJECUCIÓN PRINCIPAL ---
-    def run_process(self):
-        active = [f for f in self.features if self.vars[f["id"]].get()]
-        if not active: return messagebox.showinfo("Info", "Selecciona algo primero.")
-        
-        if not messagebox.askyesno("Confirmar", f"Aplicar {len(active)} optimizaciones?"): return
-
-        def worker():
-            self.log("--- INICIANDO OPTIMIZACIÓN ---")
-            
-            # SIEMPRE CREAR PUNTO DE RESTAURACIÓN
-            self.log("Creando Punto de Restauración...", "INFO")
-            SystemUtils.run_ps("Checkpoint-Computer -Description 'DrVicho_v5' -RestorePointType 'MODIFY_SETTINGS'")
-            
-            total = len(active)
-            for i, item in enumerate(active):
-                fid = item["id"]
-                self.log(f"Aplicando: {item['name']}...")
-                
-                # --- LÓGICA TWEAKS ---
-                if fid == "ult_perf":
-                    SystemUtils.run_ps("powercfg -duplicatescheme e9a42b02-d5df-448d-aa00-03f14749eb61; powercfg -setactive e9a42b02-d5df-448d-aa00-03f14749eb61")
-                
-                elif fid == "game_mode":
-                    SystemUtils.set_reg(winreg.HKEY_CURRENT_USER, r"Software\Microsoft\GameBar", "AllowAutoGameMode", 1, winreg.REG_DWORD)
-                
-                elif fid == "gpu_sched":
-                    SystemUtils.set_reg(winreg.HKEY_LOCAL_MACHINE, r"SYSTEM\CurrentControlSet\Control\GraphicsDrivers", "HwSchMode", 2, winreg.REG_DWORD)
-                
-                elif fid == "fso_disable":
-                    SystemUtils.set_reg(winreg.HKEY_CURRENT_USER, r"System\GameConfigStore", "GameDVR_FSEBehaviorMode", 2, winreg.REG_DWORD)
-                
-                elif fid == "mouse_fix":
-                    SystemUtils.set_reg(winreg.HKEY_CURRENT_USER, r"Control Panel\Mouse", "MouseSpeed", "0", winreg.REG_SZ)
-                    SystemUtils.set_reg(winreg.HKEY_CURRENT_USER, r"Control Panel\Mouse", "MouseThreshold1", "0", winreg.REG_SZ)
-                    SystemUtils.set_reg(winreg.HKEY_CURRENT_USER, r"Control Panel\Mouse", "MouseThreshold2", "0", winreg.REG_SZ)
-
-                elif fid == "kb_delay":
-                    # Ajustes pro-gamer para teclado
-                    SystemUtils.set_reg(winreg.HKEY_CURRENT_USER, r"Control Panel\Keyboard", "KeyboardDelay", "0", winreg.REG_SZ)
-                    SystemUtils.set_reg(winreg.HKEY_CURRENT_USER, r"Control Panel\Keyboard", "KeyboardSpeed", "31", winreg.REG_SZ)
-                
-                elif fid == "power_throt":
-                    SystemUtils.set_reg(winreg.HKEY_LOCAL_MACHINE, r"SYSTEM\CurrentControlSet\Control\Power\PowerThrottling", "PowerThrottlingOff", 1, winreg.REG_DWORD)
-
-                elif fid == "classic_ctx":
-                    # El comando mágico para Win11
-                    SystemUtils.run_ps('reg add "HKCU\Software\Classes\CLSID\{86ca1aa0-34aa-4e8b-a509-50c905bae2a2}\InprocServer32" /f /ve')
-                
-                elif fid == "snap_assist":
-                    SystemUtils.set_reg(winreg.HKEY_CURRENT_USER, r"Control Panel\Desktop", "WindowArrangementActive", "0", winreg.REG_SZ)
-
-                elif fid == "widgets_kill":
-                    SystemUtils.set_reg(winreg.HKEY_CURRENT_USER, r"Software\Microsoft\Windows\CurrentVersion\Explorer\Advanced", "TaskbarDa", 0, winreg.REG_DWORD)
-                    SystemUtils.set_reg(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Policies\Microsoft\Windows\Windows Chat", "ChatIcon", 3, winreg.REG_DWORD)
-
-                elif fid == "transparency":
-                    SystemUtils.set_reg(winreg.HKEY_CURRENT_USER, r"Software\Microsoft\Windows\CurrentVersion\Themes\Personalize", "EnableTransparency", 0, winreg.REG_DWORD)
-
-                elif fid == "dns_cloud":
-                    SystemUtils.run_ps("Get-NetAdapter | Where-Object Status -eq 'Up' | Set-DnsClientServerAddress -ServerAddresses 1.1.1.1, 1.0.0.1")
-
-                elif fid == "tcp_nagle":
-                    # Requiere iterar interfaces
-                    SystemUtils.run_ps("Get-NetAdapter | ForEach-Object { New-ItemProperty -Path \"HKLM:\SYSTEM\CurrentControlSet\Services\Tcpip\Parameters\Interfaces\$($_.InterfaceGuid)\" -Name \"TcpAckFrequency\" -Value 1 -PropertyType DWORD -Force; New-ItemProperty -Path \"HKLM:\SYSTEM\CurrentControlSet\Services\Tcpip\Parameters\Interfaces\$($_.InterfaceGuid)\" -Name \"TCPNoDelay\" -Value 1 -PropertyType DWORD -Force }")
-
-                elif fid == "net_throt":
-                    SystemUtils.set_reg(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\Multimedia\SystemProfile", "NetworkThrottlingIndex", 0xffffffff, winreg.REG_DWORD)
-
-                elif fid == "telemetry":
-                    SystemUtils.run_ps("Stop-Service DiagTrack -Force; Set-Service DiagTrack -StartupType Disabled")
-                
-                elif fid == "activity":
-                    SystemUtils.set_reg(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Policies\Microsoft\Windows\System", "PublishUserActivities", 0, winreg.REG_DWORD)
-                
-                elif fid == "location":
-                    SystemUtils.set_reg(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Windows\CurrentVersion\CapabilityAccessManager\ConsentStore\location", "Value", "Deny", winreg.REG_SZ)
-
-                time.sleep(0.1)
-            
-            self.log("!!! COMPLETADO !!! Reinicia tu PC.", "SUCCESS")
-            messagebox.showinfo("DrVicho v5", "Proceso terminado. REINICIA TU PC AHORA.")
-
-        threading.Thread(target=worker, daemon=True).start()
-
-    # --- HERRAMIENTAS MANTENIMIENTO ---
-    def run_sfc(self):
-        self.log("Iniciando SFC (Esto tarda un rato)...", "WARNING")
-        def t():
-            SystemUtils.run_ps("sfc /scannow")
-            self.log("SFC Finalizado. Revisa si hubo errores.", "SUCCESS")
-        threading.Thread(target=t, daemon=True).start()
-
-    def run_dism(self):
-        self.log("Iniciando DISM RestoreHealth...", "WARNING")
-        def t():
-            SystemUtils.run_ps("DISM /Online /Cleanup-Image /RestoreHealth")
-            self.log("DISM Finalizado.", "SUCCESS")
-        threading.Thread(target=t, daemon=True).start()
-    
-    def run_net_reset(self):
-        SystemUtils.run_ps("netsh int ip reset; ipconfig /flushdns; ipconfig /release; ipconfig /renew")
-        self.log("Red reseteada y DNS limpiada.", "SUCCESS")
+                    os.makedirs(parked, exist_ok=True)
+                    os.replace(item["file"], moves[fid]["dst"])
+                    results[item["id"]] = (True, "Desactivado")
+                except OSError as e: results[item["id"]] = (False, f"Error: {e}")
+            elif item["kind"] == "task":
+                commands.append((item["id"], f"Disable-ScheduledTask -TaskPath {_ps_quote(item['task_path'])} -TaskName {_ps_quote(item['task_name'])} | Out-Null"))
+        if commands:
+            for key, result in self._batch(commands).items():
+                if not key.startswith("stop:"): results[key] = result
+                elif not result[0]: results[key[5:]] = (True, "Desactivado (se detendrá al reiniciar)")
+        return results
 
-    def run_clean_temp(self):
-        SystemUtils.run_ps("Remove-Item -Path $env:TEMP\* -Recurse -Force -ErrorAction SilentlyContinue")
-        self.log("Archivos Temporales eliminados.", "SUCCESS")
+    def restore(self, records):
+        restored, commands = 0, []
+        for i, r in enumerate(records):
+            if r["type"] == "folder":
+                try:
+                    os.replace(r["dst"], r["src"])
+                    restored += 1
+                except OSError: pass
+            elif r["type"] == "task":
+                commands.append((i, f"Enable-ScheduledTask -TaskPath {_ps_quote(r['path'])} -TaskName {_ps_quote(r['name'])} | Out-Null"))
+            elif r["type"] == "service":
+                commands.append((i, f"Start-Service -Name {_ps_quote(r['name'])}"))
+        if commands: restored += sum(ok for ok, _ in self._batch(commands).values())
+        return restored
 
-if __name__ == "__main__":
-    if SystemUtils.is_admin():
-        root = tk.Tk()
-        app = DrVichoApp(root)
-        root.mainloop()
+class MemoryStartup:
+    # Backend en memoria para probar perfil, lote y deshacer fuera de Windows
+    def __init__(self, items=None, procs=None):
+        self.items = {i["id"]: dict(i, enabled=i.get("enabled", True)) for i in items or []}
+        self.procs = list(procs or [])
+        self.snapshots = 0
+        self.batches = 0
+
+    @staticmethod
+    def synthetic(n=5000, seed=0):
+        rng = random.Random(seed)
+        kinds = ("service", "run", "task", "folder")
+        items, procs, pid = [], [], 100
+        shared = {"pid": 4000, "name": "svchost.exe", "cpu_s": 40.0, "mem": 300 << 20, "disk": 500 << 20}
+        procs.append(shared)
+        for i in range(n):
+            kind = kinds[i % len(kinds)]
+            item = {"id": f"{kind}:app{i}", "kind": kind, "name": f"App {i}", "image": f"app{i}.exe", "detail": "",
+                    "protected": kind == "service" and i % 97 == 0}
+            if kind == "service" and i % 10 == 0: item["pid"] = shared["pid"]
+            elif rng.random() < 0.3:
+                pid += 1
+                procs.append({"pid": pid, "name": item["image"], "cpu_s": rng.expovariate(1.0), "mem": rng.randrange(1, 400) << 20,
+                              "disk": rng.randrange(0, 50) << 20})
+            items.append(item)
+        return MemoryStartup(items, procs)
+
+    def snapshot(self):
+        self.snapshots += 1
+        return {"items": [dict(i) for i in self.items.values() if i["enabled"]], "procs": list(self.procs), "ts": time.time()}
+
+    def disable(self, items, before=None):
+        self.batches += 1
+        if before: before([{"fid": f"startup:{i['id']}", "type": "memory", "id": i["id"]} for i in items])
+        results = {}
+        for item in items:
+            current = self.items.get(item["id"])
+            if current is None: results[item["id"]] = (False, "No existe")
+            else:
+                current["enabled"] = False
+                results[item["id"]] = (True, "Desactivado")
+        return results
+
+    def restore(self, records):
+        restored = 0
+        for r in records:
+            current = self.items.get(r.get("id"))
+            if current is not None and not current["enabled"]:
+                current["enabled"] = True
+                restored += 1
+        return restored
+
+class StartupProfiler:
+    def __init__(self, backend=None, ttl=300.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.cache = None # (ts, ranking)
+        self.lock = threading.Lock()
+
+    def _backend(self):
+        return self.backend or SystemUtils.startup_backend()
+
+    def scan(self, force=False):
+        # Ranking de mayor a menor impacto; la enumeración se repite solo si caducó
+        with self.lock:
+            if force or self.cache is None or time.time() - self.cache[0] > self.ttl:
+                with trace("startup_scan", "startup") as span:
+                    ranking = rank_startup(self._backend().snapshot())
+                    span.set(True, items=len(ranking))
+                self.cache = (time.time(), ranking)
+            return self.cache[1]
+
+    def invalidate(self):
+        with self.lock: self.cache = None
+
+    def disable(self, ids, log=None, label=None):
+        log = log or _no_log
+        by_id = {item["id"]: item for item in self.scan()}
+        items, results = [], {}
+        for sid in dict.fromkeys(ids):
+            item = by_id.get(sid)
+            if item is None: results[sid] = (False, "No encontrado")
+            elif item.get("protected"): results[sid] = (False, "Protegido: necesario para Windows")
+            else: items.append(item)
+        journal = SystemUtils.journal
+        if journal: journal.begin(label or f"inicio: {len(items)} elementos")
+        before = (lambda records: journal.record_actions("startup", records)) if journal else None
+        if items:
+            with trace("startup_disable", "startup", items=len(items)):
+                results.update(self._backend().disable(items, before))
+        self.invalidate()
+        for sid, (ok, msg) in results.items():
+            log(f"{by_id.get(sid, {}).get('name', sid)}: {msg}", "SUCCESS" if ok else "ERROR", f"startup:{sid}")
+        return results
+
+def startup_table(ranking, top=20):
+    lines = [f"{'elemento':<36} {'tipo':<8} {'impacto':<7} {'CPU s':>7} {'RAM MB':>7} {'disco MB':>8}"]
+    for r in ranking[:top]:
+        lines.append(f"{r['name'][:36]:<36} {r['kind']:<8} {r['impact']:<7} {r['cpu_s']:7.1f} {r['mem'] / 1048576:7.0f} "
+                     f"{r['disk'] / 1048576:8.1f}{'' if r['measured'] else ' ~'}")
+    return "\n".join(lines)
+
+def bench_startup_profiler(n=5000, disable=500):
+    import tempfile
+    backend = MemoryStartup.synthetic(n)
+    profiler = StartupProfiler(backend)
+    t0 = time.perf_counter()
+    ranking = profiler.scan()
+    scan_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    profiler.scan()
+    cached_ms = (time.perf_counter() - t0) * 1000
+    tmp = tempfile.mkdtemp()
+    try:
+        with SystemUtils.backends(registry=MemoryRegistry(), startup=backend, journal=RegJournal(os.path.join(tmp, "journal.jsonl"))):
+            ids = [r["id"] for r in ranking if not r["protected"]][:disable]
+            t0 = time.perf_counter()
+            results = profiler.disable(ids)
+            disable_ms = (time.perf_counter() - t0) * 1000
+            remaining = len(profiler.scan())
+            ok, msg = SystemUtils.undo()
+            restored = len(profiler.scan(force=True))
+    finally:
+        import shutil
+        shutil.rmtree(tmp, ignore_errors=True)
+    return {"n": n, "scan_ms": scan_ms, "cached_ms": cached_ms, "disable_ms": disable_ms, "batches": backend.batches,
+            "disabled": sum(ok for ok, _ in results.values()), "after_disable": remaining, "after_undo": restored, "undo": msg}
+
+# --- LIMPIADOR DE TEMPORALES ---
+# Recorre cada ubicación en paralelo con os.scandir y borra por lotes mientras
+# avanza. Con dry_run solo cuenta los bytes recuperables. Los archivos en uso
+# (PermissionError) se saltan y se cuentan aparte.
+def default_clean_locations():
+    env = os.environ.get
+    local = env("LOCALAPPDATA", "")
+    windir = env("SystemRoot", r"C:\Windows")
+    locs = [
+        {"name": "Temp usuario", "paths": [env("TEMP") or env("TMP") or "/tmp"]},
+        {"name": "Temp Windows", "paths": [os.path.join(windir, "Temp")]},
+        {"name": "Caché Windows Update", "paths": [os.path.join(windir, "SoftwareDistribution", "Download")]},
+        {"name": "Miniaturas", "paths": [os.path.join(local, "Microsoft", "Windows", "Explorer")],
+         "patterns": ["thumbcache_*.db", "iconcache_*.db"], "recursive": False},
+        {"name": "Caché Chrome", "paths": glob.glob(os.path.join(local, "Google", "Chrome", "User Data", "*", "Cache"))},
+        {"name": "Caché Edge", "paths": glob.glob(os.path.join(local, "Microsoft", "Edge", "User Data", "*", "Cache"))},
+        {"name": "Caché Firefox", "paths": glob.glob(os.path.join(local, "Mozilla", "Firefox", "Profiles", "*", "cache2"))},
+    ]
+    if os.name != "nt": locs = locs[:1]
+    return [loc for loc in locs if any(os.path.isdir(p) for p in loc["paths"])]
+
+class CleanStats:
+    def __init__(self):
+        self.files = 0       # archivos que cumplen los filtros
+        self.bytes = 0
+        self.deleted = 0
+        self.freed = 0
+        self.locked = 0      # en uso o sin permiso: se saltan
+        self.dirs = 0
+
+    def merge(self, other):
+        for k, v in vars(other).items(): setattr(self, k, getattr(self, k) + v)
+
+    def as_dict(self):
+        return dict(vars(self))
+
+class TempCleaner:
+    REPARSE = getattr(stat, "FILE_ATTRIBUTE_REPARSE_POINT", 0x400)
+
+    def __init__(self, workers=8, batch=512, min_age=0, min_size=0, patterns=None, exclude=None,
+                 dry_run=False, remove_dirs=True, on_progress=None, cancel=None):
+        self.workers = workers
+        self.batch = batch
+        self.min_age = min_age
+        self.min_size = min_size
+        self.patterns = patterns
+        self.exclude = exclude or []
+        self.dry_run = dry_run
+        self.remove_dirs = remove_dirs
+        self.on_progress = on_progress  # callback(nombre, CleanStats) tras cada lote
+        self.cancel = cancel or threading.Event()
+
+    def _is_link(self, entry):
+        # No se siguen symlinks ni junctions: nunca salir de la ubicación
+        if entry.is_symlink(): return True
+        attrs = getattr(entry.stat(follow_symlinks=False), "st_file_attributes", 0)
+        return bool(attrs & self.REPARSE)
+
+    def _match(self, name, st, now, loc):
+        patterns = loc.get("patterns", self.patterns)
+        if patterns and not any(fnmatch.fnmatch(name.lower(), p.lower()) for p in patterns): return False
+        if any(fnmatch.fnmatch(name.lower(), p.lower()) for p in self.exclude): return False
+        if st.st_size < loc.get("min_size", self.min_size): return False
+        return now - st.st_mtime >= loc.get("min_age", self.min_age)
+
+    def _flush(self, batch, stats):
+        for path, size in batch:
+            try:
+                os.unlink(path)
+                stats.deleted += 1
+                stats.freed += size
+            except FileNotFoundError:
+                pass
+            except PermissionError:
+                # Archivo en uso; en Windows también puede ser solo-lectura
+                try:
+                    os.chmod(path, stat.S_IWRITE)
+                    os.unlink(path)
+                    stats.deleted += 1
+                    stats.freed += size
+                except OSError:
+                    stats.locked += 1
+            except OSError:
+                stats.locked += 1
+        batch.clear()
+
+    def _scan_dir(self, path, loc, stats, subdirs):
+        now = time.time()
+        batch = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if self.cancel.is_set(): break
+                    try:
+                        if self._is_link(entry):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            if loc.get("recursive", True): subdirs.append(entry.path)
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        stats.locked += 1
+                        continue
+                    if not self._match(entry.name, st, now, loc): continue
+                    stats.files += 1
+                    stats.bytes += st.st_size
+                    if not self.dry_run:
+                        batch.append((entry.path, st.st_size))
+                        if len(batch) >= self.batch: self._flush(batch, stats)
+        except OSError:
+            stats.locked += 1
+        if batch: self._flush(batch, stats)
+
+    def clean(self, loc):
+        # Devuelve CleanStats de una ubicación {"name", "paths", filtros opcionales}
+        total = CleanStats()
+        lock = threading.Lock()
+        visited = []
+        pending = [0]
+        done = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            def task(path, depth):
+                stats, subdirs = CleanStats(), []
+                try:
+                    self._scan_dir(path, loc, stats, subdirs)
+                    stats.dirs = 1
+                finally:
+                    with lock:
+                        total.merge(stats)
+                        visited.append((depth, path))
+                        for sub in subdirs if not self.cancel.is_set() else []:
+                            pending[0] += 1
+                            pool.submit(task, sub, depth + 1)
+                        pending[0] -= 1
+                        if pending[0] == 0: done.set()
+                    if self.on_progress and (stats.deleted or stats.files): self.on_progress(loc["name"], total)
+
+            roots = [p for p in loc["paths"] if os.path.isdir(p)]
+            pending[0] = len(roots)
+            if not roots: return total
+            for p in roots: pool.submit(task, p, 0)
+            done.wait()
+
+        if self.remove_dirs and not self.dry_run:
+            # De abajo hacia arriba; nunca se borra la raíz de la ubicación
+            for depth, path in sorted(visited, reverse=True):
+                if depth == 0: continue
+                try: os.rmdir(path)
+                except OSError: pass
+        return total
+
+    def run(self, locations=None):
+        results = {}
+        for loc in locations if locations is not None else default_clean_locations():
+            if self.cancel.is_set(): break
+            results[loc["name"]] = self.clean(loc)
+        return results
+
+def _human(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB": return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+def bench_cleaner(files=200000, fanout=50, workers=8):
+    # Árbol sintético: fanout directorios x fanout subdirectorios, archivos repartidos
+    import tempfile, shutil
+    root = tempfile.mkdtemp(prefix="drvicho_bench_")
+    try:
+        per_dir = max(1, files // (fanout * fanout))
+        created = 0
+        for a in range(fanout):
+            for b in range(fanout):
+                d = os.path.join(root, f"d{a}", f"s{b}")
+                os.makedirs(d)
+                for i in range(per_dir):
+                    with open(os.path.join(d, f"f{i}.tmp"), "wb") as f: f.write(b"x" * 64)
+                    created += 1
+        loc = {"name": "bench", "paths": [root]}
+        t0 = time.perf_counter()
+        scan = TempCleaner(workers=workers, dry_run=True).clean(loc)
+        t_scan = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        done = TempCleaner(workers=workers).clean(loc)
+        t_clean = time.perf_counter() - t0
+        return {"files": created, "scan_s": t_scan, "clean_s": t_clean, "files_per_s": done.deleted / t_clean if t_clean else 0,
+                "reclaimable": scan.bytes, "deleted": done.deleted, "left": sum(len(f) for _, _, f in os.walk(root))}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+# --- TRABAJOS DE MANTENIMIENTO ---
+# Procesos largos (SFC, DISM...) con salida en streaming línea a línea,
+# progreso parseado, cancelación y timeout. Un mismo trabajo no puede
+# lanzarse dos veces a la vez.
+MAINTENANCE_JOBS = {
+    "sfc": {"steps": [["sfc", "/scannow"]], "timeout": 3600},
+    "dism": {"steps": [["DISM", "/Online", "/Cleanup-Image", "/RestoreHealth"]], "timeout": 7200},
+    "net_reset": {"steps": [["netsh", "int", "ip", "reset"], ["ipconfig", "/flushdns"], ["ipconfig", "/release"], ["ipconfig", "/renew"]], "timeout": 300},
+    "clean_temp": {"steps": [lambda job: clean_temp_step(job, dry_run=False)], "timeout": 1800},
+    "clean_scan": {"steps": [lambda job: clean_temp_step(job, dry_run=True)], "timeout": 600},
+}
+
+def clean_temp_step(job, dry_run=False, locations=None):
+    locations = default_clean_locations() if locations is None else locations
+    cleaner = TempCleaner(dry_run=dry_run, cancel=job.stop)
+    total = CleanStats()
+    for i, loc in enumerate(locations):
+        if job.stop.is_set(): break
+        stats = cleaner.clean(loc)
+        total.merge(stats)
+        if dry_run:
+            job.line(f"{loc['name']}: {_human(stats.bytes)} recuperables en {stats.files} archivos")
+        else:
+            job.line(f"{loc['name']}: {_human(stats.freed)} liberados ({stats.deleted} archivos, {stats.locked} en uso)")
+        job.set_progress(100.0 * (i + 1) / len(locations))
+    job.line(f"Total: {_human(total.bytes if dry_run else total.freed)} {'recuperables' if dry_run else 'liberados'}")
+    return 0
+
+class Job:
+    PROGRESS = re.compile(r"(\d{1,3}(?:[.,]\d+)?)\s*%")
+
+    def __init__(self, name, steps, timeout=None, on_line=None, on_progress=None, on_done=None):
+        self.name = name
+        self.steps = steps
+        self.timeout = timeout
+        self.on_line = on_line
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.status = "pending" # running | ok | error | cancelled | timeout
+        self.returncode = None
+        self.progress = None
+        self.lines = 0
+        self.proc = None
+        self.started = None
+        self.elapsed = 0.0
+        self._cancel = threading.Event()
+        self.stop = threading.Event() # cancelación o timeout; los pasos Python lo consultan
+        self._thread = None
+
+    def cancel(self):
+        self._cancel.set()
+        self.stop.set()
+        self._kill()
+
+    def _expire(self):
+        self.stop.set()
+        self._kill()
+
+    def line(self, text):
+        # Para pasos Python: misma ruta que una línea de salida de un proceso
+        self.lines += 1
+        if self.on_line: self.on_line(self, text)
+
+    def set_progress(self, pct):
+        self.progress = pct
+        if self.on_progress: self.on_progress(self, pct)
+
+    def _kill(self):
+        # Mata el árbol entero: un nieto que herede stdout dejaría la lectura bloqueada
+        proc = self.proc
+        if proc is None: return
+        try:
+            if os.name == "nt":
+                if proc.poll() is not None: return
+                subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=subprocess.CREATE_NO_WINDOW)
+            else:
+                # Cada paso es líder de su propio grupo (start_new_session); el grupo
+                # sigue vivo aunque el hijo directo ya haya terminado
+                os.killpg(proc.pid, signal.SIGKILL)
+        except Exception: pass
+
+    @staticmethod
+    def _decode(data):
+        # sfc escribe UTF-16LE cuando su salida está redirigida
+        if data.count(b"\x00") * 3 >= len(data):
+            data = data.lstrip(b"\x00")
+            if len(data) % 2: data += b"\x00"
+            return data.decode("utf-16-le", errors="replace")
+        return data.decode("oem" if os.name == "nt" else "utf-8", errors="replace")
+
+    def _emit(self, raw):
+        line = self._decode(raw).strip()
+        if not line: return
+        m = self.PROGRESS.search(line)
+        if m:
+            pct = min(100.0, float(m.group(1).replace(",", ".")))
+            if pct != self.progress:
+                self.progress = pct
+                if self.on_progress: self.on_progress(self, pct)
+            return # Las líneas de progreso solo mueven la barra
+        self.lines += 1
+        if self.on_line: self.on_line(self, line)
+
+    def _run_step(self, argv, deadline):
+        kwargs = {"creationflags": subprocess.CREATE_NO_WINDOW} if os.name == "nt" else {"start_new_session": True}
+        self.proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **kwargs)
+        count_proc()
+        watchdog = None
+        if deadline is not None:
+            watchdog = threading.Timer(max(0.0, deadline - time.monotonic()), self._expire)
+            watchdog.daemon = True
+            watchdog.start()
+        buf = b""
+        try:
+            while True:
+                chunk = self.proc.stdout.read1(4096)
+                if not chunk: break
+                buf += chunk
+                # \r también separa: así se ven las actualizaciones de progreso en sitio
+                parts = re.split(rb"\r\n|\r|\n", buf)
+                buf = parts.pop()
+                for part in parts: self._emit(part)
+            if buf: self._emit(buf)
+        finally:
+            if watchdog: watchdog.cancel()
+            self.proc.stdout.close()
+        return self.proc.wait()
+
+    def _run(self):
+        with trace(f"job:{self.name}", "job") as span:
+            self._run_steps()
+            span.set(self.status == "ok", status=self.status, lines=self.lines)
+        if self.on_done: self.on_done(self)
+
+    def _run_steps(self):
+        self.status = "running"
+        self.started = time.monotonic()
+        deadline = None if self.timeout is None else self.started + self.timeout
+        try:
+            for step in self.steps:
+                if self._cancel.is_set(): break
+                if callable(step):
+                    # Paso en Python (p. ej. el limpiador): recibe el Job y devuelve un código
+                    watchdog = threading.Timer(max(0.0, deadline - time.monotonic()), self._expire) if deadline else None
+                    if watchdog:
+                        watchdog.daemon = True
+                        watchdog.start()
+                    try:
+                        with trace(f"{self.name}:python", "job"):
+                            self.returncode = step(self)
+                    finally:
+                        if watchdog: watchdog.cancel()
+                else:
+                    with trace(f"{self.name}:{step[0]}", "job") as span:
+                        self.returncode = self._run_step(step, deadline)
+                        span.set(self.returncode == 0, rc=self.returncode)
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.status = "timeout"
+                    break
+                if self._cancel.is_set(): break
+            if self._cancel.is_set(): self.status = "cancelled"
+            elif self.status == "running": self.status = "ok" if self.returncode == 0 else "error"
+        except Exception as e:
+            self.status = "error"
+            if self.on_line: self.on_line(self, str(e))
+        self.elapsed = time.monotonic() - self.started
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        if self._thread: self._thread.join(timeout)
+        return self.status
+
+class JobRunner:
+    def __init__(self):
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def running(self, name):
+        job = self.jobs.get(name)
+        return job is not None and job.status in ("pending", "running")
+
+    def start(self, name, steps, timeout=None, on_line=None, on_progress=None, on_done=None):
+        # Devuelve el Job, o None si ya hay uno igual en curso
+        with self.lock:
+            if self.running(name): return None
+            job = Job(name, steps, timeout, on_line, on_progress, on_done)
+            self.jobs[name] = job
+        job.start()
+        return job
+
+    def cancel(self, name):
+        job = self.jobs.get(name)
+        if job is None or not self.running(name): return False
+        job.cancel()
+        return True
+
+def bench_jobs(lines=50000):
+    # Streaming de un proceso hijo: 90% líneas de texto y 10% progreso en sitio (\r)
+    code = ("import sys\nn = %d\nfor i in range(n):\n"
+            "    sys.stdout.write('linea %%d\\n' %% i if i %% 10 else 'Verificación %%d%%%% completada.\\r' %% (i * 100 // n))\n" % lines)
+    updates = []
+    job = Job("bench", [[sys.executable, "-c", code]], timeout=120, on_progress=lambda job, pct: updates.append(pct))
+    t0 = time.perf_counter()
+    job.start()
+    job.wait()
+    took = time.perf_counter() - t0
+    return {"lines": job.lines, "progress_updates": len(updates), "status": job.status, "wall_s": took,
+            "lines_per_s": job.lines / took if took else 0.0}
+
+# --- PIPELINE DE LOGS ---
+# Cualquier hilo puede llamar a emit(): los registros van a dos colas sin
+# bloqueo. La consola las vacía por lotes desde el hilo de Tk y un hilo aparte
+# escribe JSONL (ts, level, fid, duration) en un archivo con rotación.
+class LogPipeline:
+    def __init__(self, path=None, max_bytes=2 * 1024 * 1024, backups=3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.ui = queue.SimpleQueue()
+        self.file = queue.SimpleQueue()
+        self.written = 0
+        self.dropped = 0
+        # Registros encolados y aún no escritos (o descartados): flush() espera a 0
+        self._pending = 0
+        self._done = threading.Condition()
+        if path: threading.Thread(target=self._writer, daemon=True).start()
+
+    def emit(self, msg, level="INFO", fid=None, duration=None):
+        record = {"ts": time.time(), "level": level, "msg": msg}
+        if fid is not None: record["fid"] = fid
+        if duration is not None: record["duration"] = round(duration, 6)
+        self.ui.put(record)
+        if self.path:
+            with self._done: self._pending += 1
+            self.file.put(record)
+
+    def drain(self, limit=500):
+        batch = []
+        try:
+            while len(batch) < limit: batch.append(self.ui.get_nowait())
+        except queue.Empty: pass
+        return batch
+
+    def flush(self, timeout=5.0):
+        # Espera a que el escritor vacíe la cola (benchmarks y cierre)
+        with self._done: return self._done.wait_for(lambda: not self._pending, timeout)
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"): os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def _writer(self):
+        # Si el fichero no se puede abrir, el lote se descarta y se reintenta con
+        # el siguiente: el hilo no muere y flush() no se queda esperando
+        f, size = None, 0
+        while True:
+            batch = [self.file.get()]
+            try:
+                while len(batch) < 1000: batch.append(self.file.get_nowait())
+            except queue.Empty: pass
+            data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch)
+            try:
+                if f is None:
+                    f = open(self.path, "a", encoding="utf-8")
+                    size = f.tell()
+                f.write(data)
+                f.flush()
+            except OSError:
+                self.dropped += len(batch)
+                if f is not None:
+                    with contextlib.suppress(OSError): f.close()
+                f = None
+            else:
+                size += len(data)
+                self.written += len(batch)
+                if size >= self.max_bytes:
+                    with contextlib.suppress(OSError):
+                        f.close()
+                        self._rotate()
+                    f = None
+            with self._done:
+                self._pending -= len(batch)
+                if not self._pending: self._done.notify_all()
+
+def bench_log(n=10000, path=None, drain_every=500):
+    # Mide emit() desde varios hilos + vaciado por lotes (sin Tk) + escritura JSONL
+    import tempfile
+    tmp = None
+    if path is None:
+        tmp = tempfile.mkdtemp()
+        path = os.path.join(tmp, "bench.jsonl")
+    pipe = LogPipeline(path)
+    per_thread = n // 4
+
+    def producer(k):
+        for i in range(per_thread): pipe.emit(f"mensaje {k}-{i}", "INFO", fid="bench", duration=0.001)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=producer, args=(k,)) for k in range(4)]
+    for t in threads: t.start()
+    drained, worst = 0, 0.0
+    while drained < per_thread * 4:
+        d0 = time.perf_counter()
+        drained += len(pipe.drain(drain_every))
+        worst = max(worst, time.perf_counter() - d0)
+    for t in threads: t.join()
+    emit_s = time.perf_counter() - t0
+    pipe.flush()
+    total_s = time.perf_counter() - t0
+    if tmp:
+        import shutil
+        shutil.rmtree(tmp, ignore_errors=True)
+    return {"n": per_thread * 4, "msgs_per_s": per_thread * 4 / emit_s, "with_file_s": total_s, "worst_drain_ms": worst * 1000}
+
+# --- PERFILES Y MODO SIN INTERFAZ ---
+# Un perfil es un JSON o TOML con la lista de ids a aplicar:
+#   {"name": "Gaming", "features": ["ult_perf", "mouse_fix"], "restore_point": false}
+# "dns_servers" (opcional) sustituye los servidores de dns_cloud.
+EXIT_OK, EXIT_FAILED, EXIT_USAGE, EXIT_NOT_ADMIN = 0, 1, 2, 3
+
+def load_profile(path):
+    # "-" lee el perfil (JSON) de stdin: así lo recibe cada equipo de la flota
+    if path == "-": data = sys.stdin.buffer.read()
+    else:
+        with open(path, "rb") as f: data = f.read()
+    if path.lower().endswith(".toml"):
+        import tomllib
+        profile = tomllib.loads(data.decode("utf-8"))
     else:
+        profile = json.loads(data)
+    if not isinstance(profile, dict): raise ValueError("El perfil debe ser un objeto con 'features'")
+    features = profile.get("features")
+    if not isinstance(features, list) or not features:
+        raise ValueError("El perfil no tiene 'features'")
+    if not all(isinstance(fid, str) for fid in features): raise ValueError("'features' debe ser una lista de ids (texto)")
+    unknown = [fid for fid in features if fid not in TWEAKS]
+    if unknown: raise ValueError(f"Ids desconocidos: {', '.join(map(str, unknown))}")
+    dns = profile.get("dns_servers")
+    if dns is not None and (not isinstance(dns, list) or not dns): raise ValueError("'dns_servers' debe ser una lista de IPs")
+    return {"name": profile.get("name") or ("stdin" if path == "-" else os.path.splitext(os.path.basename(path))[0]),
+            "features": features, "restore_point": bool(profile.get("restore_point", False)), "dns_servers": dns}
+
+def _cli_log(verbose):
+    def log(msg, level="INFO", fid=None, duration=None):
+        if verbose or level == "ERROR": print(f"[{level}] {msg}", file=sys.stderr)
+    return log
+
+def cli(argv):
+    import argparse
+    parser = argparse.ArgumentParser(prog="drvicho", description="DrVicho Optimizer sin interfaz.")
+    parser.add_argument("--json", action="store_true", help="salida JSON en stdout")
+    parser.add_argument("-v", "--verbose", action="store_true", help="progreso en stderr")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("apply", help="aplica un perfil")
+    p.add_argument("profile")
+    p.add_argument("--restore-point", action="store_true", help="crea además un punto de restauración")
+    p.add_argument("--trace", metavar="FICHERO", help="guarda una traza Chrome trace-event y muestra el resumen en stderr")
+    p = sub.add_parser("verify", help="comprueba si un perfil ya está aplicado")
+    p.add_argument("profile")
+    p = sub.add_parser("rollback", help="deshace la última ejecución (o la de un tweak)")
+    p.add_argument("--fid")
+    p.add_argument("--run")
+    sub.add_parser("list", help="lista los tweaks disponibles")
+    p = sub.add_parser("dns", help="mide los resolvedores DNS candidatos")
+    p.add_argument("servers", nargs="*", help="ip o ip:puerto (por defecto, la lista de candidatos)")
+    p.add_argument("--rounds", type=int, default=5)
+    p.add_argument("--timeout", type=float, default=2.0)
+    p.add_argument("--apply", action="store_true", help="aplica los 2 más rápidos a los adaptadores activos")
+    p = sub.add_parser("bench", help="batería de benchmarks comparada con la referencia")
+    p.add_argument("names", nargs="*", help="benchmarks a ejecutar (por defecto, todos)")
+    p.add_argument("--baseline", help="fichero de referencia (por defecto bench_baseline.json)")
+    p.add_argument("--tolerance", type=float, default=0.3, help="empeoramiento relativo tolerado (0.3 = 30%%)")
+    p.add_argument("--save", action="store_true", help="guarda los resultados como nueva referencia")
+    p.add_argument("--repeat", type=int, default=5, help="pasadas por benchmark (se compara la mejor)")
+    p = sub.add_parser("fleet", help="aplica un perfil en varios equipos a la vez")
+    p.add_argument("profile")
+    p.add_argument("hosts", nargs="*")
+    p.add_argument("--hosts-file", help="un equipo por línea")
+    p.add_argument("--via", help='comando por equipo con {host}, p. ej. "ssh {host} python C:\\drvicho\\drvicho.py"')
+    p.add_argument("--simulate", action="store_true", help="equipos simulados en memoria (no toca ninguna máquina)")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--retries", type=int, default=2)
+    p.add_argument("--timeout", type=float, default=600.0)
+    p = sub.add_parser("startup", help="impacto de programas de inicio, tareas y servicios")
+    p.add_argument("--top", type=int, default=20)
+    p.add_argument("--disable", nargs="+", metavar="ID", help="desactiva estos elementos en un solo lote (se deshace con rollback)")
+    p = sub.add_parser("procs", help="prioridad y afinidad para juegos (hasta Ctrl+C)")
+    p.add_argument("--rules", help="JSON con games, hogs, game_priority, game_cores y hog_priority")
+    p.add_argument("--seconds", type=float, help="detener tras N segundos")
+    args = parser.parse_args(argv)
+
+    def emit(result, code):
+        if args.json: print(json.dumps(result, ensure_ascii=False, indent=2))
+        else:
+            for key, value in result.items(): print(f"{key}: {value}")
+        return code
+
+    if args.command == "list":
+        return emit({"features": [{"id": f["id"], "cat": f["cat"], "name": f["name"]} for f in FEATURES]}, EXIT_OK)
+
+    profile = None
+    if args.command in ("apply", "verify"):
+        try:
+            profile = load_profile(args.profile)
+            if profile["dns_servers"]: set_dns_servers(profile["dns_servers"])
+        except (OSError, ValueError) as e: return emit({"error": str(e)}, EXIT_USAGE)
+
+    if args.command == "bench":
+        unknown = [n for n in args.names if n not in BENCHMARKS]
+        if unknown: return emit({"error": f"Benchmarks desconocidos: {', '.join(unknown)}"}, EXIT_USAGE)
+        path = args.baseline or BENCH_BASELINE
+        try:
+            with open(path, encoding="utf-8") as f: baseline = json.load(f)
+        except FileNotFoundError: baseline = {}
+        except ValueError as e: return emit({"error": f"Referencia no válida: {e}"}, EXIT_USAGE)
+        results = run_benchmarks(args.names, _cli_log(args.verbose), args.repeat)
+        rows = compare_benchmarks(results, baseline, args.tolerance)
+        machine = baseline.get("_machine")
+        if args.save:
+            baseline.update({name: {k: round(v, 6) for k, v in m.items()} for name, m in results.items() if "skipped" not in m})
+            baseline["_machine"] = bench_machine()
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(baseline, f, indent=2, sort_keys=True)
+                f.write("\n")
+        if not args.json: print(bench_table(results, rows, machine))
+        regressions = [f"{r['bench']}.{r['metric']}" for r in rows if r["regression"]]
+        return emit({"results": results, "comparison": rows, "regressions": regressions} if args.json else {"regressions": ", ".join(regressions) or "ninguna"},
+                    EXIT_FAILED if regressions else EXIT_OK)
+
+    if args.command == "fleet":
+        try:
+            profile = load_profile(args.profile)
+            hosts = list(args.hosts)
+            if args.hosts_file:
+                with open(args.hosts_file, encoding="utf-8") as f: hosts += [h.strip() for h in f if h.strip() and not h.startswith("#")]
+        except (OSError, ValueError) as e: return emit({"error": str(e)}, EXIT_USAGE)
+        if not hosts: return emit({"error": "Sin equipos"}, EXIT_USAGE)
+        if args.simulate: transport = InProcessTransport()
+        elif not args.via: return emit({"error": "Indica --via con {host} para llegar a cada equipo, o --simulate"}, EXIT_USAGE)
+        else:
+            import shlex
+            try: transport = SubprocessTransport(shlex.split(args.via, posix=os.name != "nt"))
+            except ValueError as e: return emit({"error": str(e)}, EXIT_USAGE)
+        report = Fleet(transport, args.concurrency, args.retries, args.timeout, log=_cli_log(args.verbose)).run(hosts, profile)
+        if not args.json: print(fleet_table(report))
+        return emit(report if args.json else {"ok": f"{report['ok']}/{report['hosts']}"}, EXIT_OK if report["ok"] == report["hosts"] else EXIT_FAILED)
+
+    if args.command == "dns" and not args.apply:
+        results = DnsBenchmark(args.servers or None, rounds=args.rounds, timeout=args.timeout).run()
+        ranking = [r["server"] for r in results if r["score"] is not None]
+        if not args.json: print(dns_table(results))
+        return emit({"results": results, "ranking": ranking} if args.json else {"ranking": ", ".join(ranking)},
+                    EXIT_OK if ranking else EXIT_FAILED)
+
+    if args.command == "verify":
+        states = StateCache().scan(profile["features"])
+        missing = [fid for fid, applied in states.items() if not applied]
+        return emit({"profile": profile["name"], "applied": [f for f, a in states.items() if a], "missing": missing},
+                    EXIT_FAILED if missing else EXIT_OK)
+
+    if os.name == "nt" and not SystemUtils.is_admin():
+        return emit({"error": "Se requieren permisos de administrador"}, EXIT_NOT_ADMIN)
+    SystemUtils.journal = RegJournal()
+
+    if args.command == "dns":
+        current = current_dns_servers()
+        results = DnsBenchmark(list(args.servers or DNS_CANDIDATES) + current, rounds=args.rounds, timeout=args.timeout).run()
+        before = [r for r in results if r["host"] in current]
+        servers, report = apply_best_dns(results, _cli_log(args.verbose))
+        if not servers: return emit({"error": "Ningún resolvedor respondió", "results": results}, EXIT_FAILED)
+        after = DnsBenchmark(current_dns_servers() or servers, rounds=args.rounds, timeout=args.timeout).run()
+        failed = [fid for fid, r in report["results"].items() if not r["ok"]]
+        return emit({"servers": servers, "before": before, "after": after, **report, "failed": failed}, EXIT_FAILED if failed else EXIT_OK)
+
+    if args.command == "startup":
+        profiler = StartupProfiler()
+        try: ranking = profiler.scan()
+        except (OSError, ValueError) as e: return emit({"error": str(e)}, EXIT_FAILED)
+        if not args.disable:
+            if not args.json: print(startup_table(ranking, args.top))
+            return emit({"items": ranking[:args.top]} if args.json else {"total": len(ranking)}, EXIT_OK)
+        results = profiler.disable(args.disable, _cli_log(args.verbose), label="inicio: " + ",".join(args.disable))
+        failed = [sid for sid, (ok, _) in results.items() if not ok]
+        return emit({"results": {sid: {"ok": ok, "msg": msg} for sid, (ok, msg) in results.items()}, "failed": failed},
+                    EXIT_FAILED if failed else EXIT_OK)
+
+    if args.command == "procs":
+        try: rules = load_process_rules(args.rules)
+        except (OSError, ValueError) as e: return emit({"error": str(e)}, EXIT_USAGE)
+        manager = ProcessManager(rules=rules, log=_cli_log(True))
+        manager.start()
+        deadline = None if args.seconds is None else time.monotonic() + args.seconds
+        try:
+            while manager.running() and (deadline is None or time.monotonic() < deadline): time.sleep(0.2)
+        except KeyboardInterrupt: pass
+        manager.stop()
+        return emit(dict(manager.stats), EXIT_OK)
+
+    if args.command == "rollback":
+        ok, msg = SystemUtils.undo(args.run, args.fid)
+        return emit({"ok": ok, "msg": msg}, EXIT_OK if ok else EXIT_FAILED)
+
+    if args.trace: start_trace()
+    report = apply_features(profile["features"], _cli_log(args.verbose), restore_point=args.restore_point or profile["restore_point"],
+                            label=profile["name"])
+    failed = [fid for fid, r in report["results"].items() if not r["ok"]]
+    if args.trace:
+        tracer = stop_trace()
+        report["trace"] = tracer.export(args.trace)
+        print(tracer.table(), file=sys.stderr)
+    return emit({"profile": profile["name"], **report, "failed": failed}, EXIT_FAILED if failed else EXIT_OK)
+
+# --- FLOTA (VARIOS EQUIPOS) ---
+# Envía un perfil a N equipos a la vez con asyncio: concurrencia limitada,
+# reintentos con espera exponencial y un informe por equipo y por tweak. Cada
+# equipo ejecuta el mismo apply_features que la GUI (vía el modo sin interfaz).
+class SubprocessTransport:
+    # Lanza "drvicho --json apply -" por equipo con el perfil por stdin. argv debe
+    # llevar {host}, p. ej. ["ssh", "{host}", "python", "C:\\drvicho\\drvicho.py"]:
+    # sin él, todos los "equipos" serían esta misma máquina.
+    def __init__(self, argv):
+        if not any("{host}" in a for a in argv): raise ValueError("El comando por equipo debe incluir {host}")
+        self.argv = list(argv)
+
+    async def apply(self, host, profile):
+        import asyncio
+        argv = [a.replace("{host}", host) for a in self.argv] + ["--json", "apply", "-"]
+        proc = await asyncio.create_subprocess_exec(*argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        count_proc()
+        try:
+            out, _ = await proc.communicate(json.dumps(profile).encode("utf-8"))
+        except asyncio.CancelledError: # timeout del orquestador
+            proc.kill()
+            await proc.wait()
+            raise
+        try: data = json.loads(out)
+        except ValueError: data = {"error": out.decode("utf-8", "replace").strip()[-300:] or f"Código de salida {proc.returncode}"}
+        return proc.returncode, data
+
+class InProcessTransport:
+    # Equipos simulados en este proceso: latencia de red, caídas aleatorias y un
+    # registro en memoria y un ScriptedShell por equipo. apply_features usa estado
+    # global de SystemUtils, así que la aplicación en sí va serializada; la red no.
+    _lock = threading.Lock()
+
+    def __init__(self, latency=(0.01, 0.05), fail_rate=0.0, seed=0, shell_latency=0.0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.shell_latency = shell_latency
+        self.registries = {}
+        self.shells = {}
+        self.calls = 0
+
+    async def apply(self, host, profile):
+        import asyncio
+        self.calls += 1
+        await asyncio.sleep(self.rng.uniform(*self.latency))
+        if self.rng.random() < self.fail_rate: raise ConnectionError(f"{host}: sin conexión")
+        registry = self.registries.setdefault(host, MemoryRegistry())
+        shell = self.shells.setdefault(host, ScriptedShell(latency=self.shell_latency))
+        report = await asyncio.to_thread(self._apply, registry, shell, profile)
+        failed = [fid for fid, r in report["results"].items() if not r["ok"]]
+        return (EXIT_FAILED if failed else EXIT_OK), {"profile": profile.get("name"), **report, "failed": failed}
+
+    @staticmethod
+    def _apply(registry, shell, profile):
+        with InProcessTransport._lock, SystemUtils.backends(registry=registry, shell=shell):
+            return apply_features(profile["features"], state=StateCache(registry), label=profile.get("name"))
+
+class Fleet:
+    RETRYABLE = (EXIT_FAILED, None) # None: error de transporte o timeout
+
+    def __init__(self, transport, concurrency=16, retries=2, timeout=600.0, backoff=1.0, log=None):
+        self.transport = transport
+        self.concurrency = concurrency
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.log = log or _no_log
+
+    def run(self, hosts, profile):
+        import asyncio
+        return asyncio.run(self.run_async(hosts, profile))
+
+    async def run_async(self, hosts, profile):
+        import asyncio
+        sem = asyncio.Semaphore(self.concurrency)
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(self._host(host, profile, sem) for host in dict.fromkeys(hosts)))
+        return fleet_report(results, time.perf_counter() - t0)
+
+    async def _host(self, host, profile, sem):
+        import asyncio
+        result = {"host": host, "ok": False, "code": None, "attempts": 0, "duration": 0.0, "results": {}, "error": None}
+        async with sem:
+            for attempt in range(self.retries + 1):
+                result["attempts"] = attempt + 1
+                t0 = time.perf_counter()
+                code, data = None, {}
+                try:
+                    code, data = await asyncio.wait_for(self.transport.apply(host, profile), self.timeout)
+                    error = data.get("error")
+                except asyncio.TimeoutError: error = f"Timeout ({self.timeout}s)"
+                except Exception as e: error = str(e) or type(e).__name__
+                result["duration"] += time.perf_counter() - t0
+                # Los tweaks ya aplicados se omiten, así que reintentar solo repite lo que falló
+                result["results"].update(data.get("results") or {})
+                result.update(code=code, error=error, ok=code == EXIT_OK and not error)
+                if result["ok"] or code not in self.RETRYABLE: break
+                if attempt < self.retries:
+                    self.log(f"{host}: {error or 'tweaks fallidos'}; reintento {attempt + 1}/{self.retries}", "WARNING", "fleet")
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+        # Omitido en el último intento = ya aplicado: sustituye el fallo de un intento anterior
+        for fid in data.get("skipped") or []:
+            if not result["results"].get(fid, {}).get("ok"): result["results"][fid] = {"ok": True, "msg": "Ya aplicado", "duration": 0.0}
+        self.log(f"{host}: {'OK' if result['ok'] else result['error'] or 'con fallos'} ({result['attempts']} intentos)",
+                 "SUCCESS" if result["ok"] else "ERROR", "fleet", result["duration"])
+        return result
+
+def fleet_report(hosts, wall_s=0.0):
+    per_tweak = {}
+    for h in hosts:
+        for fid, r in h["results"].items():
+            t = per_tweak.setdefault(fid, {"ok": 0, "failed": 0, "errors": {}})
+            if r["ok"]: t["ok"] += 1
+            else:
+                t["failed"] += 1
+                t["errors"][r["msg"]] = t["errors"].get(r["msg"], 0) + 1
+    durations = [h["duration"] for h in hosts]
+    return {
+        "hosts": len(hosts), "ok": sum(h["ok"] for h in hosts),
+        "failed": [h["host"] for h in hosts if not h["ok"] and h["results"]],
+        "unreachable": [h["host"] for h in hosts if not h["ok"] and not h["results"]],
+        "retried": sum(h["attempts"] > 1 for h in hosts), "wall_s": round(wall_s, 3),
+        "duration_p50": _percentile(durations, 50), "duration_p95": _percentile(durations, 95),
+        "per_tweak": per_tweak, "host_results": hosts,
+    }
+
+def fleet_table(report):
+    lines = [f"Equipos: {report['ok']}/{report['hosts']} OK, {len(report['failed'])} con fallos, "
+             f"{len(report['unreachable'])} inaccesibles, {report['retried']} reintentados ({report['wall_s']:.1f} s)"]
+    for fid, t in sorted(report["per_tweak"].items()):
+        worst = max(t["errors"], key=t["errors"].get) if t["errors"] else ""
+        lines.append(f"  {fid:<14} {t['ok']:>5} OK {t['failed']:>5} fallos  {worst[:60]}")
+    for host in report["unreachable"][:20]:
+        error = next(h["error"] for h in report["host_results"] if h["host"] == host)
+        lines.append(f"  ! {host}: {error}")
+    return "\n".join(lines)
+
+def bench_fleet(hosts=300, concurrency=64, fail_rate=0.1):
+    # Cientos de equipos simulados en una sola máquina
+    profile = {"name": "bench", "features": list(TWEAKS)}
+    transport = InProcessTransport(latency=(0.01, 0.05), fail_rate=fail_rate)
+    report = Fleet(transport, concurrency=concurrency, retries=3, backoff=0.01).run([f"pc{i:03d}" for i in range(hosts)], profile)
+    return {"hosts": hosts, "ok": report["ok"], "retried": report["retried"], "unreachable": len(report["unreachable"]),
+            "calls": transport.calls, "wall_s": report["wall_s"], "hosts_per_s": hosts / report["wall_s"] if report["wall_s"] else 0.0}
+
+def bench_startup(n=5):
+    # Arranque en frío del modo sin interfaz y comprobación de que no carga Tk/winreg
+    script = os.path.abspath(__file__)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        subprocess.run([sys.executable, script, "--json", "list"], stdout=subprocess.DEVNULL, check=True)
+    cold = (time.perf_counter() - t0) / n
+    probe = "import sys, drvicho; print(','.join(m for m in ('tkinter', 'winreg', 'ctypes') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", probe], cwd=os.path.dirname(script), capture_output=True, text=True).stdout.strip()
+    return {"n": n, "cold_start_ms": cold * 1000, "heavy_modules": out.split(",") if out else []}
+
+# --- BENCHMARKS ---
+# "python drvicho.py bench" ejecuta la batería con backends simulados (registro en
+# memoria, ScriptedShell, árboles y procesos sintéticos) y la compara con
+# bench_baseline.json; --save actualiza la referencia. Funciona en Linux.
+def bench_apply(latency=0.02, startup=0.3, fids=None):
+    # Perfil completo: registro en memoria y shell con latencia tipo PowerShell
+    fids = list(fids or TWEAKS)
+    registry, shell = MemoryRegistry(), ScriptedShell(latency=latency, startup=startup)
+    t0 = time.perf_counter()
+    with SystemUtils.backends(registry=registry, shell=shell):
+        report = apply_features(fids, state=StateCache(registry))
+    took = time.perf_counter() - t0
+    return {"tweaks": len(fids), "ok": sum(r["ok"] for r in report["results"].values()), "apply_ms": took * 1000,
+            "shell_calls": len(shell.calls), "reg_opens": registry.opens}
+
+def _bench_ui():
+    import drvicho_gui
+    return drvicho_gui.bench_ui()
+
+BENCHMARKS = {
+    # nombre: (función, argumentos, {métrica vigilada: "lower" | "higher" es mejor})
+    # Una tupla (sentido, holgura) ignora diferencias absolutas por debajo de la holgura:
+    # en tiempos de pocos ms el ruido del sistema supera con facilidad el 30%
+    "apply": (bench_apply, {}, {"apply_ms": ("lower", 100.0), "shell_calls": "lower", "reg_opens": "lower"}),
+    "sampler": (bench_sampler, {"n": 2000}, {"per_sample_ms": ("lower", 0.1)}),
+    "log": (bench_log, {"n": 40000}, {"msgs_per_s": ("higher", 50000), "worst_drain_ms": ("lower", 25.0)}),
+    "ui": (_bench_ui, {}, {"first_frame_ms": ("lower", 100.0), "widgets": "lower"}),
+    "cleaner": (bench_cleaner, {"files": 20000, "fanout": 20}, {"scan_s": ("lower", 0.1), "clean_s": ("lower", 0.1)}),
+    "jobs": (bench_jobs, {"lines": 50000}, {"lines_per_s": ("higher", 50000)}),
+    "trace": (bench_trace, {"n": 50000}, {"disabled_ns": ("lower", 500)}),
+    "procs": (bench_procs, {}, {"diff_ms": ("lower", 5.0), "diff_name_reads": "lower"}),
+    "startup_profiler": (bench_startup_profiler, {}, {"scan_ms": ("lower", 20.0), "disable_ms": ("lower", 20.0)}),
+    "dns": (bench_dns, {"rounds": 5}, {"wall_s": ("lower", 0.2)}),
+    "fleet": (bench_fleet, {}, {"wall_s": ("lower", 0.3)}),
+    "cold_start": (bench_startup, {"n": 3}, {"cold_start_ms": ("lower", 50.0)}),
+}
+BENCH_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+def _sense(spec):
+    return spec if isinstance(spec, tuple) else (spec, 0.0)
+
+def run_benchmarks(names=None, log=None, repeat=5):
+    # Cada benchmark se repite: las métricas vigiladas se quedan con la mejor
+    # pasada (el ruido solo empeora) y el resto con la mediana
+    log = log or _no_log
+    results = {}
+    for name in names or BENCHMARKS:
+        fn, kwargs, watched = BENCHMARKS[name]
+        t0 = time.perf_counter()
+        runs = []
+        for _ in range(max(1, repeat)):
+            try: out = fn(**kwargs)
+            except Exception as e:
+                results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+                break
+            runs.append({k: v for k, v in out.items() if isinstance(v, (int, float)) and not isinstance(v, bool)})
+        else:
+            merged = {}
+            for key in runs[0]:
+                values = sorted(r[key] for r in runs if key in r)
+                if key in watched: merged[key] = values[0] if _sense(watched[key])[0] == "lower" else values[-1]
+                else: merged[key] = values[len(values) // 2]
+            results[name] = merged
+        log(f"{name}: {time.perf_counter() - t0:.1f} s ({len(runs)} pasadas)", fid="bench")
+    return results
+
+def bench_machine():
+    # La referencia solo es comparable en la misma máquina
+    import platform
+    return {"platform": sys.platform, "machine": platform.machine(), "cpus": os.cpu_count(), "python": platform.python_version()}
+
+def compare_benchmarks(results, baseline, tolerance=0.3):
+    rows = []
+    for name, metrics in results.items():
+        for metric, better in BENCHMARKS[name][2].items():
+            better, slack = _sense(better)
+            value, base = metrics.get(metric), baseline.get(name, {}).get(metric)
+            if value is None: continue
+            change = (value - base) / base if base else None
+            regression = (change is not None and abs(value - base) > slack
+                          and (change > tolerance if better == "lower" else change < -tolerance))
+            rows.append({"bench": name, "metric": metric, "value": value, "baseline": base, "change": change, "regression": regression})
+    return rows
+
+def bench_table(results, rows, machine=None):
+    lines = [f"{'benchmark':<34} {'valor':>12} {'referencia':>12} {'cambio':>8}"]
+    if machine and machine != bench_machine():
+        lines.insert(0, f"aviso: la referencia es de otra máquina ({machine}); guarda una propia con --save")
+    for name, metrics in results.items():
+        if "skipped" in metrics: lines.append(f"{name:<34} omitido: {metrics['skipped'][:60]}")
+    for r in rows:
+        base = "-" if r["baseline"] is None else f"{r['baseline']:.4g}"
+        change = "-" if r["change"] is None else f"{r['change'] * 100:+.0f}%"
+        lines.append(f"{r['bench'] + '.' + r['metric']:<34} {r['value']:>12.4g} {base:>12} {change:>8}{'  REGRESIÓN' if r['regression'] else ''}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv: return cli(argv)
+    if not SystemUtils.is_admin():
+        import ctypes
         ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, " ".join(sys.argv), None, 1)
+        return EXIT_OK
+    # La GUI importa este módulo: evitar una segunda copia cuando se ejecuta como script
+    sys.modules.setdefault("drvicho", sys.modules[__name__])
+    import drvicho_gui
+    drvicho_gui.run()
+    return EXIT_OK
+
+if __name__ == "__main__":
+    sys.exit(main())
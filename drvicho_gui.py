@@ -0,0 +1,685 @@
+# Interfaz gráfica de DrVicho Optimizer. Solo se importa al abrir la ventana:
+# el modo sin interfaz de drvicho.py nunca carga Tk.
+import tkinter as tk
+from tkinter import ttk, messagebox, scrolledtext
+import ctypes
+import os
+import threading
+import time
+import datetime
+import queue
+
+from drvicho import (
+    FEATURES, MAINTENANCE_JOBS, SystemUtils, RegJournal, StateCache, MetricsSampler,
+    JobRunner, LogPipeline, app_data_dir, apply_features, start_trace, stop_trace,
+    ProcessManager, load_process_rules, StartupProfiler, MemoryRegistry, ScriptedShell, DnsBenchmark, DNS_CANDIDATES, current_dns_servers, apply_best_dns, dns_table,
+)
+
+# --- CONFIGURACIÓN VISUAL (THEME CYBERPUNK/SLATE) ---
+COLORS = {
+    "bg_main": "#0f172a",       # Fondo Principal
+    "bg_sec": "#1e293b",        # Paneles
+    "bg_ter": "#334155",        # Inputs/Logs
+    "accent": "#3b82f6",        # Azul Primario
+    "accent_hover": "#2563eb",  # Azul Hover
+    "success": "#10b981",       # Verde
+    "warning": "#f59e0b",       # Amarillo
+    "danger": "#ef4444",        # Rojo
+    "text_main": "#f1f5f9",     # Blanco Hueso
+    "text_sec": "#94a3b8"       # Gris Texto
+}
+
+FONTS = {
+    "h1": ("Segoe UI Variable Display", 20, "bold"),
+    "h2": ("Segoe UI Variable Text", 14, "bold"),
+    "body": ("Segoe UI Variable Text", 10),
+    "code": ("Consolas", 9)
+}
+
+# --- COMPONENTES UI PERSONALIZADOS ---
+# Modo retenido: los items del canvas se crean una vez y luego solo se
+# cambian con itemconfig/coords.
+class ToggleSwitch(tk.Canvas):
+    def __init__(self, parent, variable, command=None):
+        super().__init__(parent, width=50, height=26, bg=COLORS["bg_sec"], highlightthickness=0)
+        self.command = command
+        self.variable = None
+        self._trace = None
+        self.track = [
+            self.create_oval(2, 2, 24, 24, outline=""),
+            self.create_rectangle(13, 2, 37, 24, outline=""),
+            self.create_oval(26, 2, 48, 24, outline=""),
+        ]
+        self.knob = self.create_oval(4, 4, 22, 22, fill="white", outline="")
+        self.set_variable(variable)
+        self.bind("<Button-1>", lambda e: self.toggle())
+
+    def set_variable(self, variable):
+        # Permite reciclar el switch para otra fila (listas virtualizadas)
+        if self.variable is not None and self._trace:
+            self.variable.trace_remove("write", self._trace)
+        self.variable = variable
+        self._trace = variable.trace_add("write", lambda *args: self.animate())
+        self.draw()
+
+    def draw(self):
+        state = self.variable.get()
+        fill = COLORS["success"] if state else COLORS["bg_ter"]
+        for item in self.track: self.itemconfig(item, fill=fill)
+        kx = 28 if state else 4
+        self.coords(self.knob, kx, 4, kx+18, 22)
+
+    def animate(self):
+        self.draw()
+
+    def toggle(self):
+        self.variable.set(not self.variable.get())
+        if self.command: self.command()
+
+class Sparkline(tk.Canvas):
+    def __init__(self, parent, color, width=90, height=28, max_value=100.0):
+        super().__init__(parent, width=width, height=height, bg=COLORS["bg_sec"], highlightthickness=0)
+        self.w, self.h, self.max_value = width, height, max_value
+        self.line = self.create_line(0, height, width, height, fill=color, width=1.5)
+
+    def set_values(self, values):
+        # Solo se mueven los puntos de la línea existente
+        if len(values) < 2: return
+        step = self.w / (len(values) - 1)
+        coords = []
+        for i, v in enumerate(values):
+            coords += [i * step, self.h - 2 - (self.h - 4) * min(v, self.max_value) / self.max_value]
+        self.coords(self.line, *coords)
+
+class ModernButton(tk.Canvas):
+    def __init__(self, parent, text, command=None, width=150, height=40, bg_color=COLORS["accent"]):
+        super().__init__(parent, width=width, height=height, bg=parent["bg"] if "bg" in parent.keys() else COLORS["bg_main"], highlightthickness=0)
+        self.command = command
+        self.bg_color = bg_color
+        self.text = text
+        # Rounded Rect manual
+        r = 10
+        w, h = width, height
+        self.shape = self.create_polygon(
+            r,0, w-r,0, w,0, w,r, w,h-r, w,h, w-r,h, r,h, 0,h, 0,h-r, 0,r, 0,0,
+            smooth=True, fill=bg_color
+        )
+        self.label = self.create_text(w/2, h/2, text=text, fill="white", font=FONTS["h2"])
+        self.bind("<Enter>", self.on_enter)
+        self.bind("<Leave>", self.on_leave)
+        self.bind("<Button-1>", self.on_click)
+
+    def draw(self, hover=False):
+        self.itemconfig(self.shape, fill=COLORS["accent_hover"] if hover else self.bg_color)
+
+    def on_enter(self, e): self.draw(hover=True); self.config(cursor="hand2")
+    def on_leave(self, e): self.draw(hover=False); self.config(cursor="")
+    def on_click(self, e): 
+        if self.command: self.command()
+
+class VirtualGrid(tk.Frame):
+    # Lista virtualizada en columnas: solo existen las tarjetas visibles (más un
+    # margen) y se reciclan al hacer scroll, así el catálogo puede crecer sin
+    # que crezca el número de widgets.
+    def __init__(self, parent, items, make_card, bind_card, columns=2, row_height=84, overscan=1):
+        super().__init__(parent, bg=COLORS["bg_main"])
+        self.items = items
+        self.make_card = make_card  # make_card(parent) -> widget
+        self.bind_card = bind_card  # bind_card(widget, item)
+        self.columns = columns
+        self.row_height = row_height
+        self.overscan = overscan
+        self.cards = []  # [(widget, window_id)]
+        self.canvas = tk.Canvas(self, bg=COLORS["bg_main"], highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.pack(side="left", fill="both", expand=True, padx=20, pady=20)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.bind("<Configure>", lambda e: self.refresh())
+        self.canvas.bind("<Enter>", lambda e: self.canvas.bind_all("<MouseWheel>", self._wheel))
+        self.canvas.bind("<Leave>", lambda e: self.canvas.unbind_all("<MouseWheel>"))
+
+    def rows(self):
+        return (len(self.items) + self.columns - 1) // self.columns
+
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.refresh()
+
+    def _wheel(self, e):
+        self.yview("scroll", int(-e.delta / 120), "units")
+
+    def refresh(self):
+        width = max(self.canvas.winfo_width(), 1)
+        height = max(self.canvas.winfo_height(), 1)
+        total = self.rows() * self.row_height
+        self.canvas.configure(scrollregion=(0, 0, width, total), yscrollincrement=self.row_height // 4)
+        top = self.canvas.canvasy(0)
+        first = max(0, int(top // self.row_height) - self.overscan)
+        last = min(self.rows(), int((top + height) // self.row_height) + 1 + self.overscan)
+        visible = self.items[first * self.columns:last * self.columns]
+        while len(self.cards) < len(visible):
+            card = self.make_card(self.canvas)
+            self.cards.append((card, self.canvas.create_window(0, 0, window=card, anchor="nw")))
+        col_w = width / self.columns
+        for i, (card, win) in enumerate(self.cards):
+            if i >= len(visible):
+                self.canvas.itemconfig(win, state="hidden")
+                continue
+            row, col = divmod(first * self.columns + i, self.columns)
+            self.bind_card(card, visible[i])
+            self.canvas.coords(win, col * col_w + 10, row * self.row_height + 5)
+            self.canvas.itemconfig(win, width=col_w - 20, height=self.row_height - 10, state="normal")
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(w) for w in widget.winfo_children())
+
+# --- APLICACIÓN PRINCIPAL ---
+class DrVichoApp:
+    def __init__(self, root, data_dir=None):
+        self.root = root
+        # Log, journal y trazas; bench_ui pasa una carpeta temporal
+        self.data_dir = data_dir or app_data_dir()
+        self.root.title("DrVicho Optimizer v5.0 GOD MODE")
+        self.root.geometry("1200x850")
+        self.root.configure(bg=COLORS["bg_main"])
+        
+        # Dark Title Bar Hack
+        try:
+            root.update()
+            ctypes.windll.dwmapi.DwmSetWindowAttribute(
+                ctypes.windll.user32.GetParent(root.winfo_id()), 20, ctypes.byref(ctypes.c_int(2)), 4)
+        except: pass
+
+        self.logs = LogPipeline(os.path.join(self.data_dir, "drvicho.jsonl"))
+        self.ui_calls = queue.SimpleQueue()
+        self.jobs = JobRunner()
+        self.console_max_lines = 1000
+        self.ui_stats = {"tabs": {}}
+        self.features = self.load_features()
+        self.vars = {f["id"]: tk.BooleanVar(value=False) for f in self.features}
+        # Journal de registro: deshacer en milisegundos sin depender de System Restore
+        self.use_restore_point = tk.BooleanVar(value=False)
+        self.use_trace = tk.BooleanVar(value=False)
+        self.procs = None
+        self.startup = StartupProfiler() # la enumeración se hace al pulsar ANALIZAR
+        self.startup_items = []
+        self.undoing = False
+        try: SystemUtils.journal = RegJournal(os.path.join(self.data_dir, "journal.jsonl"))
+        except Exception: SystemUtils.journal = None
+        
+        self.setup_layout()
+        self.drain_ui()
+        self.start_monitoring()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Estado real de cada tweak: pre-rellena los switches y evita re-aplicar
+        self.state = StateCache()
+        self.state.on_change = lambda fids: threading.Thread(target=self.refresh_state, args=(fids,), daemon=True).start()
+        self.refresher = threading.Thread(target=self.refresh_state, daemon=True)
+        self.refresher.start()
+
+    def on_close(self):
+        # Restaura prioridades y afinidades antes de destruir la ventana
+        if self.procs: self.procs.stop()
+        self.sampler.stop()
+        self.logs.flush()
+        self.root.destroy()
+
+    def refresh_state(self, fids=None):
+        # También apaga: un tweak deshecho (rollback o fuera de la app) no puede seguir marcado
+        states = self.state.scan(fids)
+        self.call_ui(lambda: [self.vars[fid].set(bool(applied)) for fid, applied in states.items() if fid in self.vars])
+
+    def setup_layout(self):
+        # --- HEADER ---
+        header = tk.Frame(self.root, bg=COLORS["bg_main"], height=60)
+        header.pack(fill="x", padx=20, pady=15)
+        
+        tk.Label(header, text="⚡ DrVicho", font=("Segoe UI", 26, "bold"), fg=COLORS["accent"], bg=COLORS["bg_main"]).pack(side="left")
+        tk.Label(header, text="OPTIMIZER v5.0", font=("Segoe UI", 12, "bold"), fg=COLORS["text_sec"], bg=COLORS["bg_main"]).pack(side="left", padx=10, pady=(10,0))
+        
+        # Stats Widget (Top Right)
+        self.stats_label = tk.Label(header, text="CPU: ... | RAM: ...", font=FONTS["code"], fg=COLORS["success"], bg=COLORS["bg_sec"], padx=10, pady=5)
+        self.stats_label.pack(side="right")
+        self.spark_ram = Sparkline(header, COLORS["accent"])
+        self.spark_ram.pack(side="right", padx=(0, 6))
+        self.spark_cpu = Sparkline(header, COLORS["success"])
+        self.spark_cpu.pack(side="right", padx=(0, 6))
+
+        # --- TABS CONTAINER ---
+        style = ttk.Style()
+        style.theme_use('default')
+        style.configure('TNotebook', background=COLORS["bg_main"], borderwidth=0)
+        style.configure('TNotebook.Tab', background=COLORS["bg_sec"], foreground=COLORS["text_sec"], padding=[20, 10], font=FONTS["body"])
+        style.map('TNotebook.Tab', background=[('selected', COLORS["accent"])], foreground=[('selected', 'white')])
+
+        self.notebook = ttk.Notebook(self.root, style='TNotebook')
+        self.notebook.pack(fill="both", expand=True, padx=20, pady=10)
+
+        # Crear Pestañas: solo el contenedor; el contenido se construye al seleccionarla
+        self.tabs = {}
+        for key, title in (("gaming", "🎮 Gaming & FPS"), ("win11", "🎨 Windows UI"), ("network", "🌐 Red & Ping"),
+                           ("privacy", "🛡️ Privacidad"), ("maintenance", "🧹 Mantenimiento")):
+            frame = tk.Frame(self.notebook, bg=COLORS["bg_main"])
+            self.notebook.add(frame, text=title)
+            self.tabs[key] = {"frame": frame, "built": False}
+        self.notebook.bind("<<NotebookTabChanged>>", lambda e: self.ensure_tab(self.current_tab()))
+        self.ensure_tab("gaming")
+
+        # --- LOG CONSOLE & ACTION BAR ---
+        bottom_panel = tk.Frame(self.root, bg=COLORS["bg_main"])
+        bottom_panel.pack(fill="x", padx=20, pady=20)
+
+        # Consola
+        self.console = scrolledtext.ScrolledText(bottom_panel, height=8, bg=COLORS["bg_ter"], fg=COLORS["text_main"], font=FONTS["code"], state='disabled', bd=0)
+        self.console.pack(side="left", fill="both", expand=True, padx=(0, 20))
+        self.console.tag_config("gray", foreground="#666")
+        for level, color in (("INFO", COLORS["text_main"]), ("WARNING", COLORS["warning"]), ("SUCCESS", COLORS["success"]), ("ERROR", COLORS["danger"])):
+            self.console.tag_config(level, foreground=color)
+
+        # Botón Acción
+        action_frame = tk.Frame(bottom_panel, bg=COLORS["bg_main"])
+        action_frame.pack(side="right", fill="y")
+        
+        self.btn_run = ModernButton(action_frame, "APLICAR CAMBIOS", command=self.run_process, width=220, height=60)
+        self.btn_run.pack()
+        tk.Checkbutton(action_frame, text="Punto de Restauración (lento)", variable=self.use_restore_point, font=FONTS["body"],
+                       bg=COLORS["bg_main"], fg=COLORS["text_sec"], selectcolor=COLORS["bg_ter"], activebackground=COLORS["bg_main"], bd=0).pack(anchor="w", pady=(8, 0))
+        tk.Checkbutton(action_frame, text="Guardar traza de tiempos", variable=self.use_trace, font=FONTS["body"],
+                       bg=COLORS["bg_main"], fg=COLORS["text_sec"], selectcolor=COLORS["bg_ter"], activebackground=COLORS["bg_main"], bd=0).pack(anchor="w")
+
+    def current_tab(self):
+        frame = self.notebook.nametowidget(self.notebook.select())
+        return next(key for key, tab in self.tabs.items() if tab["frame"] is frame)
+
+    def ensure_tab(self, key):
+        tab = self.tabs[key]
+        if tab["built"]: return
+        tab["built"] = True
+        t0 = time.perf_counter()
+        if key == "maintenance":
+            self.populate_maintenance_tab(tab["frame"])
+        else:
+            if key == "network": self.populate_dns_panel(tab["frame"])
+            if key == "gaming": self.populate_procs_panel(tab["frame"])
+            if key == "privacy": self.populate_startup_panel(tab["frame"])
+            self.populate_tab(tab["frame"], key)
+        self.ui_stats["tabs"][key] = (time.perf_counter() - t0) * 1000
+
+    def populate_tab(self, parent, category):
+        items = [f for f in self.features if f["cat"] == category]
+
+        def make_card(canvas):
+            frame = tk.Frame(canvas, bg=COLORS["bg_sec"], padx=15, pady=10)
+            # Switch
+            frame.switch = ToggleSwitch(frame, self.vars[items[0]["id"]])
+            frame.switch.pack(side="right", padx=10)
+            # Text
+            frame.title = tk.Label(frame, font=FONTS["h2"], bg=COLORS["bg_sec"], fg="white", anchor="w")
+            frame.title.pack(fill="x")
+            frame.desc = tk.Label(frame, font=FONTS["body"], bg=COLORS["bg_sec"], fg=COLORS["text_sec"], anchor="w")
+            frame.desc.pack(fill="x")
+            frame.item = None
+            return frame
+
+        def bind_card(frame, item):
+            if frame.item is item: return
+            frame.item = item
+            frame.switch.set_variable(self.vars[item["id"]])
+            frame.title.config(text=item["name"])
+            frame.desc.config(text=item["desc"])
+
+        grid = VirtualGrid(parent, items, make_card, bind_card, columns=2) # 2 columnas
+        grid.pack(fill="both", expand=True)
+
+    def populate_procs_panel(self, parent):
+        # Gestor de procesos en segundo plano: no es un tweak, se activa/detiene aquí
+        frame = tk.Frame(parent, bg=COLORS["bg_sec"], padx=20, pady=15)
+        frame.pack(fill="x", padx=20, pady=(20, 0))
+        self.btn_procs = tk.Button(frame, text="ACTIVAR", bg=COLORS["accent"], fg="white", font=("Segoe UI", 10, "bold"), bd=0, padx=15, pady=5, cursor="hand2", command=self.toggle_procs)
+        self.btn_procs.pack(side="right")
+        tk.Label(frame, text="Gestor de Procesos de Juego", font=FONTS["h2"], bg=COLORS["bg_sec"], fg="white").pack(anchor="w")
+        self.procs_status = tk.Label(frame, text="Prioridad alta para juegos y baja para procesos pesados mientras juegas (procesos.json).", font=FONTS["body"], bg=COLORS["bg_sec"], fg=COLORS["text_sec"])
+        self.procs_status.pack(anchor="w")
+
+    def toggle_procs(self):
+        if self.procs and self.procs.running():
+            self.btn_procs.config(state="disabled")
+            def stop():
+                self.procs.stop()
+                self.call_ui(lambda: (self.btn_procs.config(text="ACTIVAR", bg=COLORS["accent"], state="normal"),
+                                      self.procs_status.config(text="Detenido: prioridades restauradas.")))
+            return threading.Thread(target=stop, daemon=True).start()
+        try: rules = load_process_rules()
+        except (OSError, ValueError) as e: return self.log(f"procesos.json no válido: {e}", "ERROR", fid="procs")
+        self.procs = ProcessManager(rules=rules, log=self.log)
+        self.procs.start()
+        self.btn_procs.config(text="DETENER", bg=COLORS["danger"])
+        self.update_procs()
+
+    def update_procs(self):
+        if not (self.procs and self.procs.running()): return
+        s = self.procs.stats
+        games = ", ".join(sorted({self.procs.known.get(pid, "?") for pid in list(self.procs.active)})) or "ninguno"
+        self.procs_status.config(text=f"Activo ({s['mode']}) · juegos: {games} · en segundo plano bajados: {len(self.procs.lowered)} · CPU propia: {s['cpu_s']:.2f} s")
+        self.root.after(2000, self.update_procs)
+
+    def populate_startup_panel(self, parent):
+        # Inicio y servicios ordenados por impacto; desactivar es un lote que se deshace con "Deshacer"
+        frame = tk.Frame(parent, bg=COLORS["bg_sec"], padx=20, pady=15)
+        frame.pack(fill="x", padx=20, pady=(20, 0))
+        btns = tk.Frame(frame, bg=COLORS["bg_sec"])
+        btns.pack(side="right", anchor="n", padx=(15, 0))
+        tk.Button(btns, text="ANALIZAR", bg=COLORS["accent"], fg="white", font=("Segoe UI", 10, "bold"), bd=0, padx=15, pady=5, cursor="hand2", command=self.scan_startup).pack(fill="x")
+        self.btn_startup_disable = tk.Button(btns, text="DESACTIVAR SELECCIONADOS", bg=COLORS["danger"], fg="white", font=("Segoe UI", 10, "bold"), bd=0, padx=15, pady=5, cursor="hand2", command=self.disable_startup, state="disabled")
+        self.btn_startup_disable.pack(fill="x", pady=(6, 0))
+        tk.Label(frame, text="Inicio, Tareas y Servicios", font=FONTS["h2"], bg=COLORS["bg_sec"], fg="white").pack(anchor="w")
+        self.startup_status = tk.Label(frame, text="Ordenados por impacto (CPU, RAM y disco). ~ = estimado.", font=FONTS["body"], bg=COLORS["bg_sec"], fg=COLORS["text_sec"])
+        self.startup_status.pack(anchor="w")
+        self.startup_list = tk.Listbox(frame, selectmode="extended", height=8, bg=COLORS["bg_ter"], fg=COLORS["text_main"], font=FONTS["code"], bd=0, highlightthickness=0, selectbackground=COLORS["accent"])
+        self.startup_list.pack(fill="x", pady=(6, 0))
+
+    def scan_startup(self, force=True):
+        self.startup_status.config(text="Analizando...")
+
+        def worker():
+            try: ranking = self.startup.scan(force)
+            except Exception as e:
+                self.log(f"No se pudo analizar el inicio: {e}", "ERROR", fid="startup")
+                return self.call_ui(self.startup_status.config, {"text": "Error al analizar."})
+            def show():
+                self.startup_items = ranking
+                self.startup_list.delete(0, tk.END)
+                for r in ranking:
+                    mark = "🔒" if r.get("protected") else ("  " if r["measured"] else " ~")
+                    self.startup_list.insert(tk.END, f"{mark} {r['impact']:<5} {r['kind']:<7} {r['name'][:48]:<48} CPU {r['cpu_s']:6.1f}s  RAM {r['mem'] / 1048576:5.0f} MB  Disco {r['disk'] / 1048576:6.1f} MB")
+                high = sum(r["impact"] == "alto" for r in ranking)
+                self.startup_status.config(text=f"{len(ranking)} elementos, {high} de impacto alto. ~ = estimado, 🔒 = protegido.")
+                self.btn_startup_disable.config(state="normal")
+            self.call_ui(show)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def disable_startup(self):
+        ids = [self.startup_items[i]["id"] for i in self.startup_list.curselection()]
+        if not ids: return messagebox.showinfo("Info", "Selecciona algo primero.")
+        if not messagebox.askyesno("Confirmar", f"Desactivar {len(ids)} elementos de inicio? (se puede deshacer)"): return
+
+        def worker():
+            results = self.startup.disable(ids, self.log)
+            ok = sum(r[0] for r in results.values())
+            self.log(f"Inicio: {ok}/{len(results)} desactivados. Usa 'Deshacer Última Optimización' para revertir.", "SUCCESS" if ok == len(results) else "WARNING")
+            self.call_ui(self.scan_startup, False)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def populate_dns_panel(self, parent):
+        # Benchmark de resolvedores: medir, aplicar los 2 más rápidos y comparar antes/después
+        frame = tk.Frame(parent, bg=COLORS["bg_sec"], padx=20, pady=15)
+        frame.pack(fill="x", padx=20, pady=(20, 0))
+        self.dns_results, self.dns_before = [], []
+        btns = tk.Frame(frame, bg=COLORS["bg_sec"])
+        btns.pack(side="right", anchor="n")
+        self.btn_dns_measure = tk.Button(btns, text="MEDIR DNS", bg=COLORS["accent"], fg="white", font=("Segoe UI", 10, "bold"), bd=0, padx=15, pady=5, cursor="hand2", command=self.measure_dns)
+        self.btn_dns_measure.pack(fill="x")
+        self.btn_dns_apply = tk.Button(btns, text="APLICAR LOS 2 MÁS RÁPIDOS", bg=COLORS["success"], fg="white", font=("Segoe UI", 10, "bold"), bd=0, padx=15, pady=5, cursor="hand2", command=self.apply_dns, state="disabled")
+        self.btn_dns_apply.pack(fill="x", pady=(6, 0))
+        tk.Label(frame, text="Benchmark de DNS", font=FONTS["h2"], bg=COLORS["bg_sec"], fg="white").pack(anchor="w")
+        self.dns_compare = tk.Label(frame, text="Mide la latencia (caché y en frío) de los resolvedores candidatos.", font=FONTS["body"], bg=COLORS["bg_sec"], fg=COLORS["text_sec"], justify="left")
+        self.dns_compare.pack(anchor="w")
+        self.dns_table = tk.Label(frame, text="", font=FONTS["code"], bg=COLORS["bg_sec"], fg=COLORS["text_main"], justify="left")
+        self.dns_table.pack(anchor="w", pady=(6, 0))
+
+    def populate_maintenance_tab(self, parent):
+        # Esta pestaña es diferente, son botones de acción inmediata
+        
+        tools = [
+            ("Reparar Archivos Corruptos (SFC)", "Ejecuta sfc /scannow (Tarda 5-10 min)", "sfc"),
+            ("Reparar Imagen de Windows (DISM)", "Repara el almacén de componentes.", "dism"),
+            ("Flush DNS & Reset IP", "Soluciona problemas de conexión.", "net_reset"),
+            ("Analizar Espacio Recuperable", "Temporales, cachés de navegador, Windows Update y miniaturas (sin borrar).", "clean_scan"),
+            ("Borrar Archivos Temporales", "Libera espacio en disco.", "clean_temp"),
+            ("Deshacer Última Optimización", "Restaura los valores de registro previos desde el journal.", self.run_undo),
+        ]
+        
+        self.job_widgets = {}
+        for name, desc, action in tools:
+            frame = tk.Frame(parent, bg=COLORS["bg_sec"], padx=20, pady=20)
+            frame.pack(fill="x", padx=20, pady=5)
+            
+            command = (lambda jid=action: self.toggle_job(jid)) if isinstance(action, str) else action
+            btn = tk.Button(frame, text="EJECUTAR", bg=COLORS["accent"], fg="white", font=("Segoe UI", 10, "bold"), bd=0, padx=15, pady=5, cursor="hand2", command=command)
+            btn.pack(side="right")
+            
+            tk.Label(frame, text=name, font=FONTS["h2"], bg=COLORS["bg_sec"], fg="white").pack(anchor="w")
+            tk.Label(frame, text=desc, font=FONTS["body"], bg=COLORS["bg_sec"], fg=COLORS["text_sec"]).pack(anchor="w")
+            if isinstance(action, str):
+                bar = ttk.Progressbar(frame, mode="determinate", maximum=100)
+                self.job_widgets[action] = (btn, bar, name)
+
+    def log(self, msg, type="INFO", fid=None, duration=None):
+        # Seguro desde cualquier hilo: solo encola
+        self.logs.emit(msg, type, fid, duration)
+
+    def call_ui(self, fn, *args):
+        # Ejecuta fn en el hilo de Tk en el próximo ciclo de vaciado
+        self.ui_calls.put((fn, args))
+
+    def drain_ui(self):
+        # El temporizador se re-arma siempre: un callback que falle no puede parar la consola
+        try:
+            self.drain_console()
+            while True:
+                try: fn, args = self.ui_calls.get_nowait()
+                except queue.Empty: break
+                try: fn(*args)
+                except Exception as e: self.log(f"Error en la interfaz ({getattr(fn, '__name__', fn)}): {e}", "ERROR", fid="ui")
+        finally:
+            self.root.after(50, self.drain_ui)
+
+    def drain_console(self):
+        batch = self.logs.drain()
+        if not batch: return
+        self.console.config(state='normal')
+        for r in batch:
+            timestamp = datetime.datetime.fromtimestamp(r["ts"]).strftime("%H:%M:%S")
+            self.console.insert(tk.END, f"[{timestamp}] ", "gray", f"{r['msg']}\n", r["level"])
+        # Consola acotada: se descartan las líneas más antiguas
+        lines = int(self.console.index("end-1c").split(".")[0])
+        if lines > self.console_max_lines:
+            self.console.delete("1.0", f"{lines - self.console_max_lines}.0")
+        self.console.see(tk.END)
+        self.console.config(state='disabled')
+
+    def load_features(self):
+        return list(FEATURES)
+
+    # --- MONITOR DE SISTEMA ---
+    def start_monitoring(self):
+        # Muestreo nativo en un hilo; la UI solo lee el historial cada segundo
+        self.sampler = MetricsSampler(interval=1.0)
+        self.sampler.start()
+        self.update_stats()
+
+    def update_stats(self):
+        if not self.root.winfo_exists(): return
+        cur = self.sampler.current()
+        cpu, ram = int(cur["cpu"]), int(cur["mem"])
+        net = (cur["net_rx"] + cur["net_tx"]) / 1024
+        self.stats_label.config(text=f"CPU: {cpu}% | RAM: {ram}% | NET: {net:.0f} KB/s", fg=COLORS["danger"] if cpu > 80 else COLORS["success"])
+        self.spark_cpu.set_values(self.sampler.history["cpu"].values(60))
+        self.spark_ram.set_values(self.sampler.history["mem"].values(60))
+        self.root.after(int(self.sampler.interval * 1000), self.update_stats)
+
+    def log_metrics(self, label, since, until):
+        m = self.sampler.summary(since, until)
+        if m["samples"]:
+            self.log(f"Métricas {label}: CPU {m['cpu']:.0f}% | RAM {m['mem']:.0f}% | Disco {(m['disk_read'] + m['disk_write']) / 1048576:.1f} MB/s")
+
+    # --- LÓGICA DE EJECUCIÓN PRINCIPAL ---
+    def run_process(self):
+        active = [f for f in self.features if self.vars[f["id"]].get()]
+        if not active: return messagebox.showinfo("Info", "Selecciona algo primero.")
+        
+        if not messagebox.askyesno("Confirmar", f"Aplicar {len(active)} optimizaciones?"): return
+
+        def worker():
+            self.log("--- INICIANDO OPTIMIZACIÓN ---")
+            t_start = time.time()
+            self.log_metrics("antes", t_start - 30, t_start)
+            tracing = self.use_trace.get()
+            if tracing: start_trace()
+            apply_features([f["id"] for f in active], self.log, self.state, self.use_restore_point.get())
+            if tracing: self.save_trace(stop_trace())
+            
+            self.log("!!! COMPLETADO !!! Reinicia tu PC.", "SUCCESS")
+            t_end = time.time()
+            self.call_ui(self.root.after, 30000, lambda: self.log_metrics("después", t_end, t_end + 30))
+            self.call_ui(messagebox.showinfo, "DrVicho v5", "Proceso terminado. REINICIA TU PC AHORA.")
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def save_trace(self, tracer):
+        path = os.path.join(self.data_dir, "traces", datetime.datetime.now().strftime("run-%Y%m%d-%H%M%S.json"))
+        try: tracer.export(path)
+        except OSError as e: return self.log(f"No se pudo guardar la traza: {e}", "ERROR")
+        for line in tracer.table().splitlines(): self.log(line, fid="trace")
+        self.log(f"Traza guardada en {path} (ábrela en chrome://tracing o Perfetto)")
+
+    # --- BENCHMARK DNS ---
+    @staticmethod
+    def dns_summary(results):
+        ok = [r for r in results if r["score"] is not None]
+        if not ok: return "sin respuesta"
+        r = ok[0]
+        return f"{r['host']} caché {r['cached_p50']:.0f} ms, frío {r['cold_p50']:.0f} ms, fallos {r['fail_rate'] * 100:.0f}%"
+
+    def measure_dns(self):
+        self.btn_dns_measure.config(state="disabled")
+        self.dns_compare.config(text="Midiendo...")
+
+        def worker():
+            current = current_dns_servers()
+            results = DnsBenchmark(list(DNS_CANDIDATES) + current).run()
+            self.dns_results = results
+            self.dns_before = [r for r in results if r["host"] in current]
+            self.log(f"DNS actual: {self.dns_summary(self.dns_before)} | mejor: {self.dns_summary(results)}", fid="dns")
+            def show():
+                self.dns_table.config(text=dns_table(results[:8]))
+                self.dns_compare.config(text=f"Antes: {self.dns_summary(self.dns_before)}")
+                self.btn_dns_measure.config(state="normal")
+                self.btn_dns_apply.config(state="normal")
+            self.call_ui(show)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def apply_dns(self):
+        if not self.dns_results: return
+        self.btn_dns_apply.config(state="disabled")
+
+        def worker():
+            servers, report = apply_best_dns(self.dns_results, self.log, self.state)
+            if not servers:
+                self.log("Ningún resolvedor respondió: no se cambia el DNS", "ERROR", fid="dns")
+                return self.call_ui(self.btn_dns_apply.config, {"state": "normal"})
+            after = DnsBenchmark(current_dns_servers() or servers).run()
+            self.log(f"DNS después: {self.dns_summary(after)}", fid="dns")
+            self.call_ui(lambda: (self.vars["dns_cloud"].set(all(r["ok"] for r in report["results"].values())),
+                                  self.dns_compare.config(text=f"Antes: {self.dns_summary(self.dns_before)}\nDespués: {self.dns_summary(after)}"),
+                                  self.btn_dns_apply.config(state="normal")))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    # --- HERRAMIENTAS MANTENIMIENTO ---
+    def toggle_job(self, jid):
+        if self.jobs.running(jid):
+            self.jobs.cancel(jid)
+            self.log(f"Cancelando {self.job_widgets[jid][2]}...", "WARNING")
+        else:
+            self.start_job(jid)
+
+    def start_job(self, jid):
+        self.ensure_tab("maintenance")
+        btn, bar, title = self.job_widgets[jid]
+        spec = MAINTENANCE_JOBS[jid]
+
+        def on_line(job, line): self.log(line, fid=jid)
+        def on_progress(job, pct): self.call_ui(bar.config, {"value": pct})
+        def on_done(job):
+            level = {"ok": "SUCCESS", "cancelled": "WARNING"}.get(job.status, "ERROR")
+            self.log(f"{title}: {job.status.upper()} (código {job.returncode}, {job.elapsed:.0f}s)", level, jid, job.elapsed)
+            self.call_ui(btn.config, {"text": "EJECUTAR", "bg": COLORS["accent"]})
+            self.call_ui(bar.pack_forget)
+
+        job = self.jobs.start(jid, spec["steps"], spec.get("timeout"), on_line, on_progress, on_done)
+        if job is None:
+            self.log(f"{title} ya está en ejecución.", "WARNING")
+            return
+        self.log(f"Iniciando {title}...", "WARNING", jid)
+        btn.config(text="CANCELAR", bg=COLORS["danger"])
+        bar.config(value=0)
+        bar.pack(fill="x", pady=(8, 0))
+
+    def run_sfc(self): self.start_job("sfc")
+    def run_dism(self): self.start_job("dism")
+    def run_net_reset(self): self.start_job("net_reset")
+    def run_clean_temp(self): self.start_job("clean_temp")
+
+    def run_undo(self):
+        # Restaurar inicio/servicios pasa por PowerShell y puede tardar: fuera del hilo de Tk
+        if self.undoing: return self.log("Ya se está deshaciendo la última optimización.", "WARNING")
+        self.undoing = True
+        self.log("Deshaciendo la última optimización...")
+
+        def worker():
+            try:
+                ok, msg = SystemUtils.undo()
+            except Exception as e:
+                ok, msg = False, f"Error al deshacer: {e}"
+            self.startup.invalidate()
+            def done():
+                self.undoing = False
+                self.log(msg, "SUCCESS" if ok else "ERROR")
+                if self.startup_items: self.scan_startup(False)
+            self.call_ui(done)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+def measure_startup(app, t0):
+    # Tiempo hasta el primer frame y widgets creados; queda en el log JSONL para seguirlo en el tiempo
+    app.root.update_idletasks()
+    stats = app.ui_stats
+    stats["first_frame_ms"] = (time.perf_counter() - t0) * 1000
+    stats["widgets"] = count_widgets(app.root)
+    app.log(f"UI lista en {stats['first_frame_ms']:.0f} ms ({stats['widgets']} widgets)", fid="ui_startup", duration=stats["first_frame_ms"] / 1000)
+    return stats
+
+def bench_ui():
+    # Primer frame con registro y shell simulados: no toca el sistema (log y
+    # journal van a una carpeta temporal)
+    import tempfile, shutil
+    tmp = tempfile.mkdtemp(prefix="drvicho_ui_")
+    t0 = time.perf_counter()
+    try:
+        with SystemUtils.backends(registry=MemoryRegistry(), shell=ScriptedShell()):
+            root = tk.Tk()
+            try:
+                app = DrVichoApp(root, data_dir=tmp)
+                stats = measure_startup(app, t0)
+                app.sampler.stop()
+                # El sondeo inicial usa los backends simulados: debe acabar antes de restaurarlos
+                app.refresher.join(10)
+                app.logs.flush()
+            finally:
+                root.destroy()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return {"first_frame_ms": stats["first_frame_ms"], "widgets": stats["widgets"], "gaming_tab_ms": stats["tabs"].get("gaming", 0.0)}
+
+def run():
+    t0 = time.perf_counter()
+    root = tk.Tk()
+    app = DrVichoApp(root)
+    root.after_idle(measure_startup, app, t0)
+    root.mainloop()
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from drvicho import TempCleaner
+
+DAY = 86400
+
+class TempCleanerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.root = os.path.join(self.tmp, "temp")
+        self.now = time.time()
+        # nombre relativo -> (bytes, días de antigüedad)
+        self.make({"viejo.tmp": (100, 10), "nuevo.tmp": (100, 0), "grande.log": (5000, 10), "a/b/hondo.tmp": (10, 10),
+                   "a/reciente.log": (10, 0), "vacia/x.tmp": (1, 10)})
+        self.loc = {"name": "prueba", "paths": [self.root]}
+
+    def make(self, files, root=None):
+        for rel, (size, days) in files.items():
+            path = os.path.join(root or self.root, *rel.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f: f.write(b"x" * size)
+            os.utime(path, (self.now - days * DAY, self.now - days * DAY))
+
+    def left(self, root=None):
+        root = root or self.root
+        return sorted(os.path.relpath(os.path.join(d, f), root).replace(os.sep, "/") for d, _, files in os.walk(root) for f in files)
+
+    def test_deletes_everything_and_prunes_subdirectories(self):
+        stats = TempCleaner(workers=4).clean(self.loc)
+        self.assertEqual((stats.files, stats.deleted, stats.locked), (6, 6, 0))
+        self.assertEqual(stats.freed, 100 + 100 + 5000 + 10 + 10 + 1)
+        self.assertEqual(stats.dirs, 4)
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_age_filter(self):
+        stats = TempCleaner(min_age=DAY).clean(self.loc)
+        self.assertEqual(stats.deleted, 4)
+        self.assertEqual(self.left(), ["a/reciente.log", "nuevo.tmp"])
+        # Las carpetas que aún tienen archivos no se borran; las vacías sí
+        self.assertFalse(os.path.exists(os.path.join(self.root, "vacia")))
+
+    def test_size_filter(self):
+        stats = TempCleaner(min_size=100).clean(self.loc)
+        self.assertEqual((stats.deleted, stats.freed), (3, 5200))
+        self.assertEqual(self.left(), ["a/b/hondo.tmp", "a/reciente.log", "vacia/x.tmp"])
+
+    def test_patterns_and_exclusions(self):
+        TempCleaner(patterns=["*.TMP"], exclude=["nuevo*"]).clean(self.loc)
+        self.assertEqual(self.left(), ["a/reciente.log", "grande.log", "nuevo.tmp"])
+
+    def test_location_filters_override_the_cleaner(self):
+        loc = dict(self.loc, patterns=["*.log"], min_age=DAY, recursive=False)
+        stats = TempCleaner(patterns=["*.tmp"]).clean(loc)
+        self.assertEqual((stats.deleted, stats.dirs), (1, 1))
+        self.assertNotIn("grande.log", self.left())
+        self.assertIn("a/reciente.log", self.left())
+
+    def test_dry_run_counts_without_touching(self):
+        before = self.left()
+        stats = TempCleaner(dry_run=True, min_age=DAY).clean(self.loc)
+        self.assertEqual((stats.files, stats.bytes, stats.deleted, stats.freed), (4, 100 + 5000 + 10 + 1, 0, 0))
+        self.assertEqual(self.left(), before)
+
+    def test_symlinks_are_never_followed_or_removed(self):
+        outside = os.path.join(self.tmp, "fuera")
+        self.make({"importante.doc": (10, 10), "sub/otro.doc": (10, 10)}, outside)
+        try:
+            os.symlink(outside, os.path.join(self.root, "enlace_dir"), target_is_directory=True)
+            os.symlink(os.path.join(outside, "importante.doc"), os.path.join(self.root, "enlace.doc"))
+        except (OSError, NotImplementedError) as e: self.skipTest(f"sin symlinks: {e}")
+        stats = TempCleaner().clean(self.loc)
+        self.assertEqual(stats.deleted, 6)
+        self.assertEqual(self.left(outside), ["importante.doc", "sub/otro.doc"])
+        self.assertTrue(os.path.islink(os.path.join(self.root, "enlace_dir")))
+        self.assertTrue(os.path.islink(os.path.join(self.root, "enlace.doc")))
+
+    def test_locked_files_are_counted_and_skipped(self):
+        real_unlink = os.unlink
+        def unlink(path, *args, **kwargs):
+            # Simula archivos en uso: ni siquiera quitando el solo-lectura se pueden borrar
+            if path.endswith(".log"): raise PermissionError(13, "en uso", path)
+            return real_unlink(path, *args, **kwargs)
+        with mock.patch("os.unlink", side_effect=unlink):
+            stats = TempCleaner(batch=2).clean(self.loc)
+        self.assertEqual((stats.files, stats.deleted, stats.locked), (6, 4, 2))
+        self.assertEqual(stats.freed, 100 + 100 + 10 + 1)
+        self.assertEqual(self.left(), ["a/reciente.log", "grande.log"])
+        self.assertTrue(os.path.isdir(os.path.join(self.root, "a")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "a", "b")))
+
+    def test_run_skips_missing_locations(self):
+        results = TempCleaner().run([self.loc, {"name": "no existe", "paths": [os.path.join(self.tmp, "nada")]}])
+        self.assertEqual(results["prueba"].deleted, 6)
+        self.assertEqual(results["no existe"].as_dict(), {"files": 0, "bytes": 0, "deleted": 0, "freed": 0, "locked": 0, "dirs": 0})
+
+if __name__ == "__main__":
+    unittest.main()
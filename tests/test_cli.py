@@ -0,0 +1,84 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import drvicho
+from drvicho import (
+    EXIT_FAILED, EXIT_NOT_ADMIN, EXIT_OK, EXIT_USAGE, MemoryRegistry, ScriptedShell, SystemUtils, cli,
+)
+
+class HeadlessCliTests(unittest.TestCase):
+    # apply/verify/rollback sin interfaz contra registro y shell en memoria; el
+    # journal que crea la CLI va a un LOCALAPPDATA temporal
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.registry, self.shell = MemoryRegistry(), ScriptedShell()
+        stack = contextlib.ExitStack()
+        stack.enter_context(mock.patch.dict(os.environ, {"LOCALAPPDATA": self.tmp}))
+        stack.enter_context(SystemUtils.backends(registry=self.registry, shell=self.shell))
+        self.addCleanup(stack.close)
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def profile(self, data, name="perfil.json"):
+        path = os.path.join(self.tmp, name)
+        with open(path, "w", encoding="utf-8") as f: f.write(data if isinstance(data, str) else json.dumps(data))
+        return path
+
+    def run_cli(self, *argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(io.StringIO()):
+            code = cli(["--json", *argv])
+        return code, json.loads(out.getvalue())
+
+    def test_apply_verify_and_rollback(self):
+        path = self.profile({"name": "Gaming", "features": ["game_mode", "tcp_nagle"]})
+        code, out = self.run_cli("verify", path)
+        self.assertEqual(code, EXIT_FAILED)
+        self.assertEqual(sorted(out["missing"]), ["game_mode", "tcp_nagle"])
+        code, out = self.run_cli("apply", path)
+        self.assertEqual(code, EXIT_OK, out)
+        self.assertEqual(out["failed"], [])
+        self.assertEqual(self.run_cli("verify", path)[0], EXIT_OK)
+        code, out = self.run_cli("rollback")
+        self.assertEqual(code, EXIT_OK, out)
+        self.assertEqual(self.registry.get_values("HKCU", r"Software\Microsoft\GameBar"), {})
+        self.assertNotIn("tcp_nagle", self.shell.applied)
+        self.assertEqual(self.run_cli("verify", path)[0], EXIT_FAILED)
+        # Nada más que deshacer
+        self.assertEqual(self.run_cli("rollback")[0], EXIT_FAILED)
+
+    def test_failed_tweak_exits_failed(self):
+        self.shell.fail["tcp_nagle"] = "acceso denegado"
+        code, out = self.run_cli("apply", self.profile({"features": ["game_mode", "tcp_nagle"]}))
+        self.assertEqual(code, EXIT_FAILED)
+        self.assertEqual(out["failed"], ["tcp_nagle"])
+
+    def test_invalid_profiles_exit_usage(self):
+        bad = {"array.json": [["game_mode"]], "nested.json": {"features": [["game_mode"]]}, "numbers.json": {"features": [1]},
+               "empty.json": {"features": []}, "unknown.json": {"features": ["no_existe"]}, "broken.json": "{features",
+               "dns.json": {"features": ["game_mode"], "dns_servers": "1.1.1.1"}}
+        for name, data in bad.items():
+            path = self.profile(data, name)
+            for command in ("apply", "verify"):
+                with self.subTest(profile=name, command=command):
+                    code, out = self.run_cli(command, path)
+                    self.assertEqual(code, EXIT_USAGE)
+                    self.assertIn("error", out)
+        self.assertEqual(self.run_cli("apply", os.path.join(self.tmp, "no_existe.json"))[0], EXIT_USAGE)
+        self.assertEqual(self.registry.opens, 0)
+        self.assertEqual(self.shell.calls, [])
+
+    def test_not_admin_on_windows(self):
+        path = self.profile({"features": ["game_mode"]})
+        with mock.patch.object(drvicho.os, "name", "nt"), mock.patch.object(SystemUtils, "is_admin", return_value=False):
+            self.assertEqual(self.run_cli("apply", path)[0], EXIT_NOT_ADMIN)
+            self.assertEqual(self.run_cli("rollback")[0], EXIT_NOT_ADMIN)
+        self.assertEqual(self.registry.get_values("HKCU", r"Software\Microsoft\GameBar"), None)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from drvicho import (
+    TWEAKS, DnsBenchmark, DnsStub, MemoryRegistry, RegJournal, ScriptedShell, StateCache, SystemUtils,
+    apply_best_dns, best_dns,
+)
+
+def bench(stubs, rounds=5, timeout=0.3):
+    return DnsBenchmark([s.server for s in stubs], domains=["a.test", "b.test", "c.test"], rounds=rounds, timeout=timeout).run()
+
+class DnsBenchmarkTests(unittest.TestCase):
+    def setUp(self):
+        self.stubs = []
+
+    def tearDown(self):
+        for s in self.stubs: s.close()
+
+    def stub(self, *args, **kwargs):
+        s = DnsStub(*args, **kwargs)
+        self.stubs.append(s)
+        return s
+
+    def test_ranks_by_latency(self):
+        slow, fast = self.stub(0.05, 0.05), self.stub(0.002, 0.01)
+        results = bench([slow, fast])
+        self.assertEqual([r["server"] for r in results], [fast.server, slow.server])
+        self.assertEqual([r["fail_rate"] for r in results], [0.0, 0.0])
+        self.assertLess(results[0]["cached_p50"], results[0]["cold_p50"])
+        self.assertEqual(results[0]["queries"], 2 * 3 * 5)
+
+    def test_drops_and_timeouts_count_as_failures(self):
+        clean, lossy, dead = self.stub(0.002, 0.01), self.stub(0.002, 0.01, drop=0.5, seed=1), self.stub(drop=1.0)
+        results = {r["server"]: r for r in bench([dead, lossy, clean], timeout=0.2)}
+        self.assertEqual(results[clean.server]["fail_rate"], 0.0)
+        self.assertGreater(results[lossy.server]["fail_rate"], 0.0)
+        self.assertGreater(results[lossy.server]["score"], results[clean.server]["score"])
+        self.assertEqual(results[dead.server]["fail_rate"], 1.0)
+        self.assertIsNone(results[dead.server]["score"])
+
+    def test_error_rcode_is_a_failure(self):
+        results = bench([self.stub(rcode=2)])
+        self.assertEqual(results[0]["fail_rate"], 1.0)
+        self.assertIsNone(results[0]["score"])
+
+    def test_unreachable_server_ranks_last(self):
+        gone = self.stub()
+        gone.close()
+        gone._thread.join(1)
+        gone.sock.close() # puerto cerrado: ICMP inalcanzable o timeout
+        fast = self.stub(0.001, 0.005)
+        results = bench([gone, fast], timeout=0.2)
+        self.assertEqual(results[0]["server"], fast.server)
+        self.assertIsNone(results[-1]["score"])
+
+    def test_best_dns_only_returns_port_53(self):
+        stubs = [self.stub(0.001, 0.005), self.stub(0.002, 0.01)]
+        results = bench(stubs)
+        self.assertEqual(best_dns(results), [])
+        results += [{"host": "9.9.9.9", "port": 53, "score": 30.0}, {"host": "1.1.1.1", "port": 53, "score": 10.0},
+                    {"host": "8.8.8.8", "port": 53, "score": None}]
+        results.sort(key=lambda r: (r["score"] is None, r["score"] or 0.0))
+        self.assertEqual(best_dns(results), ["1.1.1.1", "9.9.9.9"])
+
+class DnsApplyUndoTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.saved = dict(TWEAKS["dns_cloud"])
+
+    def tearDown(self):
+        TWEAKS["dns_cloud"].clear()
+        TWEAKS["dns_cloud"].update(self.saved)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_undo_restores_previous_resolvers(self):
+        registry, shell = MemoryRegistry(), ScriptedShell()
+        results = [{"host": "9.9.9.9", "port": 53, "score": 5.0}, {"host": "8.8.8.8", "port": 53, "score": 9.0}]
+        with SystemUtils.backends(registry=registry, shell=shell, journal=RegJournal(os.path.join(self.tmp, "j.jsonl"))):
+            servers, report = apply_best_dns(results, state=StateCache(registry))
+            self.assertEqual(servers, ["9.9.9.9", "8.8.8.8"])
+            self.assertTrue(report["results"]["dns_cloud"]["ok"])
+            self.assertIn("'9.9.9.9', '8.8.8.8'", shell.calls[-1])
+            actions = [e for e in SystemUtils.journal.entries() if e["op"] == "action"]
+            self.assertEqual([(a["kind"], a["fid"]) for a in actions], [("ps", "dns_cloud")])
+            ok, msg = SystemUtils.undo()
+        self.assertTrue(ok, msg)
+        self.assertIn("Set-DnsClientServerAddress -InterfaceIndex $_.i -ServerAddresses", shell.calls[-1])
+        self.assertNotIn("dns_cloud", shell.applied)
+
+if __name__ == "__main__":
+    unittest.main()
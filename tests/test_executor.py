@@ -0,0 +1,99 @@
+import threading
+import time
+import unittest
+
+from drvicho import (
+    TWEAKS, ExecutionPlan, MemoryRegistry, PosixShellTransport, ScriptedShell, ShellPool,
+    SystemUtils, Task, TweakExecutor,
+)
+
+class Recorder:
+    # Tareas falsas que duermen y anotan cuándo empezaron y terminaron
+    def __init__(self):
+        self.spans = {}
+        self.lock = threading.Lock()
+
+    def task(self, name, resources, delay=0.2, fids=None):
+        def fn():
+            t0 = time.monotonic()
+            time.sleep(delay)
+            with self.lock: self.spans[name] = (t0, time.monotonic())
+            return {fid: (True, "OK") for fid in fids or [name]}
+        return Task(name, fids or [name], resources, fn)
+
+class TweakExecutorTests(unittest.TestCase):
+    def test_conflicts_keep_plan_order_and_disjoint_tasks_overlap(self):
+        rec = Recorder()
+        tasks = [rec.task("a", {"reg:x"}), rec.task("b", {"reg:y"}), rec.task("c", {"reg:x"}),
+                 rec.task("d", {"svc:z"}), rec.task("e", {"reg:x", "svc:z"})]
+        finished = []
+        t0 = time.monotonic()
+        results = TweakExecutor(max_workers=4).run(tasks, lambda fid, ok, msg, took: finished.append(fid))
+        wall = time.monotonic() - t0
+        spans = rec.spans
+        self.assertTrue(all(ok for ok, _ in results.values()))
+        # Mismo recurso: en el orden del plan, sin solaparse
+        self.assertGreaterEqual(spans["c"][0], spans["a"][1])
+        self.assertGreaterEqual(spans["e"][0], spans["c"][1])
+        self.assertGreaterEqual(spans["e"][0], spans["d"][1])
+        # Sin recursos comunes: a la vez
+        self.assertLess(spans["b"][0], spans["a"][1])
+        self.assertLess(spans["d"][0], spans["a"][1])
+        self.assertLess(wall, 0.8 * 5 * 0.2)
+        self.assertLess(finished.index("a"), finished.index("c"))
+        self.assertLess(finished.index("c"), finished.index("e"))
+
+    def test_failed_task_reports_its_fids(self):
+        def boom(): raise RuntimeError("falló")
+        results = TweakExecutor().run([Task("x", ["f1", "f2"], {"reg:x"}, boom)])
+        self.assertEqual(results, {"f1": (False, "falló"), "f2": (False, "falló")})
+
+class ExecutionPlanTests(unittest.TestCase):
+    def test_full_plan_against_fake_backends(self):
+        latency = 0.2
+        registry, shell = MemoryRegistry(), ScriptedShell(latency=latency, size=4)
+        plan = ExecutionPlan.compile(list(TWEAKS))
+        ps_tasks = [t for t in plan.tasks() if t.name.startswith("ps:")]
+        self.assertGreater(len(ps_tasks), 1)
+        t0 = time.monotonic()
+        with SystemUtils.backends(registry=registry, shell=shell):
+            results = plan.execute()
+        wall = time.monotonic() - t0
+        self.assertEqual(set(results), set(TWEAKS))
+        self.assertTrue(all(ok for ok, _ in results.values()), results)
+        # Un script por grupo de PowerShell y una apertura por clave de registro
+        self.assertEqual(len(shell.calls), len(ps_tasks))
+        self.assertEqual(registry.opens, len(plan.reg_groups))
+        for (hive, path), values in plan.reg_groups.items():
+            stored = registry.get_values(hive, path, [name for name, *_ in values])
+            for name, value, _, _ in values: self.assertEqual(stored[name][0], value)
+        # Los grupos de PowerShell son independientes: muy por debajo de la suma en serie
+        self.assertLess(wall, 0.75 * latency * len(ps_tasks))
+
+    def test_plan_task_waits_for_conflicting_shell_group(self):
+        rec = Recorder()
+        shell = ScriptedShell(latency=0.2, size=4)
+        plan = ExecutionPlan.compile(["telemetry", "ult_perf"])
+        tasks = plan.tasks()
+        tasks.append(rec.task("svc", {"svc:DiagTrack"}, delay=0.0))
+        done = {}
+        with SystemUtils.backends(registry=MemoryRegistry(), shell=shell):
+            TweakExecutor().run(tasks, lambda fid, ok, msg, took: done.setdefault(fid, time.monotonic()))
+        self.assertGreaterEqual(rec.spans["svc"][0], done["telemetry"] - 0.01)
+
+class ShellPoolTests(unittest.TestCase):
+    def test_warm_keeps_hosts_when_the_shell_is_missing(self):
+        class Missing(PosixShellTransport):
+            argv = ["/nonexistent/drvicho-shell"]
+        pool = ShellPool(Missing(), size=2)
+        pool.warm()
+        self.assertEqual(pool._idle.qsize(), 2)
+        out = []
+        worker = threading.Thread(target=lambda: out.append(pool.run("echo ok", timeout=2)), daemon=True)
+        worker.start()
+        worker.join(5)
+        self.assertFalse(worker.is_alive(), "run() se quedó bloqueado esperando un host")
+        self.assertFalse(out[0][0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from drvicho import EXIT_FAILED, EXIT_OK, EXIT_USAGE, Fleet, InProcessTransport, SubprocessTransport, main
+
+PROFILE = {"name": "lab", "features": ["game_mode", "mouse_fix", "kb_delay"]}
+
+def run_cli(argv):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "perfil.json")
+        with open(path, "w", encoding="utf-8") as f: json.dump(PROFILE, f)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(io.StringIO()):
+            code = main(["--json", "fleet", path] + argv)
+        return code, json.loads(out.getvalue())
+
+class ScriptedTransport:
+    # Devuelve una respuesta fija por intento
+    def __init__(self, *replies):
+        self.replies = list(replies)
+
+    async def apply(self, host, profile):
+        return self.replies.pop(0)
+
+class FleetTests(unittest.TestCase):
+    def test_subprocess_transport_needs_host_placeholder(self):
+        with self.assertRaises(ValueError): SubprocessTransport(["python", "drvicho.py"])
+        self.assertEqual(SubprocessTransport(["ssh", "{host}", "drvicho"]).argv, ["ssh", "{host}", "drvicho"])
+
+    def test_cli_refuses_real_hosts_without_via(self):
+        code, out = run_cli(["pc1", "pc2"])
+        self.assertEqual(code, EXIT_USAGE)
+        self.assertIn("--via", out["error"])
+        self.assertEqual(run_cli(["pc1", "--via", "ssh pc1 drvicho"])[0], EXIT_USAGE)
+
+    def test_retries_until_every_simulated_host_succeeds(self):
+        transport = InProcessTransport(latency=(0.0, 0.001), fail_rate=0.3, seed=1)
+        report = Fleet(transport, concurrency=8, retries=5, backoff=0.0).run([f"pc{i}" for i in range(40)], PROFILE)
+        self.assertEqual(report["ok"], 40)
+        self.assertGreater(transport.calls, 40)
+        self.assertEqual(set(transport.registries), {f"pc{i}" for i in range(40)})
+
+    def test_retry_replaces_stale_failures_of_skipped_tweaks(self):
+        first = {"results": {"game_mode": {"ok": True, "msg": "OK", "duration": 0.1},
+                             "mouse_fix": {"ok": False, "msg": "acceso denegado", "duration": 0.1}}, "failed": ["mouse_fix"]}
+        # En el reintento el equipo ya tenía mouse_fix aplicado (el fallo fue al informar)
+        second = {"results": {"kb_delay": {"ok": True, "msg": "OK", "duration": 0.1}}, "skipped": ["game_mode", "mouse_fix"],
+                  "failed": []}
+        report = Fleet(ScriptedTransport((EXIT_FAILED, first), (EXIT_OK, second)), backoff=0.0).run(["pc1"], PROFILE)
+        self.assertEqual(report["ok"], 1)
+        results = report["host_results"][0]["results"]
+        self.assertEqual(results["mouse_fix"], {"ok": True, "msg": "Ya aplicado", "duration": 0.0})
+        self.assertEqual(results["game_mode"]["msg"], "OK")
+        self.assertEqual(report["per_tweak"]["mouse_fix"], {"ok": 1, "failed": 0, "errors": {}})
+
+    def test_cli_simulate(self):
+        code, out = run_cli(["pc1", "pc2", "--simulate"])
+        self.assertEqual(code, EXIT_OK)
+        self.assertEqual(out["ok"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
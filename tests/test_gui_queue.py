@@ -0,0 +1,67 @@
+import queue
+import unittest
+
+try: import drvicho_gui
+except ImportError: drvicho_gui = None
+
+class FakeRoot:
+    def __init__(self): self.scheduled = []
+    def after(self, ms, fn): self.scheduled.append((ms, fn))
+
+class FakeApp:
+    # Lo mínimo que usa drain_ui, sin ventana (no hay display en CI)
+    def __init__(self):
+        self.root = FakeRoot()
+        self.ui_calls = queue.SimpleQueue()
+        self.logged = []
+        self.drain_console = lambda: None
+        self.drain_ui = lambda: None
+    def log(self, msg, level="INFO", fid=None, duration=None): self.logged.append((msg, level))
+    def call_ui(self, fn, *args): self.ui_calls.put((fn, args))
+
+class FakeVar:
+    def __init__(self, value): self.value = value
+    def get(self): return self.value
+    def set(self, value): self.value = value
+
+class FakeState:
+    def __init__(self, states): self.states = states
+    def scan(self, fids=None): return {f: s for f, s in self.states.items() if fids is None or f in fids}
+
+@unittest.skipIf(drvicho_gui is None, "sin tkinter")
+class DrainUiTests(unittest.TestCase):
+    def test_failing_callback_does_not_stop_draining(self):
+        app, ran = FakeApp(), []
+        def broken(): raise RuntimeError("widget destruido")
+        app.call_ui(broken)
+        app.call_ui(ran.append, 1)
+        drvicho_gui.DrVichoApp.drain_ui(app)
+        self.assertEqual(ran, [1])
+        self.assertEqual(len(app.root.scheduled), 1)
+        self.assertEqual(app.logged[0][1], "ERROR")
+
+    def test_rearms_when_console_fails(self):
+        app = FakeApp()
+        def fail(): raise RuntimeError("consola")
+        app.drain_console = fail
+        with self.assertRaises(RuntimeError): drvicho_gui.DrVichoApp.drain_ui(app)
+        self.assertEqual(len(app.root.scheduled), 1)
+
+@unittest.skipIf(drvicho_gui is None, "sin tkinter")
+class RefreshStateTests(unittest.TestCase):
+    def test_switches_follow_the_scan_both_ways(self):
+        app = FakeApp()
+        app.vars = {"game_mode": FakeVar(False), "mouse_fix": FakeVar(True), "telemetry": FakeVar(True)}
+        app.state = FakeState({"game_mode": True, "mouse_fix": False, "telemetry": True, "no_en_gui": True})
+        drvicho_gui.DrVichoApp.refresh_state(app)
+        drvicho_gui.DrVichoApp.drain_ui(app)
+        self.assertEqual({fid: var.get() for fid, var in app.vars.items()}, {"game_mode": True, "mouse_fix": False, "telemetry": True})
+        # Un rollback invalida solo sus fids: el resto no se toca
+        app.state.states.update(game_mode=False, telemetry=False)
+        drvicho_gui.DrVichoApp.refresh_state(app, ["game_mode"])
+        drvicho_gui.DrVichoApp.drain_ui(app)
+        self.assertEqual({fid: var.get() for fid, var in app.vars.items()}, {"game_mode": False, "mouse_fix": False, "telemetry": True})
+        self.assertEqual(app.logged, [])
+
+if __name__ == "__main__":
+    unittest.main()
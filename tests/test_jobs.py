@@ -0,0 +1,54 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+from drvicho import Job, JobRunner
+
+# Comandos falsos de larga duración: dejan nietos que heredan stdout, como
+# sfc/DISM lanzando procesos auxiliares
+FORKS = ["sh", "-c", "sleep 30 & echo started; wait"]
+ORPHAN = ["sh", "-c", "sleep 30 & echo started"]
+
+@unittest.skipIf(os.name == "nt", "usa sh")
+class JobTreeTests(unittest.TestCase):
+    def test_timeout_kills_grandchildren(self):
+        job = JobRunner().start("g", [FORKS], timeout=0.5)
+        t0 = time.monotonic()
+        self.assertEqual(job.wait(10), "timeout")
+        self.assertLess(time.monotonic() - t0, 5)
+
+    def test_timeout_after_direct_child_exits(self):
+        # sh ya terminó, pero el sleep huérfano mantiene abierta la tubería
+        job = JobRunner().start("g", [ORPHAN], timeout=0.5)
+        self.assertEqual(job.wait(10), "timeout")
+
+    def test_cancel_kills_grandchildren(self):
+        started = threading.Event()
+        runner = JobRunner()
+        job = runner.start("g", [FORKS], on_line=lambda job, line: started.set())
+        self.assertTrue(started.wait(5))
+        self.assertTrue(runner.cancel("g"))
+        self.assertEqual(job.wait(10), "cancelled")
+        self.assertFalse(runner.running("g"))
+
+class JobStreamTests(unittest.TestCase):
+    def test_lines_and_progress(self):
+        code = "import sys\nfor i in range(5):\n    print('linea', i)\n    sys.stdout.write('%d%%\\r' % ((i + 1) * 20))\n"
+        lines, progress = [], []
+        job = Job("s", [[sys.executable, "-c", code]], on_line=lambda job, line: lines.append(line),
+                  on_progress=lambda job, pct: progress.append(pct))
+        job.start()
+        self.assertEqual(job.wait(10), "ok")
+        self.assertEqual(lines, [f"linea {i}" for i in range(5)])
+        self.assertEqual(progress, [20.0, 40.0, 60.0, 80.0, 100.0])
+
+    def test_duplicate_launch_rejected(self):
+        runner = JobRunner()
+        job = runner.start("d", [[sys.executable, "-c", "import time; time.sleep(0.5)"]])
+        self.assertIsNone(runner.start("d", [[sys.executable, "-c", "pass"]]))
+        self.assertEqual(job.wait(10), "ok")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from drvicho import MemoryRegistry, RegJournal, ScriptedShell, StateCache, SystemUtils, apply_features
+
+MOUSE = r"Control Panel\Mouse"
+BAR = r"Software\Microsoft\GameBar"
+
+class JournalTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "journal.jsonl")
+        self.registry = MemoryRegistry()
+        self.registry.set_values("HKCU", MOUSE, [("MouseSpeed", "1", "REG_SZ"), ("Blob", b"\x00\xff", "REG_BINARY")])
+        self.backends = SystemUtils.backends(registry=self.registry, journal=RegJournal(self.path))
+        self.backends.__enter__()
+
+    def tearDown(self):
+        self.backends.__exit__(None, None, None)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def values(self, path):
+        return self.registry.get_values("HKCU", path)
+
+    def test_undo_restores_previous_values_and_removes_new_ones(self):
+        before = self.values(MOUSE)
+        SystemUtils.journal.begin("prueba")
+        self.assertTrue(SystemUtils.set_reg_many("HKCU", MOUSE, [("MouseSpeed", "0", "REG_SZ"), ("Blob", b"\x01", "REG_BINARY"),
+                                                                ("MouseThreshold1", "0", "REG_SZ")])[0])
+        self.assertEqual(self.values(MOUSE)["MouseSpeed"], ("0", "REG_SZ"))
+        ok, msg = SystemUtils.undo()
+        self.assertTrue(ok, msg)
+        self.assertEqual(self.values(MOUSE), before)
+        self.assertEqual(SystemUtils.undo(), (False, "No hay cambios para deshacer"))
+
+    def test_undo_recreates_deleted_key(self):
+        before = self.values(MOUSE)
+        SystemUtils.journal.begin()
+        self.assertTrue(SystemUtils.delete_reg_key("HKCU", MOUSE, fid="mouse_fix")[0])
+        self.assertIsNone(self.values(MOUSE))
+        self.assertTrue(SystemUtils.undo()[0])
+        self.assertEqual(self.values(MOUSE), before)
+
+    def test_undo_single_tweak(self):
+        SystemUtils.journal.begin()
+        SystemUtils.set_reg("HKCU", MOUSE, "MouseSpeed", "0", "REG_SZ", fid="mouse_fix")
+        SystemUtils.set_reg("HKCU", BAR, "AllowAutoGameMode", 1, "REG_DWORD", fid="game_mode")
+        self.assertTrue(SystemUtils.undo(fid="mouse_fix")[0])
+        self.assertEqual(self.values(MOUSE)["MouseSpeed"], ("1", "REG_SZ"))
+        self.assertEqual(self.values(BAR)["AllowAutoGameMode"], (1, "REG_DWORD"))
+        # El resto de la ejecución sigue pendiente de deshacer
+        self.assertTrue(SystemUtils.undo()[0])
+        self.assertEqual(self.values(BAR), {})
+
+    def test_recovers_from_torn_last_line(self):
+        before = self.values(MOUSE)
+        SystemUtils.journal.begin()
+        SystemUtils.set_reg("HKCU", MOUSE, "MouseSpeed", "0", "REG_SZ", fid="mouse_fix")
+        # Crash a mitad de escribir el siguiente registro
+        with open(self.path, "a", encoding="utf-8") as f: f.write('{"op":"set","run":"x","hive":"HK')
+        journal = RegJournal(self.path) # reinicio de la app
+        with open(self.path, "rb") as f: self.assertTrue(f.read().endswith(b"\n"))
+        self.assertTrue(all("op" in e for e in journal.entries()))
+        journal.begin()
+        with SystemUtils.backends(registry=self.registry, journal=journal):
+            SystemUtils.set_reg("HKCU", BAR, "AllowAutoGameMode", 1, "REG_DWORD", fid="game_mode")
+            self.assertTrue(SystemUtils.undo()[0])
+            self.assertEqual(self.values(BAR), {})
+            # La ejecución anterior al crash también se puede deshacer
+            self.assertTrue(SystemUtils.undo()[0])
+        self.assertEqual(self.values(MOUSE), before)
+
+class PowerShellUndoTests(unittest.TestCase):
+    # Tweaks solo PowerShell: su estado previo va al journal como acción "ps"
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.registry = MemoryRegistry()
+        self.journal = RegJournal(os.path.join(self.tmp, "journal.jsonl"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def apply(self, shell, fids):
+        with SystemUtils.backends(registry=self.registry, shell=shell, journal=self.journal):
+            return apply_features(fids, state=StateCache(self.registry))
+
+    def undo(self, shell):
+        with SystemUtils.backends(registry=self.registry, shell=shell, journal=self.journal):
+            return SystemUtils.undo()
+
+    def test_undo_targets_the_latest_powershell_only_run(self):
+        shell = ScriptedShell()
+        self.apply(shell, ["game_mode"])
+        self.apply(shell, ["telemetry"])
+        self.assertIn("telemetry", shell.applied)
+        ok, msg = self.undo(shell)
+        self.assertTrue(ok, msg)
+        self.assertNotIn("telemetry", shell.applied)
+        self.assertEqual(self.registry.get_values("HKCU", BAR)["AllowAutoGameMode"], (1, "REG_DWORD"))
+        self.assertTrue(self.undo(shell)[0])
+        self.assertEqual(self.registry.get_values("HKCU", BAR), {})
+
+    def test_reports_tweaks_without_previous_state(self):
+        shell = ScriptedShell()
+        self.apply(shell, ["game_mode"])
+        blind = ScriptedShell(rules=[(r"__DRV_PREV__", "")], applied=shell.applied)
+        self.apply(blind, ["telemetry"])
+        ok, msg = self.undo(blind)
+        self.assertFalse(ok)
+        self.assertIn("telemetry", msg)
+        # No cae a la ejecución anterior
+        self.assertEqual(self.registry.get_values("HKCU", BAR)["AllowAutoGameMode"], (1, "REG_DWORD"))
+
+    def test_run_with_nothing_applied_is_still_the_last_one(self):
+        shell = ScriptedShell()
+        self.apply(shell, ["game_mode"])
+        self.apply(shell, ["game_mode"]) # ya aplicado: solo queda el begin
+        self.assertTrue(self.undo(shell)[0])
+        self.assertEqual(self.registry.get_values("HKCU", BAR)["AllowAutoGameMode"], (1, "REG_DWORD"))
+        self.assertTrue(self.undo(shell)[0])
+        self.assertEqual(self.registry.get_values("HKCU", BAR), {})
+
+if __name__ == "__main__":
+    unittest.main()
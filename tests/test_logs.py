@@ -0,0 +1,67 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from drvicho import LogPipeline
+
+class LogPipelineTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def lines(self, path):
+        with open(path, encoding="utf-8") as f: return [json.loads(line) for line in f]
+
+    def test_flush_waits_for_every_record(self):
+        path = os.path.join(self.tmp, "log.jsonl")
+        pipe = LogPipeline(path)
+        # emit + flush inmediato, muchas veces: flush() no puede volver con registros en vuelo
+        for i in range(300):
+            pipe.emit(f"m{i}", fid="x")
+            self.assertTrue(pipe.flush(timeout=2.0))
+            self.assertEqual(pipe.written, i + 1)
+        self.assertEqual([r["msg"] for r in self.lines(path)], [f"m{i}" for i in range(300)])
+
+    def test_flush_after_concurrent_emitters(self):
+        path = os.path.join(self.tmp, "log.jsonl")
+        pipe = LogPipeline(path)
+        def worker(k):
+            for i in range(2000): pipe.emit(f"{k}:{i}")
+        threads = [threading.Thread(target=worker, args=(k,)) for k in range(4)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        self.assertTrue(pipe.flush())
+        self.assertEqual(pipe.written, 8000)
+        self.assertEqual(len(self.lines(path)), 8000)
+        self.assertEqual(len(pipe.drain(limit=10000)), 8000)
+
+    def test_unwritable_path_does_not_block_flush(self):
+        # Una carpeta en lugar de un fichero: open() falla en cada lote
+        pipe = LogPipeline(self.tmp)
+        for i in range(50): pipe.emit(f"m{i}")
+        t0 = time.monotonic()
+        self.assertTrue(pipe.flush())
+        self.assertLess(time.monotonic() - t0, 1.0)
+        self.assertEqual((pipe.written, pipe.dropped), (0, 50))
+        pipe.emit("otra")
+        self.assertTrue(pipe.flush(timeout=1.0))
+        self.assertEqual(pipe.dropped, 51)
+
+    def test_rotation_keeps_backups(self):
+        path = os.path.join(self.tmp, "log.jsonl")
+        pipe = LogPipeline(path, max_bytes=2000, backups=2)
+        for i in range(200):
+            pipe.emit("x" * 50)
+            if i % 20 == 19: self.assertTrue(pipe.flush())
+        self.assertTrue(pipe.flush())
+        self.assertEqual(pipe.written, 200)
+        self.assertTrue(os.path.exists(path + ".1"))
+        self.assertTrue(os.path.exists(path + ".2"))
+        self.assertFalse(os.path.exists(path + ".3"))
+
+if __name__ == "__main__":
+    unittest.main()
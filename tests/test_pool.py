@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from drvicho import PosixShellTransport, ShellHost, ShellPool
+
+class ShellHostTests(unittest.TestCase):
+    # Protocolo del pool contra un sh real: cada comando termina con "<token> <rc>"
+    def setUp(self):
+        self.host = ShellHost(PosixShellTransport())
+        self.addCleanup(self.host.stop)
+
+    def test_output_and_exit_code_are_framed_by_the_token(self):
+        self.assertEqual(self.host.execute("echo hola; echo adios"), (0, "hola\nadios\n"))
+        self.assertEqual(self.host.execute("(exit 3)"), (3, ""))
+        # Salida sin salto de línea final: el token llega en la misma línea
+        self.assertEqual(self.host.execute("printf abc"), (0, "abc"))
+        self.assertEqual(self.host.execute("true"), (0, ""))
+
+    def test_host_is_reused_between_commands(self):
+        pid = self.host.execute("echo $$")[1]
+        self.assertEqual(self.host.execute("echo $$")[1], pid)
+
+    def test_restarts_after_the_host_dies(self):
+        pid = self.host.execute("echo $$")[1]
+        rc, out = self.host.execute("kill -9 $$")
+        self.assertIsNone(rc)
+        self.assertEqual(out, "Host PowerShell caído")
+        self.assertFalse(self.host.alive())
+        rc, out = self.host.execute("echo $$")
+        self.assertEqual(rc, 0)
+        self.assertNotEqual(out, pid)
+
+    def test_timeout_kills_the_host_and_next_command_restarts_it(self):
+        t0 = time.monotonic()
+        rc, out = self.host.execute("sleep 10", timeout=0.3)
+        self.assertLess(time.monotonic() - t0, 3.0)
+        self.assertEqual((rc, out), (None, "Timeout (0.3s)"))
+        self.assertFalse(self.host.alive())
+        # La salida tardía del comando cortado no se mezcla con la siguiente
+        self.assertEqual(self.host.execute("echo listo", timeout=5), (0, "listo\n"))
+
+    def test_base64_keeps_quotes_and_expansions_literal(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        marker = os.path.join(tmp, "ejecutado")
+        text = f"it's \"entre comillas\" `touch {marker}` $(touch {marker}) $HOME \\n ñandú; exit 7"
+        rc, out = self.host.execute(f"cat <<'EOF'\n{text}\nEOF")
+        self.assertEqual((rc, out), (0, text + "\n"))
+        self.assertFalse(os.path.exists(marker))
+        rc, out = self.host.execute("printf '%s|' \"$1\" a\\ b 'c d'")
+        self.assertEqual((rc, out), (0, "|a b|c d|"))
+
+class PosixShellPoolTests(unittest.TestCase):
+    def test_run_strips_output_and_maps_exit_codes(self):
+        pool = ShellPool(PosixShellTransport(), size=2)
+        self.addCleanup(pool.close)
+        self.assertEqual(pool.run("echo ok"), (True, "ok"))
+        self.assertEqual(pool.run("echo malo; (exit 1)"), (False, "malo"))
+        self.assertEqual(pool.run("kill -9 $$"), (False, "Host PowerShell caído"))
+        self.assertEqual(pool.run("sleep 10", timeout=0.2), (False, "Timeout (0.2s)"))
+        self.assertEqual(pool.run("echo otra vez"), (True, "otra vez"))
+        self.assertEqual(pool._idle.qsize(), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import atexit
+import time
+import unittest
+from unittest import mock
+
+from drvicho import MemoryProcesses, MetricsSampler, ProcessManager
+
+RULES = {"games": ["juego.exe"], "hogs": ["pesado.exe"]}
+
+def wait_for(cond, timeout=5):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if cond(): return True
+        time.sleep(0.01)
+    return False
+
+class ProcessManagerTests(unittest.TestCase):
+    def test_stop_restores_priorities(self):
+        procs = MemoryProcesses()
+        hog = procs.spawn("pesado.exe")
+        manager = ProcessManager(procs, rules=RULES, interval=0.05)
+        with mock.patch.object(atexit, "register"):
+            manager.start()
+            game = procs.spawn("juego.exe")
+            self.assertTrue(wait_for(lambda: procs.procs[hog]["priority"] == "below_normal"))
+            self.assertEqual(procs.procs[game]["priority"], "high")
+            manager.stop()
+        self.assertEqual(procs.procs[game]["priority"], "normal")
+        self.assertEqual(procs.procs[hog]["priority"], "normal")
+
+    def test_exit_hook_registered_once(self):
+        manager = ProcessManager(MemoryProcesses(), rules=RULES, interval=0.05)
+        with mock.patch.object(atexit, "register") as register:
+            for _ in range(3):
+                manager.start()
+                manager.stop()
+        register.assert_called_once_with(manager.stop)
+
+    def test_sampler_does_not_register_exit_hook(self):
+        sampler = MetricsSampler(interval=60)
+        with mock.patch.object(atexit, "register") as register:
+            sampler.start()
+            sampler.stop()
+        register.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
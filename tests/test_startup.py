@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from drvicho import MemoryRegistry, MemoryStartup, RegJournal, StartupProfiler, SystemUtils, bench_startup_profiler
+
+class StartupProfilerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.backend = MemoryStartup.synthetic(5000)
+        self.profiler = StartupProfiler(self.backend)
+        self.backends = SystemUtils.backends(registry=MemoryRegistry(), startup=self.backend,
+                                             journal=RegJournal(os.path.join(self.tmp, "journal.jsonl")))
+        self.backends.__enter__()
+
+    def tearDown(self):
+        self.backends.__exit__(None, None, None)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_scan_ranks_and_caches(self):
+        ranking = self.profiler.scan()
+        self.assertEqual(len(ranking), 5000)
+        scores = [r["score"] for r in ranking]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertIs(self.profiler.scan(), ranking)
+        self.assertEqual(self.backend.snapshots, 1)
+        # Los servicios que comparten svchost se reparten su coste
+        shared = [r for r in ranking if r.get("pid") == 4000]
+        self.assertTrue(shared and all(r["measured"] for r in shared))
+        self.assertAlmostEqual(sum(r["cpu_s"] for r in shared), 40.0)
+
+    def test_disable_thousands_in_one_batch_and_undo(self):
+        ranking = self.profiler.scan()
+        ids = [r["id"] for r in ranking if not r["protected"]][:3000]
+        results = self.profiler.disable(ids)
+        self.assertEqual(sum(ok for ok, _ in results.values()), 3000)
+        self.assertEqual(self.backend.batches, 1)
+        self.assertEqual(len(self.profiler.scan()), 2000)
+        ok, msg = SystemUtils.undo()
+        self.assertTrue(ok, msg)
+        self.assertIn("3000", msg)
+        self.assertEqual(len(self.profiler.scan(force=True)), 5000)
+
+    def test_protected_and_unknown_items_are_refused(self):
+        ranking = self.profiler.scan()
+        protected = next(r["id"] for r in ranking if r["protected"])
+        normal = next(r["id"] for r in ranking if not r["protected"])
+        results = self.profiler.disable([protected, "run:nada", normal])
+        self.assertFalse(results[protected][0])
+        self.assertFalse(results["run:nada"][0])
+        self.assertTrue(results[normal][0])
+        self.assertTrue(self.backend.items[protected]["enabled"])
+
+class StartupBenchTests(unittest.TestCase):
+    def test_bench_restores_everything(self):
+        out = bench_startup_profiler(n=2000, disable=400)
+        self.assertEqual((out["disabled"], out["after_disable"], out["after_undo"]), (400, 1600, 2000))
+        self.assertEqual(out["batches"], 1)
+
+if __name__ == "__main__":
+    unittest.main()